@@ -0,0 +1,32 @@
+"""material search indexes
+
+Revision ID: 0a8c4e2d9b17
+Revises: f19b7d3e6a42
+Create Date: 2026-10-19 02:05:43.287145
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a8c4e2d9b17'
+down_revision: Union[str, Sequence[str], None] = 'f19b7d3e6a42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # serves both `q <% lower(name)` and `lower(name) LIKE 'q%'`
+    op.execute("CREATE INDEX ix_materials_name_trgm ON materials USING gin (lower(name) gin_trgm_ops)")
+    op.create_index('ix_materials_category', 'materials', ['category'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_materials_category', table_name='materials')
+    op.execute("DROP INDEX IF EXISTS ix_materials_name_trgm")
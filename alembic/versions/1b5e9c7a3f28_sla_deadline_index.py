@@ -0,0 +1,32 @@
+"""sla deadline index, system events
+
+Revision ID: 1b5e9c7a3f28
+Revises: 0a8c4e2d9b17
+Create Date: 2026-10-19 02:39:20.751934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b5e9c7a3f28'
+down_revision: Union[str, Sequence[str], None] = '0a8c4e2d9b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_transfers_status_deadline_at', 'transfers', ['status', 'deadline_at'], unique=False)
+    # "overdue" events are raised by the scheduler, not by a user
+    op.alter_column('transfer_events', 'actor_user_id', existing_type=sa.Integer(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM transfer_events WHERE actor_user_id IS NULL")
+    op.alter_column('transfer_events', 'actor_user_id', existing_type=sa.Integer(), nullable=False)
+    op.drop_index('ix_transfers_status_deadline_at', table_name='transfers')
@@ -0,0 +1,29 @@
+"""transfers.version for optimistic status transitions
+
+Revision ID: 2d6f0a9c4e51
+Revises: 1b5e9c7a3f28
+Create Date: 2026-10-19 09:12:44.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d6f0a9c4e51'
+down_revision: Union[str, Sequence[str], None] = '1b5e9c7a3f28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # constant default: a catalog-only change on Postgres 11+, existing rows are not rewritten
+    op.add_column('transfers', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('transfers', 'version')
@@ -0,0 +1,44 @@
+"""user_scopes: warehouse / branch grants per user
+
+Revision ID: 3e8a1c5f7b20
+Revises: 2d6f0a9c4e51
+Create Date: 2026-10-19 14:27:03.905116
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e8a1c5f7b20'
+down_revision: Union[str, Sequence[str], None] = '2d6f0a9c4e51'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'user_scopes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('warehouse_id', sa.Integer(), nullable=True),
+        sa.Column('branch_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.CheckConstraint('(warehouse_id IS NULL) <> (branch_id IS NULL)', name='ck_user_scopes_one_target'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['warehouse_id'], ['warehouses.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['branch_id'], ['branches.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ux_user_scopes_user_id_warehouse_id', 'user_scopes', ['user_id', 'warehouse_id'], unique=True)
+    op.create_index('ux_user_scopes_user_id_branch_id', 'user_scopes', ['user_id', 'branch_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_user_scopes_user_id_branch_id', table_name='user_scopes')
+    op.drop_index('ux_user_scopes_user_id_warehouse_id', table_name='user_scopes')
+    op.drop_table('user_scopes')
@@ -0,0 +1,38 @@
+"""transfers list indexes
+
+Revision ID: 5b7e0c31a9d2
+Revises: 9818df918c2a
+Create Date: 2026-10-18 18:02:41.513207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e0c31a9d2'
+down_revision: Union[str, Sequence[str], None] = '9818df918c2a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_transfers_status_id', 'transfers', ['status', 'id'], unique=False)
+    op.create_index('ix_transfers_from_warehouse_id_id', 'transfers', ['from_warehouse_id', 'id'], unique=False)
+    op.create_index('ix_transfers_to_warehouse_id_id', 'transfers', ['to_warehouse_id', 'id'], unique=False)
+    op.create_index('ix_transfers_material_id_id', 'transfers', ['material_id', 'id'], unique=False)
+    op.create_index('ix_transfers_driver_id_id', 'transfers', ['driver_id', 'id'], unique=False)
+    op.create_index('ix_transfers_deadline_at', 'transfers', ['deadline_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transfers_deadline_at', table_name='transfers')
+    op.drop_index('ix_transfers_driver_id_id', table_name='transfers')
+    op.drop_index('ix_transfers_material_id_id', table_name='transfers')
+    op.drop_index('ix_transfers_to_warehouse_id_id', table_name='transfers')
+    op.drop_index('ix_transfers_from_warehouse_id_id', table_name='transfers')
+    op.drop_index('ix_transfers_status_id', table_name='transfers')
@@ -0,0 +1,42 @@
+"""notify transfer events
+
+Revision ID: 7f2c5d8e3a61
+Revises: e82d4b6f1c05
+Create Date: 2026-10-18 21:26:53.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f2c5d8e3a61'
+down_revision: Union[str, Sequence[str], None] = 'e82d4b6f1c05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NOTIFY is delivered on commit, so listeners only ever see committed events
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_transfer_event() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('transfer_events', NEW.id::text);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER transfer_events_notify
+        AFTER INSERT ON transfer_events
+        FOR EACH ROW EXECUTE FUNCTION notify_transfer_event()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS transfer_events_notify ON transfer_events")
+    op.execute("DROP FUNCTION IF EXISTS notify_transfer_event()")
@@ -0,0 +1,53 @@
+"""event log position and projector read models
+
+Revision ID: a4d9e2b7c813
+Revises: 7f2c5d8e3a61
+Create Date: 2026-10-18 22:41:07.365120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d9e2b7c813'
+down_revision: Union[str, Sequence[str], None] = '7f2c5d8e3a61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # existing events are all committed: give them position (0, id)
+    op.add_column('transfer_events', sa.Column('txid', sa.BigInteger(), nullable=True))
+    op.execute("UPDATE transfer_events SET txid = 0")
+    op.alter_column('transfer_events', 'txid', nullable=False, server_default=sa.text('txid_current()'))
+    op.create_index('ix_transfer_events_txid_id', 'transfer_events', ['txid', 'id'], unique=False)
+
+    op.create_table('projector_checkpoints',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('last_txid', sa.BigInteger(), nullable=False),
+    sa.Column('last_event_id', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    # filled by the projector replaying the log from the start
+    op.create_table('transfer_status_counts',
+    sa.Column('from_warehouse_id', sa.Integer(), nullable=False),
+    sa.Column('to_warehouse_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['from_warehouse_id'], ['warehouses.id'], ),
+    sa.ForeignKeyConstraint(['to_warehouse_id'], ['warehouses.id'], ),
+    sa.PrimaryKeyConstraint('from_warehouse_id', 'to_warehouse_id', 'status')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('transfer_status_counts')
+    op.drop_table('projector_checkpoints')
+    op.drop_index('ix_transfer_events_txid_id', table_name='transfer_events')
+    op.drop_column('transfer_events', 'txid')
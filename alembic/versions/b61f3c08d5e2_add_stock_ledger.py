@@ -0,0 +1,61 @@
+"""add stock movements ledger and snapshots
+
+Revision ID: b61f3c08d5e2
+Revises: a4d9e2b7c813
+Create Date: 2026-10-18 23:17:42.904113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b61f3c08d5e2'
+down_revision: Union[str, Sequence[str], None] = 'a4d9e2b7c813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stock_movements',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('warehouse_id', sa.Integer(), nullable=False),
+    sa.Column('material_id', sa.Integer(), nullable=False),
+    sa.Column('qty', sa.Numeric(precision=14, scale=3), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('transfer_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['material_id'], ['materials.id'], ),
+    sa.ForeignKeyConstraint(['transfer_id'], ['transfers.id'], ),
+    sa.ForeignKeyConstraint(['warehouse_id'], ['warehouses.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_stock_movements_warehouse_id_created_at', 'stock_movements', ['warehouse_id', 'created_at'], unique=False)
+
+    op.create_table('stock_snapshots',
+    sa.Column('warehouse_id', sa.Integer(), nullable=False),
+    sa.Column('taken_at', sa.DateTime(), nullable=False),
+    sa.Column('material_id', sa.Integer(), nullable=False),
+    sa.Column('on_hand_qty', sa.Numeric(precision=14, scale=3), nullable=False),
+    sa.ForeignKeyConstraint(['material_id'], ['materials.id'], ),
+    sa.ForeignKeyConstraint(['warehouse_id'], ['warehouses.id'], ),
+    sa.PrimaryKeyConstraint('warehouse_id', 'taken_at', 'material_id')
+    )
+
+    # the ledger starts from today's stock
+    op.execute("""
+        INSERT INTO stock_movements (warehouse_id, material_id, qty, kind, created_at)
+        SELECT warehouse_id, material_id, on_hand_qty, 'opening', now() at time zone 'utc'
+        FROM current_stock
+        WHERE on_hand_qty <> 0
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('stock_snapshots')
+    op.drop_index('ix_stock_movements_warehouse_id_created_at', table_name='stock_movements')
+    op.drop_table('stock_movements')
@@ -0,0 +1,55 @@
+"""typed quantity columns on transfer events
+
+Revision ID: c08e5a71f4b9
+Revises: b61f3c08d5e2
+Create Date: 2026-10-18 23:52:10.218736
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c08e5a71f4b9'
+down_revision: Union[str, Sequence[str], None] = 'b61f3c08d5e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_CHUNK = 10000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('transfer_events', sa.Column('planned_qty', sa.Numeric(precision=14, scale=3), nullable=True))
+    op.add_column('transfer_events', sa.Column('shipped_qty', sa.Numeric(precision=14, scale=3), nullable=True))
+    op.add_column('transfer_events', sa.Column('received_qty', sa.Numeric(precision=14, scale=3), nullable=True))
+    op.add_column('transfer_events', sa.Column('damaged_qty', sa.Numeric(precision=14, scale=3), nullable=True))
+    op.create_index('ix_transfer_events_event_type_event_time', 'transfer_events', ['event_type', 'event_time'], unique=False)
+
+    # backfill by id range, each chunk committed on its own, so the table is never locked as a whole
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        max_id = bind.execute(sa.text("SELECT coalesce(max(id), 0) FROM transfer_events")).scalar()
+        for lo in range(0, max_id + 1, BACKFILL_CHUNK):
+            bind.execute(
+                sa.text("""
+                    UPDATE transfer_events SET
+                        planned_qty = (payload_json::jsonb ->> 'planned_qty')::numeric,
+                        shipped_qty = (payload_json::jsonb ->> 'shipped_qty')::numeric,
+                        received_qty = (payload_json::jsonb ->> 'received_qty')::numeric,
+                        damaged_qty = (payload_json::jsonb ->> 'damaged_qty')::numeric
+                    WHERE id >= :lo AND id < :hi AND payload_json IS NOT NULL
+                """),
+                {"lo": lo, "hi": lo + BACKFILL_CHUNK},
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transfer_events_event_type_event_time', table_name='transfer_events')
+    op.drop_column('transfer_events', 'damaged_qty')
+    op.drop_column('transfer_events', 'received_qty')
+    op.drop_column('transfer_events', 'shipped_qty')
+    op.drop_column('transfer_events', 'planned_qty')
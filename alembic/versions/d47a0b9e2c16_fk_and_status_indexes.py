@@ -0,0 +1,45 @@
+"""fk and status indexes
+
+Revision ID: d47a0b9e2c16
+Revises: c08e5a71f4b9
+Create Date: 2026-10-19 00:21:36.551802
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd47a0b9e2c16'
+down_revision: Union[str, Sequence[str], None] = 'c08e5a71f4b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # GET /transfers/{id}/events: WHERE transfer_id = ? ORDER BY id
+    op.create_index('ix_transfer_events_transfer_id_id', 'transfer_events', ['transfer_id', 'id'], unique=False)
+    op.create_index('ix_transfer_events_actor_user_id', 'transfer_events', ['actor_user_id'], unique=False)
+
+    op.create_index('ix_transfers_status_updated_at', 'transfers', ['status', 'updated_at'], unique=False)
+    op.create_index('ix_transfers_operator_id', 'transfers', ['operator_id'], unique=False)
+    op.create_index('ix_transfers_storekeeper_from_id', 'transfers', ['storekeeper_from_id'], unique=False)
+    op.create_index('ix_transfers_storekeeper_to_id', 'transfers', ['storekeeper_to_id'], unique=False)
+
+    op.create_index(op.f('ix_stock_movements_material_id'), 'stock_movements', ['material_id'], unique=False)
+    op.create_index(op.f('ix_stock_movements_transfer_id'), 'stock_movements', ['transfer_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_stock_movements_transfer_id'), table_name='stock_movements')
+    op.drop_index(op.f('ix_stock_movements_material_id'), table_name='stock_movements')
+    op.drop_index('ix_transfers_storekeeper_to_id', table_name='transfers')
+    op.drop_index('ix_transfers_storekeeper_from_id', table_name='transfers')
+    op.drop_index('ix_transfers_operator_id', table_name='transfers')
+    op.drop_index('ix_transfers_status_updated_at', table_name='transfers')
+    op.drop_index('ix_transfer_events_actor_user_id', table_name='transfer_events')
+    op.drop_index('ix_transfer_events_transfer_id_id', table_name='transfer_events')
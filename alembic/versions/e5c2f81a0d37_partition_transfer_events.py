@@ -0,0 +1,131 @@
+"""partition transfer_events by month
+
+Revision ID: e5c2f81a0d37
+Revises: d47a0b9e2c16
+Create Date: 2026-10-19 00:48:55.170264
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c2f81a0d37'
+down_revision: Union[str, Sequence[str], None] = 'd47a0b9e2c16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = (
+    "id, transfer_id, event_type, actor_user_id, event_time, payload_json, idempotency_key, "
+    "txid, planned_qty, shipped_qty, received_qty, damaged_qty"
+)
+INDEXES = {
+    'ix_transfer_events_transfer_id_id': ['transfer_id', 'id'],
+    'ix_transfer_events_actor_user_id': ['actor_user_id'],
+    'ix_transfer_events_txid_id': ['txid', 'id'],
+    'ix_transfer_events_event_type_event_time': ['event_type', 'event_time'],
+}
+# months created ahead of today; later ones come from `python -m app.archive` (ensure_event_partitions)
+MONTHS_AHEAD = 3
+
+
+def _add_months(d: date, n: int) -> date:
+    m = d.month - 1 + n
+    return date(d.year + m // 12, m % 12 + 1, 1)
+
+
+def _create_trigger() -> None:
+    op.execute("""
+        CREATE TRIGGER transfer_events_notify
+        AFTER INSERT ON transfer_events
+        FOR EACH ROW EXECUTE FUNCTION notify_transfer_event()
+    """)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS transfer_events_notify ON transfer_events")
+    op.execute("ALTER TABLE transfer_events RENAME TO transfer_events_unpartitioned")
+    # index names are schema-wide: free them for the new table
+    for name in INDEXES:
+        op.drop_index(name, table_name='transfer_events_unpartitioned')
+    op.execute("ALTER TABLE transfer_events_unpartitioned DROP CONSTRAINT transfer_events_pkey")
+    op.execute("ALTER TABLE transfer_events_unpartitioned DROP CONSTRAINT transfer_events_idempotency_key_key")
+
+    # the partition key has to be part of the primary key; ids keep coming from the same sequence
+    op.execute("""
+        CREATE TABLE transfer_events (
+            id integer NOT NULL DEFAULT nextval('transfer_events_id_seq'),
+            transfer_id integer NOT NULL REFERENCES transfers (id),
+            event_type varchar(50) NOT NULL,
+            actor_user_id integer NOT NULL REFERENCES users (id),
+            event_time timestamp without time zone NOT NULL,
+            payload_json text,
+            idempotency_key varchar(200),
+            txid bigint NOT NULL DEFAULT txid_current(),
+            planned_qty numeric(14, 3),
+            shipped_qty numeric(14, 3),
+            received_qty numeric(14, 3),
+            damaged_qty numeric(14, 3),
+            PRIMARY KEY (id, event_time)
+        ) PARTITION BY RANGE (event_time)
+    """)
+    op.execute("ALTER SEQUENCE transfer_events_id_seq OWNED BY transfer_events.id")
+
+    bind = op.get_bind()
+    first = bind.execute(sa.text("SELECT min(event_time) FROM transfer_events_unpartitioned")).scalar()
+    month = date.today().replace(day=1) if first is None else first.date().replace(day=1)
+    last = _add_months(date.today().replace(day=1), MONTHS_AHEAD)
+    while month <= last:
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE transfer_events_p{month:%Y_%m} PARTITION OF transfer_events "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+    op.execute("CREATE TABLE transfer_events_default PARTITION OF transfer_events DEFAULT")
+
+    for name, columns in INDEXES.items():
+        op.create_index(name, 'transfer_events', columns, unique=False)
+    op.create_index('ix_transfer_events_idempotency_key', 'transfer_events', ['idempotency_key'], unique=False)
+
+    op.execute(f"INSERT INTO transfer_events ({COLUMNS}) SELECT {COLUMNS} FROM transfer_events_unpartitioned")
+    op.drop_table('transfer_events_unpartitioned')
+    _create_trigger()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS transfer_events_notify ON transfer_events")
+    op.execute("ALTER TABLE transfer_events RENAME TO transfer_events_partitioned")
+    op.drop_index('ix_transfer_events_idempotency_key', table_name='transfer_events_partitioned')
+    for name in INDEXES:
+        op.drop_index(name, table_name='transfer_events_partitioned')
+    op.execute("ALTER TABLE transfer_events_partitioned DROP CONSTRAINT transfer_events_pkey")
+
+    op.execute("""
+        CREATE TABLE transfer_events (
+            id integer NOT NULL DEFAULT nextval('transfer_events_id_seq') PRIMARY KEY,
+            transfer_id integer NOT NULL REFERENCES transfers (id),
+            event_type varchar(50) NOT NULL,
+            actor_user_id integer NOT NULL REFERENCES users (id),
+            event_time timestamp without time zone NOT NULL,
+            payload_json text,
+            idempotency_key varchar(200) UNIQUE,
+            txid bigint NOT NULL DEFAULT txid_current(),
+            planned_qty numeric(14, 3),
+            shipped_qty numeric(14, 3),
+            received_qty numeric(14, 3),
+            damaged_qty numeric(14, 3)
+        )
+    """)
+    op.execute("ALTER SEQUENCE transfer_events_id_seq OWNED BY transfer_events.id")
+    for name, columns in INDEXES.items():
+        op.create_index(name, 'transfer_events', columns, unique=False)
+
+    op.execute(f"INSERT INTO transfer_events ({COLUMNS}) SELECT {COLUMNS} FROM transfer_events_partitioned")
+    op.execute("DROP TABLE transfer_events_partitioned CASCADE")
+    _create_trigger()
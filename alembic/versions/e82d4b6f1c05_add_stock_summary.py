@@ -0,0 +1,56 @@
+"""add stock summary
+
+Revision ID: e82d4b6f1c05
+Revises: c3a91f0e7b44
+Create Date: 2026-10-18 19:48:22.730915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e82d4b6f1c05'
+down_revision: Union[str, Sequence[str], None] = 'c3a91f0e7b44'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stock_summary',
+    sa.Column('warehouse_id', sa.Integer(), nullable=False),
+    sa.Column('category', sa.String(length=255), nullable=False),
+    sa.Column('branch_id', sa.Integer(), nullable=False),
+    sa.Column('on_hand_qty', sa.Numeric(precision=14, scale=3), nullable=False),
+    sa.Column('in_transit_qty', sa.Numeric(precision=14, scale=3), nullable=False),
+    sa.ForeignKeyConstraint(['branch_id'], ['branches.id'], ),
+    sa.ForeignKeyConstraint(['warehouse_id'], ['warehouses.id'], ),
+    sa.PrimaryKeyConstraint('warehouse_id', 'category')
+    )
+    op.create_index(op.f('ix_stock_summary_branch_id'), 'stock_summary', ['branch_id'], unique=False)
+
+    # backfill from the base tables
+    op.execute("""
+        INSERT INTO stock_summary (warehouse_id, category, branch_id, on_hand_qty, in_transit_qty)
+        SELECT p.warehouse_id, p.category, w.branch_id, sum(p.on_hand_qty), sum(p.in_transit_qty)
+        FROM (
+            SELECT cs.warehouse_id, coalesce(m.category, '') AS category,
+                   cs.on_hand_qty, 0 AS in_transit_qty
+            FROM current_stock cs JOIN materials m ON m.id = cs.material_id
+            UNION ALL
+            SELECT t.to_warehouse_id, coalesce(m.category, ''), 0, t.shipped_qty
+            FROM transfers t JOIN materials m ON m.id = t.material_id
+            WHERE t.status = 'in_transit'
+        ) p
+        JOIN warehouses w ON w.id = p.warehouse_id
+        GROUP BY p.warehouse_id, p.category, w.branch_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_stock_summary_branch_id'), table_name='stock_summary')
+    op.drop_table('stock_summary')
@@ -0,0 +1,39 @@
+"""add reference versions
+
+Revision ID: f19b7d3e6a42
+Revises: e5c2f81a0d37
+Create Date: 2026-10-19 01:34:18.640519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f19b7d3e6a42'
+down_revision: Union[str, Sequence[str], None] = 'e5c2f81a0d37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('reference_versions',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.execute("""
+        INSERT INTO reference_versions (name, version, updated_at)
+        VALUES ('branches', 1, now() at time zone 'utc'),
+               ('warehouses', 1, now() at time zone 'utc'),
+               ('materials', 1, now() at time zone 'utc')
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('reference_versions')
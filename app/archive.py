@@ -0,0 +1,56 @@
+"""Moves closed transfers older than N months out of the hot tables into gzip CSV files.
+
+Also keeps the monthly transfer_events partitions ahead of time and drops
+old ones that archival emptied. Meant to run from cron, e.g. nightly:
+
+    python -m app.archive --months 6 --out /var/lib/warehouse/archive
+    python -m app.archive --months 6 --dry-run
+"""
+import argparse
+import asyncio
+import json
+import logging
+from datetime import date, datetime
+from pathlib import Path
+
+from app.db.session import AsyncSessionLocal, engine
+from app.services.archive import (
+    add_months, archive_closed_transfers, drop_empty_event_partitions, ensure_event_partitions,
+)
+
+
+async def main(args):
+    cutoff = add_months(date.today().replace(day=1), -args.months)
+    async with AsyncSessionLocal() as session:
+        created = []
+        if not args.dry_run:
+            created = await ensure_event_partitions(session, args.months_ahead)
+            await session.commit()
+
+        report = await archive_closed_transfers(
+            session,
+            datetime.combine(cutoff, datetime.min.time()),
+            Path(args.out),
+            batch_size=args.batch_size,
+            dry_run=args.dry_run,
+        )
+        dropped = []
+        if not args.dry_run:
+            dropped = await drop_empty_event_partitions(session, cutoff)
+            await session.commit()
+    await engine.dispose()
+
+    report.update(cutoff=cutoff.isoformat(), partitions_created=created, partitions_dropped=dropped)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    logging.getLogger("app").setLevel(logging.INFO)
+    logging.getLogger("app").addHandler(logging.StreamHandler())
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--months", type=int, default=6, help="archive transfers closed before the start of the month N months ago")
+    parser.add_argument("--out", default="archive", help="directory for the .csv.gz files")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--months-ahead", type=int, default=3, help="transfer_events partitions to keep created ahead")
+    parser.add_argument("--dry-run", action="store_true", help="only count what would be archived")
+    asyncio.run(main(parser.parse_args()))
@@ -4,10 +4,100 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     DATABASE_URL_SYNC: str
 
+    # connection pool, per worker process: up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 0  # 0 = server default
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100  # asyncpg only
+    # read replicas for GET endpoints, comma-separated async URLs; empty = everything on the primary
+    DATABASE_REPLICA_URLS: str = ""
+    DB_REPLICA_CHECK_SECONDS: float = 5
+    DB_REPLICA_CHECK_TIMEOUT_SECONDS: float = 2
+    DB_REPLICA_MAX_LAG_SECONDS: float = 10
+    # after a commit the client reads from the primary for this long (X-Read-Your-Writes header / ryw cookie)
+    DB_READ_YOUR_WRITES_SECONDS: float = 5
+    # uvicorn --workers / WEB_CONCURRENCY, only used to check the pool against max_connections
+    WEB_CONCURRENCY: int = 1
+
+    # "off", "sampled" or "all"; statements are logged as JSON lines to the app.sql logger
+    SQL_LOG: str = "off"
+    SQL_LOG_SAMPLE_RATE: float = 0.01
+
     SECRET_KEY: str
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
 
+    AUTH_CACHE_TTL_SECONDS: float = 60
+    AUTH_CACHE_MAX_SIZE: int = 10000
+    # embed role/active/name/email in access tokens so a cold cache doesn't need the DB either;
+    # they are trusted for AUTH_CACHE_TTL_SECONDS after issue, then re-read like a cache miss
+    AUTH_TOKEN_CLAIMS: bool = False
+
+    # bcrypt runs on a bounded thread pool so logins don't block the event loop
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 256  # 0 = unbounded
+
+    # warehouse-scoped access (user_scopes): users without any grant see every warehouse;
+    # turn off once assignments are in place
+    WAREHOUSE_SCOPE_UNASSIGNED_SEES_ALL: bool = True
+
+    # in-process bloom filter of seen idempotency keys; 0 bits disables it
+    IDEMPOTENCY_BLOOM_BITS: int = 1 << 20
+    IDEMPOTENCY_BLOOM_HASHES: int = 7
+
+    # server-push stream of transfer events (GET /transfers/events/stream)
+    EVENT_STREAM_ENABLED: bool = True
+    EVENT_STREAM_POLL_SECONDS: float = 1.0  # feed interval when LISTEN/NOTIFY is unavailable
+    EVENT_STREAM_QUEUE_SIZE: int = 1000  # per subscriber; a client that falls further behind is cut off
+    EVENT_STREAM_HEARTBEAT_SECONDS: float = 15
+    EVENT_STREAM_REPLAY_LIMIT: int = 1000
+
+    # background projector that tails transfer_events into read models
+    PROJECTOR_ENABLED: bool = True
+    PROJECTOR_BATCH_SIZE: int = 500
+    PROJECTOR_POLL_SECONDS: float = 1.0
+
+    # stock_movements ledger: snapshot every interval (0 disables the background task)
+    STOCK_SNAPSHOT_INTERVAL_SECONDS: float = 3600
+    STOCK_SNAPSHOT_SETTLE_SECONDS: float = 60  # snapshot only movements older than this
+
+    # /reports/*: computed reports cached per window; windows ended SETTLE seconds ago no longer change
+    REPORT_CACHE_MAX_SIZE: int = 256
+    REPORT_CACHE_OPEN_TTL_SECONDS: float = 30
+    REPORT_CACHE_CLOSED_TTL_SECONDS: float = 3600
+    REPORT_CACHE_SETTLE_SECONDS: float = 60
+
+    # /export/*: rows fetched per server-side cursor round trip
+    EXPORT_YIELD_PER: int = 1000
+
+    # serialized branch/warehouse/material lists; other workers' writes show up within REVALIDATE seconds
+    REFERENCE_CACHE_MAX_SIZE: int = 1024
+    REFERENCE_CACHE_REVALIDATE_SECONDS: float = 5
+
+    # /materials/search: minimum word similarity for fuzzy hits (pg_trgm.word_similarity_threshold)
+    MATERIAL_SEARCH_THRESHOLD: float = 0.3
+
+    # SLA scheduler: every REFRESH seconds the deadlines that came within HORIZON are loaded;
+    # a full reload of everything open within HORIZON runs every RESYNC seconds
+    SLA_SCHEDULER_ENABLED: bool = True
+    SLA_REFRESH_SECONDS: float = 30
+    SLA_LOAD_HORIZON_SECONDS: float = 3600
+    SLA_RESYNC_SECONDS: float = 3600
+    SLA_FIRE_BATCH_SIZE: int = 500
+
+    # /transfers/plan: truck loads per lane (same unit as planned_qty)
+    ROUTE_PLAN_TRUCK_CAPACITY: float = 20000
+    ROUTE_PLAN_MAX_LOADS_PER_DRIVER: int = 1
+    ROUTE_PLAN_MAX_TRANSFERS: int = 100000
+    ROUTE_PLAN_APPLY_CHUNK_SIZE: int = 5000  # transfers locked and updated per statement
+
+    TRANSFER_BULK_MAX_ITEMS: int = 1000
+    TRANSFER_PAGE_MAX_LIMIT: int = 1000
+    TRANSFER_STREAM_MAX_LIMIT: int = 50000
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,127 @@
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+
+class RequestStats:
+    __slots__ = ("statements", "db_time", "pool_wait")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+
+
+# set by DbMetricsMiddleware for the duration of a request; SQLAlchemy's
+# greenlets inherit the context, so the engine hooks below can see it
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+
+def install_db_instrumentation(sync_engine) -> None:
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stats = current_request.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_time += time.perf_counter() - context._metrics_start
+
+
+def record_pool_wait(seconds: float) -> None:
+    stats = current_request.get()
+    if stats is not None:
+        stats.pool_wait += seconds
+
+
+class MetricsRegistry:
+    """Per-process request/DB counters, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        # (method, route, status) -> [requests, handler_seconds, db_seconds, pool_wait_seconds, statements, max_statements]
+        self._series: dict[tuple[str, str, int], list] = {}
+
+    def observe(self, method: str, route: str, status: int, handler_time: float, stats: RequestStats) -> None:
+        s = self._series.get((method, route, status))
+        if s is None:
+            s = self._series[(method, route, status)] = [0, 0.0, 0.0, 0.0, 0, 0]
+        s[0] += 1
+        s[1] += handler_time
+        s[2] += stats.db_time
+        s[3] += stats.pool_wait
+        s[4] += stats.statements
+        s[5] = max(s[5], stats.statements)
+
+    def render(self, extra: dict[str, float] | None = None) -> str:
+        metrics = [
+            ("http_requests_total", "counter", "Requests handled", 0),
+            ("http_request_duration_seconds_sum", "counter", "Total handler time", 1),
+            ("db_time_seconds_sum", "counter", "Total time spent executing SQL", 2),
+            ("db_pool_wait_seconds_sum", "counter", "Total time spent waiting for a pooled connection", 3),
+            ("db_statements_total", "counter", "SQL statements executed", 4),
+            ("db_statements_per_request_max", "gauge", "Most SQL statements issued by a single request", 5),
+        ]
+        lines = []
+        for name, kind, help_, idx in metrics:
+            lines.append(f"# HELP {name} {help_}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (method, route, status), s in sorted(self._series.items()):
+                lines.append(f'{name}{{method="{method}",route="{route}",status="{status}"}} {s[idx]}')
+        for name, value in (extra or {}).items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class DbMetricsMiddleware:
+    """Counts SQL statements, DB time, pool wait and handler time per request.
+
+    The numbers go out as X-DB-* / X-Handler-Time-Ms response headers and into
+    the registry served at /metrics.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_headers(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                handler_ms = (time.perf_counter() - started) * 1000
+                headers = list(message.get("headers", []))
+                headers += [
+                    (b"x-db-statements", str(stats.statements).encode()),
+                    (b"x-db-time-ms", f"{stats.db_time * 1000:.3f}".encode()),
+                    (b"x-db-pool-wait-ms", f"{stats.pool_wait * 1000:.3f}".encode()),
+                    (b"x-handler-time-ms", f"{handler_ms:.3f}".encode()),
+                ]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            current_request.reset(token)
+            route = scope.get("route")
+            registry.observe(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                status_code,
+                time.perf_counter() - started,
+                stats,
+            )
@@ -0,0 +1,163 @@
+from collections import defaultdict
+from dataclasses import dataclass
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, or_, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.user_scope import UserScope
+from app.models.warehouse import Warehouse
+from app.services.reference_cache import reference_cache
+
+# reference_versions rows the compiled index depends on
+SCOPE_KINDS = ("user_scopes", "warehouses")
+
+
+@dataclass(frozen=True, slots=True)
+class WarehouseScope:
+    """Warehouses the current request may touch; warehouse_ids None means all of them."""
+    warehouse_ids: frozenset[int] | None
+
+    def allows(self, *warehouse_ids: int) -> bool:
+        """True if any of the ids is in scope (a transfer is visible from either end)."""
+        return self.warehouse_ids is None or any(w in self.warehouse_ids for w in warehouse_ids)
+
+    def check(self, *warehouse_ids: int) -> None:
+        if not self.allows(*warehouse_ids):
+            raise HTTPException(status.HTTP_403_FORBIDDEN, "Warehouse is outside your scope")
+
+    def where(self, *columns):
+        """column IN (allowed ids) for any of columns; true() when unrestricted."""
+        if self.warehouse_ids is None:
+            return true()
+        ids = sorted(self.warehouse_ids)
+        return or_(*(c.in_(ids) for c in columns))
+
+
+class PermissionIndex:
+    """user id -> frozenset of warehouse ids, compiled from user_scopes.
+
+    Branch grants are expanded to the branch's warehouses up front, so a
+    request costs one dict lookup. Grants, revocations and new warehouses
+    made by this worker are applied incrementally (only the affected users
+    are recompiled). Changes from other workers show up through the
+    "user_scopes" / "warehouses" rows in reference_versions (re-read at most
+    every REFERENCE_CACHE_REVALIDATE_SECONDS) and trigger a full reload.
+    """
+
+    def __init__(self):
+        self._warehouses: dict[int, set[int]] = defaultdict(set)  # user -> directly granted warehouses
+        self._branches: dict[int, set[int]] = defaultdict(set)  # user -> granted branches
+        self._branch_warehouses: dict[int, set[int]] = defaultdict(set)
+        self._branch_users: dict[int, set[int]] = defaultdict(set)
+        self._compiled: dict[int, frozenset[int]] = {}
+        # reference versions the index reflects; None until the first load
+        self._loaded: dict[str, int] | None = None
+        self.reloads = 0
+        self.updates = 0
+
+    async def _versions(self, session: AsyncSession) -> dict[str, int]:
+        return {kind: (await reference_cache.version(session, kind))[0] for kind in SCOPE_KINDS}
+
+    async def refresh(self, session: AsyncSession) -> None:
+        versions = await self._versions(session)
+        if versions != self._loaded:
+            await self._reload(session, versions)
+
+    async def _reload(self, session: AsyncSession, versions: dict[str, int]) -> None:
+        scopes = (await session.execute(select(UserScope.user_id, UserScope.warehouse_id, UserScope.branch_id))).all()
+        warehouses = (await session.execute(select(Warehouse.id, Warehouse.branch_id))).all()
+
+        self._warehouses.clear()
+        self._branches.clear()
+        self._branch_warehouses.clear()
+        self._branch_users.clear()
+        for warehouse_id, branch_id in warehouses:
+            self._branch_warehouses[branch_id].add(warehouse_id)
+        for user_id, warehouse_id, branch_id in scopes:
+            if warehouse_id is not None:
+                self._warehouses[user_id].add(warehouse_id)
+            else:
+                self._branches[user_id].add(branch_id)
+                self._branch_users[branch_id].add(user_id)
+
+        self._compiled = {}
+        for user_id in self._warehouses.keys() | self._branches.keys():
+            self._compile(user_id)
+        self._loaded = versions
+        self.reloads += 1
+
+    def _compile(self, user_id: int) -> None:
+        direct = self._warehouses.get(user_id)
+        branches = self._branches.get(user_id)
+        if not direct and not branches:
+            self._compiled.pop(user_id, None)
+            return
+        ids = set(direct or ())
+        for branch_id in branches or ():
+            ids |= self._branch_warehouses.get(branch_id, set())
+        self._compiled[user_id] = frozenset(ids)
+
+    def allowed(self, user_id: int) -> frozenset[int] | None:
+        """Compiled warehouse ids of user_id; None if the user has no grants at all."""
+        return self._compiled.get(user_id)
+
+    async def _advance(self, session: AsyncSession, kind: str) -> bool:
+        """After this worker committed a bump of `kind`: True if the change should be applied in place.
+
+        reference_cache publishes the bump on commit, so `version` is ours.
+        The index is either one behind it, or a refresh between the commit
+        and this call already reloaded at `version`. Both are safe to patch,
+        because applying a grant or revocation twice changes nothing. Any
+        other gap means another worker changed something too, so the next
+        refresh reloads instead.
+        """
+        if self._loaded is None:
+            return False
+        version = (await reference_cache.version(session, kind))[0]
+        if self._loaded.get(kind) not in (version - 1, version):
+            return False
+        self._loaded = {**self._loaded, kind: version}
+        self.updates += 1
+        return True
+
+    async def granted(self, session: AsyncSession, user_id: int, warehouse_id: int | None, branch_id: int | None) -> None:
+        """Call after committing a new user_scopes row (and its "user_scopes" bump)."""
+        if not await self._advance(session, "user_scopes"):
+            return
+        if warehouse_id is not None:
+            self._warehouses[user_id].add(warehouse_id)
+        else:
+            self._branches[user_id].add(branch_id)
+            self._branch_users[branch_id].add(user_id)
+        self._compile(user_id)
+
+    async def revoked(self, session: AsyncSession, user_id: int, warehouse_id: int | None, branch_id: int | None) -> None:
+        """Call after committing the deletion of a user_scopes row (and its "user_scopes" bump)."""
+        if not await self._advance(session, "user_scopes"):
+            return
+        if warehouse_id is not None:
+            self._warehouses[user_id].discard(warehouse_id)
+        else:
+            self._branches[user_id].discard(branch_id)
+            self._branch_users[branch_id].discard(user_id)
+        self._compile(user_id)
+
+    async def warehouse_added(self, session: AsyncSession, warehouse_id: int, branch_id: int) -> None:
+        """Call after committing a new warehouse (and its "warehouses" bump): branch grants now cover it."""
+        if not await self._advance(session, "warehouses"):
+            return
+        self._branch_warehouses[branch_id].add(warehouse_id)
+        for user_id in self._branch_users.get(branch_id, ()):
+            self._compile(user_id)
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._compiled),
+            "versions": self._loaded,
+            "reloads": self.reloads,
+            "incremental_updates": self.updates,
+        }
+
+
+permission_index = PermissionIndex()
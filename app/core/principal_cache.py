@@ -0,0 +1,105 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """What the auth dependency hands to routers: a detached, immutable view of a User."""
+    id: int
+    full_name: str
+    email: str
+    role: str
+    is_active: bool = True
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(id=user.id, full_name=user.full_name, email=user.email, role=user.role, is_active=user.is_active)
+
+
+class PrincipalCache:
+    """Per-process TTL + LRU cache of principals keyed by user id.
+
+    A deactivation or role change is picked up after at most ttl_seconds,
+    however it was made. That includes claims baked into tokens
+    (AUTH_TOKEN_CLAIMS): they are trusted only for ttl_seconds after the
+    token was issued, and after that the user is read from the database like
+    on a cache miss. Code that changes users can call invalidate(user_id) to
+    have this worker drop the entry, and distrust claims issued before then,
+    right away.
+    """
+
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: OrderedDict[int, tuple[float, Principal]] = OrderedDict()
+        self._invalidated_at: dict[int, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: int) -> Principal | None:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, principal = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return principal
+
+    def put(self, principal: Principal) -> None:
+        if self.max_size <= 0 or self.ttl_seconds <= 0:
+            return
+        self._entries[principal.id] = (time.monotonic() + self.ttl_seconds, principal)
+        self._entries.move_to_end(principal.id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+
+        now = time.time()
+        self._invalidated_at[user_id] = now
+        # nothing issued before (now - token lifetime) can still be presented
+        horizon = now - settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        for uid in [uid for uid, at in self._invalidated_at.items() if at < horizon]:
+            del self._invalidated_at[uid]
+
+    def trusts_claims(self, user_id: int, issued_at: float | None) -> bool:
+        """True if claims in a token issued at `issued_at` may stand in for a database lookup."""
+        if issued_at is None or issued_at < time.time() - self.ttl_seconds:
+            return False
+        return not self.invalidated_since(user_id, issued_at)
+
+    def invalidated_since(self, user_id: int, issued_at: float | None) -> bool:
+        at = self._invalidated_at.get(user_id)
+        if at is None:
+            return False
+        return issued_at is None or issued_at <= at
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._invalidated_at.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+principal_cache = PrincipalCache(settings.AUTH_CACHE_TTL_SECONDS, settings.AUTH_CACHE_MAX_SIZE)
@@ -5,16 +5,21 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.core.config import settings
+from app.core.principal_cache import Principal, principal_cache
+from app.core.permissions import WarehouseScope, permission_index
 from app.db.session import get_session
 from app.models.user import User
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
+# roles that are never limited to assigned warehouses
+WAREHOUSE_SCOPE_UNRESTRICTED_ROLES = ("admin",)
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
     session: AsyncSession = Depends(get_session),
-) -> User:
+) -> Principal:
     if not credentials or credentials.scheme.lower() != "bearer":
         raise HTTPException(status_code=401, detail="Missing Authorization header")
 
@@ -28,21 +33,56 @@ async def get_current_user(
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = (
-        await session.execute(
-            select(User).where(User.id == int(user_id), User.is_active == True)
+    user_id = int(user_id)
+    principal = principal_cache.get(user_id)
+    if principal:
+        return principal
+
+    if (
+        settings.AUTH_TOKEN_CLAIMS
+        and "role" in payload
+        and principal_cache.trusts_claims(user_id, payload.get("iat"))
+    ):
+        if not payload.get("active"):
+            raise HTTPException(status_code=401, detail="User not found or inactive")
+        principal = Principal(
+            id=user_id,
+            full_name=payload.get("name", ""),
+            email=payload.get("email", ""),
+            role=payload["role"],
         )
-    ).scalar_one_or_none()
+    else:
+        user = (
+            await session.execute(
+                select(User).where(User.id == user_id, User.is_active == True)
+            )
+        ).scalar_one_or_none()
 
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found or inactive")
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found or inactive")
+        principal = Principal.from_user(user)
 
-    return user
+    principal_cache.put(principal)
+    return principal
 
 
 def require_roles(*roles: str):
-    async def checker(user: User = Depends(get_current_user)) -> User:
+    async def checker(user: Principal = Depends(get_current_user)) -> Principal:
         if user.role not in roles:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
         return user
     return checker
+
+
+async def get_warehouse_scope(
+    user: Principal = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+) -> WarehouseScope:
+    """Warehouses the caller may see and act on, from the compiled permission index."""
+    if user.role in WAREHOUSE_SCOPE_UNRESTRICTED_ROLES:
+        return WarehouseScope(None)
+    await permission_index.refresh(session)
+    allowed = permission_index.allowed(user.id)
+    if allowed is None:
+        return WarehouseScope(None if settings.WAREHOUSE_SCOPE_UNASSIGNED_SEES_ALL else frozenset())
+    return WarehouseScope(allowed)
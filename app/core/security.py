@@ -1,6 +1,11 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict
+from typing import Any, Callable, Dict
 
+from fastapi import HTTPException, status
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
@@ -16,7 +21,71 @@ def verify_password(password: str, password_hash: str) -> bool:
     return pwd_context.verify(password, password_hash)
 
 
-def create_access_token(subject: str, expires_minutes: int = 60) -> str:
-    expire = datetime.now(timezone.utc) + timedelta(minutes=expires_minutes)
-    to_encode: Dict[str, Any] = {"sub": subject, "exp": expire}
+class PasswordHasherPool:
+    """Bounded thread pool for bcrypt (it releases the GIL while hashing).
+
+    max_workers caps how many hashes run at once; max_pending caps how many
+    calls may be queued or running before new ones are rejected with 503.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int = 0):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        self._queue_times: deque[float] = deque(maxlen=1024)
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, fn: Callable, *args):
+        if self.max_pending and self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many concurrent logins, retry")
+
+        submitted = time.perf_counter()
+
+        def job():
+            self._queue_times.append(time.perf_counter() - submitted)
+            return fn(*args)
+
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, job)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def stats(self) -> dict:
+        times = sorted(self._queue_times)
+
+        def pct(p: float) -> float:
+            return round(times[min(len(times) - 1, int(len(times) * p))] * 1000, 3) if times else 0.0
+
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_ms_p50": pct(0.50),
+            "queue_ms_p99": pct(0.99),
+            "queue_ms_max": pct(1.0),
+        }
+
+
+password_pool = PasswordHasherPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
+
+
+async def hash_password_async(password: str) -> str:
+    return await password_pool.run(hash_password, password)
+
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    return await password_pool.run(verify_password, password, password_hash)
+
+
+def create_access_token(subject: str, expires_minutes: int = 60, claims: Dict[str, Any] | None = None) -> str:
+    now = datetime.now(timezone.utc)
+    expire = now + timedelta(minutes=expires_minutes)
+    to_encode: Dict[str, Any] = {**(claims or {}), "sub": subject, "iat": now, "exp": expire}
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
@@ -0,0 +1,13 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def dialect_insert(session: AsyncSession):
+    """insert() of the session's dialect, for INSERT ... ON CONFLICT statements."""
+    name = session.bind.dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"INSERT ... ON CONFLICT is not supported for dialect {name}")
+    return insert
@@ -0,0 +1,172 @@
+import asyncio
+import itertools
+import logging
+import time
+
+from fastapi import Depends, Request, Response
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import install_db_instrumentation
+from app.db.session import AsyncSessionLocal, _engine_kwargs
+
+logger = logging.getLogger("app.db")
+
+# read-your-writes token: unix time (ms) until which the client reads from the primary
+RYW_HEADER = "X-Read-Your-Writes"
+RYW_COOKIE = "ryw"
+
+# seconds the replica is behind; 0 when it has replayed everything it received
+# (an idle primary leaves pg_last_xact_replay_timestamp() old without any real lag)
+_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class Replica:
+    def __init__(self, url: str):
+        self.url = url
+        self.engine = create_async_engine(url, **_engine_kwargs(url))
+        install_db_instrumentation(self.engine.sync_engine)
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+        # out of rotation until the first health check passes
+        self.healthy = False
+        self.lag_seconds: float | None = None
+        self.error: str | None = None
+        self.picked = 0
+
+    async def _probe(self) -> float:
+        async with self.engine.connect() as conn:
+            if self.engine.dialect.name == "postgresql":
+                return float((await conn.execute(_LAG_SQL)).scalar())
+            await conn.execute(text("SELECT 1"))
+            return 0.0
+
+    async def check(self) -> None:
+        try:
+            self.lag_seconds = await asyncio.wait_for(self._probe(), timeout=settings.DB_REPLICA_CHECK_TIMEOUT_SECONDS)
+        except Exception as e:
+            if self.healthy:
+                logger.warning("replica %s: out of rotation: %r", self._name, e)
+            self.healthy, self.error = False, repr(e)
+            return
+
+        healthy = self.lag_seconds <= settings.DB_REPLICA_MAX_LAG_SECONDS
+        if healthy != self.healthy:
+            logger.info("replica %s: %s (lag %.1fs)", self._name, "in rotation" if healthy else "lagging", self.lag_seconds)
+        self.healthy = healthy
+        self.error = None if healthy else f"lag {self.lag_seconds:.1f}s"
+
+    @property
+    def _name(self) -> str:
+        return make_url(self.url).render_as_string(hide_password=True)
+
+
+class ReplicaRouter:
+    """Round-robin over the healthy read replicas in DATABASE_REPLICA_URLS.
+
+    A background task checks every replica each DB_REPLICA_CHECK_SECONDS
+    (connectivity and, on Postgres, replay lag); unreachable or lagging ones
+    are skipped until they pass again. With no healthy replica reads go to
+    the primary.
+    """
+
+    def __init__(self, urls: list[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self._rr = itertools.count()
+        self._task: asyncio.Task | None = None
+        self.primary_reads = 0
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.replicas)
+
+    def pick(self) -> async_sessionmaker:
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            self.primary_reads += 1
+            return AsyncSessionLocal
+        replica = healthy[next(self._rr) % len(healthy)]
+        replica.picked += 1
+        return replica.sessionmaker
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(r.check() for r in self.replicas))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.check_all()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("replica health check failed")
+            await asyncio.sleep(settings.DB_REPLICA_CHECK_SECONDS)
+
+    def start(self) -> None:
+        if self._task is None and self.replicas:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for r in self.replicas:
+            await r.engine.dispose()
+
+    def stats(self) -> dict:
+        return {
+            "primary_reads": self.primary_reads,
+            "replicas": [
+                {"url": r._name, "healthy": r.healthy, "lag_seconds": r.lag_seconds, "error": r.error, "picked": r.picked}
+                for r in self.replicas
+            ],
+        }
+
+
+replicas = ReplicaRouter([u.strip() for u in settings.DATABASE_REPLICA_URLS.split(",") if u.strip()])
+
+
+def _pinned_to_primary(request: Request) -> bool:
+    token = request.headers.get(RYW_HEADER) or request.cookies.get(RYW_COOKIE)
+    if not token:
+        return False
+    try:
+        until = int(token) / 1000
+    except ValueError:
+        return False
+    now = time.time()
+    # a token further out than one window was not issued by us; don't let it pin forever
+    return now < until <= now + settings.DB_READ_YOUR_WRITES_SECONDS + 1
+
+
+def get_read_sessionmaker(request: Request) -> async_sessionmaker:
+    """Where this request's reads go: a replica, or the primary right after the client wrote."""
+    if not replicas.configured or _pinned_to_primary(request):
+        return AsyncSessionLocal
+    return replicas.pick()
+
+
+async def get_read_session(sessionmaker: async_sessionmaker = Depends(get_read_sessionmaker)):
+    """Session for read-only endpoints (GET); may see data a replica has not replayed yet."""
+    async with sessionmaker() as session:
+        yield session
+
+
+@event.listens_for(Session, "after_commit")
+def _issue_read_your_writes(session: Session) -> None:
+    # get_session puts the response in session.info; background sessions have none
+    response: Response | None = session.info.get("response")
+    if response is None or not replicas.configured:
+        return
+    until = str(int((time.time() + settings.DB_READ_YOUR_WRITES_SECONDS) * 1000))
+    response.headers[RYW_HEADER] = until
+    response.set_cookie(RYW_COOKIE, until, max_age=int(settings.DB_READ_YOUR_WRITES_SECONDS) + 1, httponly=True, samesite="lax")
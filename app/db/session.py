@@ -1,10 +1,126 @@
+import json
+import logging
+import random
+import time
+
+from fastapi import Response
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.core.metrics import install_db_instrumentation, record_pool_wait
+
+logger = logging.getLogger("app.db")
+sql_logger = logging.getLogger("app.sql")
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that reports how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            record_pool_wait(time.perf_counter() - started)
+
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+# SQLAlchemy names pool loggers after the pool class; keep ours as quiet as the stock one
+logging.getLogger(f"{__name__}.{InstrumentedPool.__name__}").setLevel(logging.WARNING)
+
+
+def _engine_kwargs(database_url: str) -> dict:
+    url = make_url(database_url)
+    kwargs = {
+        "echo": False,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if url.get_backend_name() != "sqlite" or url.database not in (None, "", ":memory:"):
+        kwargs.update(
+            poolclass=InstrumentedPool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    if url.get_driver_name() == "asyncpg":
+        connect_args = {"prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE}
+        if settings.DB_STATEMENT_TIMEOUT_MS:
+            connect_args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+        kwargs["connect_args"] = connect_args
+    return kwargs
+
+
+engine = create_async_engine(settings.DATABASE_URL, **_engine_kwargs(settings.DATABASE_URL))
 
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
-async def get_session():
+install_db_instrumentation(engine.sync_engine)
+
+
+def _install_sql_logging(sync_engine, mode: str, sample_rate: float) -> None:
+    rate = 1.0 if mode == "all" else sample_rate
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._sql_log_start = time.perf_counter() if random.random() < rate else None
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_sql_log_start", None)
+        if started is None:
+            return
+        sql_logger.info(json.dumps({
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            "statement": " ".join(statement.split())[:1000],
+            "executemany": executemany,
+            "rowcount": cursor.rowcount,
+        }))
+
+
+if settings.SQL_LOG in ("sampled", "all"):
+    _install_sql_logging(engine.sync_engine, settings.SQL_LOG, settings.SQL_LOG_SAMPLE_RATE)
+
+
+async def log_pool_report() -> dict:
+    """Logs the effective pool configuration at startup and checks it against Postgres max_connections."""
+    pool = engine.pool
+    per_worker = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    report = {
+        "url": engine.url.render_as_string(hide_password=True),
+        "pool_class": type(pool).__name__,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "statement_timeout_ms": settings.DB_STATEMENT_TIMEOUT_MS,
+        "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+        "sql_log": settings.SQL_LOG,
+        "workers": settings.WEB_CONCURRENCY,
+        "max_connections_per_worker": per_worker,
+        "max_connections_total": per_worker * settings.WEB_CONCURRENCY,
+    }
+
+    if engine.dialect.name == "postgresql":
+        try:
+            async with engine.connect() as conn:
+                report["server_max_connections"] = int((await conn.execute(text("SHOW max_connections"))).scalar())
+        except Exception as e:
+            logger.warning("could not read max_connections: %s", e)
+
+    logger.info("db pool: %s", json.dumps(report))
+    if report.get("server_max_connections") and report["max_connections_total"] > report["server_max_connections"]:
+        logger.warning(
+            "db pool: %d workers x %d connections exceeds max_connections=%d",
+            settings.WEB_CONCURRENCY, per_worker, report["server_max_connections"],
+        )
+    return report
+
+
+async def get_session(response: Response):
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        # commits issue a read-your-writes token on this response, see app/db/replicas.py
+        session.info["response"] = response
+        yield session
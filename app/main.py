@@ -1,4 +1,16 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from app.core.metrics import DbMetricsMiddleware
+from app.core.config import settings
+from app.db.session import log_pool_report
+from app.db.replicas import replicas
+from app.services.event_hub import event_hub
+from app.services.projector import projector
+from app.services.stock_ledger import stock_snapshotter
+from app.services.sla import sla_scheduler
+import app.services.status_counts  # registers its projection
 from app.routers.health import router as health_router
 from app.routers.auth import router as auth_router
 from app.routers.branches import router as branches_router
@@ -6,8 +18,41 @@ from app.routers.warehouses import router as warehouses_router
 from app.routers.materials import router as materials_router
 from app.routers.transfers import router as transfers_router
 from app.routers.stocks import router as stocks_router
+from app.routers.metrics import router as metrics_router
+from app.routers.reports import router as reports_router
+from app.routers.export import router as export_router
+from app.routers.scopes import router as scopes_router
+
+_app_logger = logging.getLogger("app")
+if not _app_logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(levelname)s [%(name)s] %(message)s"))
+    _app_logger.addHandler(_handler)
+    _app_logger.setLevel(logging.INFO)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await log_pool_report()
+    replicas.start()
+    if settings.EVENT_STREAM_ENABLED:
+        event_hub.start()
+    if settings.PROJECTOR_ENABLED:
+        projector.start()
+    if settings.STOCK_SNAPSHOT_INTERVAL_SECONDS > 0:
+        stock_snapshotter.start()
+    if settings.SLA_SCHEDULER_ENABLED:
+        sla_scheduler.start()
+    yield
+    await sla_scheduler.stop()
+    await stock_snapshotter.stop()
+    await projector.stop()
+    await event_hub.stop()
+    await replicas.stop()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(DbMetricsMiddleware)
 
 app.include_router(health_router)
 app.include_router(auth_router)
@@ -16,6 +61,10 @@ app.include_router(warehouses_router)
 app.include_router(materials_router)
 app.include_router(transfers_router)
 app.include_router(stocks_router)
+app.include_router(metrics_router)
+app.include_router(reports_router)
+app.include_router(export_router)
+app.include_router(scopes_router)
 
 @app.get("/")
 async def root():
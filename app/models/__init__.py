@@ -4,4 +4,12 @@ from app.models.warehouse import Warehouse
 from app.models.material import Material
 from app.models.transfer import Transfer
 from app.models.transfer_event import TransferEvent
-from app.models.current_stock import CurrentStock
\ No newline at end of file
+from app.models.current_stock import CurrentStock
+from app.models.idempotency_key import IdempotencyKey
+from app.models.stock_summary import StockSummary
+from app.models.projector_checkpoint import ProjectorCheckpoint
+from app.models.transfer_status_count import TransferStatusCount
+from app.models.stock_movement import StockMovement
+from app.models.stock_snapshot import StockSnapshot
+from app.models.reference_version import ReferenceVersion
+from app.models.user_scope import UserScope
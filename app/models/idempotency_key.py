@@ -0,0 +1,18 @@
+from datetime import datetime
+from sqlalchemy import String, DateTime, Integer, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class IdempotencyKey(Base):
+    __tablename__ = 'idempotency_keys'
+
+    key: Mapped[str] = mapped_column(String(200), primary_key=True)
+    # what the key was first used for, e.g. "dispatch:42"; reuse for anything else is a 409
+    scope: Mapped[str] = mapped_column(String(100), nullable=False)
+
+    status_code: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    response_json: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
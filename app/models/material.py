@@ -1,4 +1,4 @@
-from sqlalchemy import String, Boolean, DateTime
+from sqlalchemy import String, Boolean, DateTime, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime
 
@@ -7,6 +7,10 @@ from app.db.base import Base
 
 class Material(Base):
     __tablename__= 'materials'
+    # plus, on Postgres only: GIN (lower(name) gin_trgm_ops) for /materials/search
+    __table_args__ = (
+        Index('ix_materials_category', 'category'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
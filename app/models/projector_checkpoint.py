@@ -0,0 +1,15 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, String, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class ProjectorCheckpoint(Base):
+    """Position in the transfer_events log up to which a projection has been applied."""
+    __tablename__ = 'projector_checkpoints'
+
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    last_txid: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    last_event_id: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,14 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, String, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class ReferenceVersion(Base):
+    """Change counter per reference table ("branches", "warehouses", "materials", "user_scopes"), bumped by writes."""
+    __tablename__ = 'reference_versions'
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
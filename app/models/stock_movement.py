@@ -0,0 +1,26 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, Integer, Numeric, String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class StockMovement(Base):
+    """Append-only ledger of on-hand changes; the sum of qty per (warehouse, material) is current_stock."""
+    __tablename__ = 'stock_movements'
+    __table_args__ = (
+        Index("ix_stock_movements_warehouse_id_created_at", "warehouse_id", "created_at"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+
+    warehouse_id: Mapped[int] = mapped_column(ForeignKey("warehouses.id"), nullable=False)
+    material_id: Mapped[int] = mapped_column(ForeignKey("materials.id"), nullable=False, index=True)
+    # signed: negative for dispatch, positive for receive
+    qty: Mapped[float] = mapped_column(Numeric(14, 3), nullable=False)
+    # "opening", "dispatch", "receive" or "adjustment"
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)
+    # NULL for opening/adjustment rows and for transfers that have been archived
+    transfer_id: Mapped[int | None] = mapped_column(ForeignKey("transfers.id"), nullable=True, index=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,16 @@
+from datetime import datetime
+from sqlalchemy import Numeric, DateTime, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class StockSnapshot(Base):
+    """On-hand balance per (warehouse, material) as of taken_at, folded from the movement ledger."""
+    __tablename__ = 'stock_snapshots'
+
+    warehouse_id: Mapped[int] = mapped_column(ForeignKey("warehouses.id"), primary_key=True)
+    taken_at: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    material_id: Mapped[int] = mapped_column(ForeignKey("materials.id"), primary_key=True)
+
+    on_hand_qty: Mapped[float] = mapped_column(Numeric(14, 3), nullable=False)
@@ -0,0 +1,18 @@
+from sqlalchemy import Numeric, String, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class StockSummary(Base):
+    """Per (warehouse, material category) totals, kept up to date by dispatch/receive."""
+    __tablename__ = 'stock_summary'
+
+    warehouse_id: Mapped[int] = mapped_column(ForeignKey("warehouses.id"), primary_key=True)
+    # materials.category, '' for uncategorized
+    category: Mapped[str] = mapped_column(String(255), primary_key=True)
+    branch_id: Mapped[int] = mapped_column(ForeignKey("branches.id"), nullable=False, index=True)
+
+    on_hand_qty: Mapped[float] = mapped_column(Numeric(14, 3), nullable=False, default=0)
+    # shipped towards this warehouse and not received yet
+    in_transit_qty: Mapped[float] = mapped_column(Numeric(14, 3), nullable=False, default=0)
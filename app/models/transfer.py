@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import String, DateTime, ForeignKey, Numeric, CheckConstraint
+from sqlalchemy import Integer, String, DateTime, ForeignKey, Numeric, CheckConstraint, Index
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
@@ -10,7 +10,21 @@ class Transfer(Base):
 
     __table_args__=(
         CheckConstraint('planned_qty>0', name='ck_transfers_planned_qty_positive'),
-        CheckConstraint('from_warehouse_id<>to_warehouse_id', name='ck_transfers_from_to_diff')
+        CheckConstraint('from_warehouse_id<>to_warehouse_id', name='ck_transfers_from_to_diff'),
+        # keyset pagination: every list filter is (filter column, id) so "ORDER BY id DESC LIMIT n" is an index scan
+        Index('ix_transfers_status_id', 'status', 'id'),
+        Index('ix_transfers_from_warehouse_id_id', 'from_warehouse_id', 'id'),
+        Index('ix_transfers_to_warehouse_id_id', 'to_warehouse_id', 'id'),
+        Index('ix_transfers_material_id_id', 'material_id', 'id'),
+        Index('ix_transfers_driver_id_id', 'driver_id', 'id'),
+        Index('ix_transfers_deadline_at', 'deadline_at'),
+        # SLA scheduler: open transfers by deadline
+        Index('ix_transfers_status_deadline_at', 'status', 'deadline_at'),
+        # archival scan: closed transfers not touched since the cutoff
+        Index('ix_transfers_status_updated_at', 'status', 'updated_at'),
+        Index('ix_transfers_operator_id', 'operator_id'),
+        Index('ix_transfers_storekeeper_from_id', 'storekeeper_from_id'),
+        Index('ix_transfers_storekeeper_to_id', 'storekeeper_to_id'),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -25,6 +39,9 @@ class Transfer(Base):
     damaged_qty: Mapped[float] = mapped_column(Numeric(12, 3), nullable=False, default=0)
 
     status: Mapped[str] = mapped_column(String(50), nullable=False, default='draft')
+    # bumped by every status change; transitions are UPDATE ... WHERE id=? AND version=?
+    # (see app/services/transfer_states.py)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
 
     operator_id: Mapped[int] = mapped_column(ForeignKey('users.id'), nullable=True)
     storekeeper_from_id: Mapped[int] = mapped_column(ForeignKey('users.id'), nullable=True)
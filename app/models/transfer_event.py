@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import String, DateTime, ForeignKey, Text
+from sqlalchemy import BigInteger, Numeric, String, DateTime, FetchedValue, ForeignKey, Index, Text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
@@ -7,15 +7,34 @@ from app.db.base import Base
 
 class TransferEvent(Base):
     __tablename__ = 'transfer_events'
+    # On Postgres the table is range-partitioned by month on event_time and its
+    # primary key is (id, event_time); id alone still comes from one sequence.
+    __table_args__ = (
+        Index("ix_transfer_events_transfer_id_id", "transfer_id", "id"),
+        Index("ix_transfer_events_actor_user_id", "actor_user_id"),
+        # log position read by the projector, see app/services/projector.py
+        Index("ix_transfer_events_txid_id", "txid", "id"),
+        Index("ix_transfer_events_event_type_event_time", "event_type", "event_time"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
     transfer_id: Mapped[int] = mapped_column(ForeignKey('transfers.id'), nullable=False)
     event_type: Mapped[str] = mapped_column(String(50), nullable=False)
-    actor_user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), nullable=False)
+    # NULL for events raised by the system (e.g. "overdue" from the SLA scheduler)
+    actor_user_id: Mapped[int | None] = mapped_column(ForeignKey('users.id'), nullable=True)
 
-    event_time: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    event_time: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
     payload_json: Mapped[str | None] = mapped_column(Text, nullable=True)
-    idempotency_key: Mapped[str | None] = mapped_column(String(200), unique=True, nullable=True)
-    
\ No newline at end of file
+    # quantities from the payload, typed so reports can aggregate them in SQL
+    planned_qty: Mapped[float | None] = mapped_column(Numeric(14, 3), nullable=True)
+    shipped_qty: Mapped[float | None] = mapped_column(Numeric(14, 3), nullable=True)
+    received_qty: Mapped[float | None] = mapped_column(Numeric(14, 3), nullable=True)
+    damaged_qty: Mapped[float | None] = mapped_column(Numeric(14, 3), nullable=True)
+    # not unique: a partitioned table can only enforce uniqueness together with event_time.
+    # Requests are deduplicated by idempotency_keys (app/services/idempotency.py).
+    idempotency_key: Mapped[str | None] = mapped_column(String(200), index=True, nullable=True)
+
+    # id of the writing transaction (DEFAULT txid_current() on Postgres, NULL elsewhere)
+    txid: Mapped[int | None] = mapped_column(BigInteger, server_default=FetchedValue(), nullable=True)
@@ -0,0 +1,24 @@
+from datetime import datetime
+from sqlalchemy import DateTime, ForeignKey, CheckConstraint, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class UserScope(Base):
+    """Grants a user one warehouse, or every warehouse of one branch (see app/core/permissions.py)."""
+    __tablename__ = 'user_scopes'
+
+    __table_args__ = (
+        CheckConstraint('(warehouse_id IS NULL) <> (branch_id IS NULL)', name='ck_user_scopes_one_target'),
+        # NULLs are distinct, so each index only constrains its own kind of grant
+        Index('ux_user_scopes_user_id_warehouse_id', 'user_id', 'warehouse_id', unique=True),
+        Index('ux_user_scopes_user_id_branch_id', 'user_id', 'branch_id', unique=True),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    warehouse_id: Mapped[int | None] = mapped_column(ForeignKey('warehouses.id', ondelete='CASCADE'), nullable=True)
+    branch_id: Mapped[int | None] = mapped_column(ForeignKey('branches.id', ondelete='CASCADE'), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
@@ -5,7 +5,7 @@ from sqlalchemy import select
 from app.db.session import get_session
 from app.models.user import User
 from app.schemas.auth import LoginRequest, TokenResponse
-from app.core.security import create_access_token, verify_password
+from app.core.security import create_access_token, verify_password_async
 from app.core.config import settings
 from app.core.rbac import get_current_user
 
@@ -17,10 +17,16 @@ async def login(data:LoginRequest, session: AsyncSession = Depends(get_session))
     stmt = select(User).where(User.email == data.email, User.is_active == True)
     user = (await session.execute(stmt)).scalar_one_or_none()
 
-    if not user or not verify_password(data.password, user.password_hash):
+    if not user or not await verify_password_async(data.password, user.password_hash):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     
-    token = create_access_token(subject=str(user.id), expires_minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    claims = None
+    if settings.AUTH_TOKEN_CLAIMS:
+        claims = {"role": user.role, "active": user.is_active, "name": user.full_name, "email": user.email}
+
+    token = create_access_token(
+        subject=str(user.id), expires_minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES, claims=claims
+    )
 
     return TokenResponse(access_token=token)
 
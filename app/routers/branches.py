@@ -1,15 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.db.session import get_session
+from app.db.replicas import get_read_session
 from app.core.rbac import require_roles
 from app.models.branch import Branch
 from app.schemas.branch import BranchCreate, BranchOut
+from app.services.reference_cache import reference_cache
 from typing import List
 
 router = APIRouter(prefix='/branch', tags=['branch'])
 
+_branch_list = TypeAdapter(List[BranchOut])
+
 @router.post('', response_model=BranchOut)
 async def create_branch(
     data: BranchCreate,
@@ -18,6 +23,7 @@ async def create_branch(
 ):
     branch = Branch(name = data.name)
     session.add(branch)
+    await reference_cache.bump(session, "branches")
     await session.commit()
     await session.refresh(branch)
     return branch
@@ -25,16 +31,21 @@ async def create_branch(
 
 @router.get('', response_model=List[BranchOut])
 async def list_branches(
-    session: AsyncSession = Depends(get_session),
+    if_none_match: str | None = Header(default=None),
+    session: AsyncSession = Depends(get_session),  # primary: see ReferenceCache.get
     user = Depends(require_roles('admin', 'operator', 'manager')),
 ):
-    res = await session.execute(select(Branch).where())
-    return res.scalars().all()
+    async def build():
+        res = await session.execute(select(Branch).order_by(Branch.id))
+        return _branch_list.dump_json(_branch_list.validate_python(res.scalars().all(), from_attributes=True))
+
+    entry = await reference_cache.get(session, "branches", (), build)
+    return reference_cache.respond(entry, if_none_match)
 
 @router.get('\{branch_id}', response_model=BranchOut)
 async def get_branch(
     branch_id: int, 
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     user = Depends(require_roles('admin', 'operator', 'manager')),
 ):
     branch = (await session.execute(select(Branch).where(Branch.id == branch_id))).scalar_one_or_none()
@@ -0,0 +1,94 @@
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app.core.rbac import require_roles, get_warehouse_scope
+from app.core.permissions import WarehouseScope
+from app.db.replicas import get_read_sessionmaker
+from app.models.current_stock import CurrentStock
+from app.models.transfer import Transfer
+from app.models.transfer_event import TransferEvent
+from app.schemas.transfer import TransferFilter
+from app.services.export import stream_export
+from app.services.transfers import filter_transfers, _to_naive_utc
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _export_response(stmt, name: str, fmt: str, gzip: bool, sessionmaker) -> StreamingResponse:
+    filename = f"{name}.{fmt}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        stream_export(stmt, fmt, compress=gzip, sessionmaker=sessionmaker),
+        media_type="application/gzip" if gzip else MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/transfers")
+async def export_transfers(
+    filters: TransferFilter = Depends(),
+    format: Literal["csv", "ndjson"] = Query(default="csv"),
+    gzip: bool = Query(default=False),
+    sessionmaker=Depends(get_read_sessionmaker),
+    user=Depends(require_roles("admin", "operator", "manager")),
+    scope: WarehouseScope = Depends(get_warehouse_scope),
+):
+    """All transfers matching the GET /transfers filters, in id order."""
+    stmt = (
+        filter_transfers(select(*Transfer.__table__.columns), filters)
+        .where(scope.where(Transfer.from_warehouse_id, Transfer.to_warehouse_id))
+        .order_by(Transfer.id)
+    )
+    return _export_response(stmt, "transfers", format, gzip, sessionmaker)
+
+
+@router.get("/events")
+async def export_events(
+    transfer_id: int | None = Query(default=None),
+    event_type: str | None = Query(default=None),
+    event_time_from: datetime | None = Query(default=None),
+    event_time_to: datetime | None = Query(default=None),
+    format: Literal["csv", "ndjson"] = Query(default="ndjson"),
+    gzip: bool = Query(default=False),
+    sessionmaker=Depends(get_read_sessionmaker),
+    user=Depends(require_roles("admin", "operator", "manager")),
+    scope: WarehouseScope = Depends(get_warehouse_scope),
+):
+    """Transfer events in id order; event_time window is [from, to)."""
+    stmt = select(*TransferEvent.__table__.columns)
+    if scope.warehouse_ids is not None:
+        in_scope = select(Transfer.id).where(scope.where(Transfer.from_warehouse_id, Transfer.to_warehouse_id))
+        stmt = stmt.where(TransferEvent.transfer_id.in_(in_scope))
+    if transfer_id is not None:
+        stmt = stmt.where(TransferEvent.transfer_id == transfer_id)
+    if event_type is not None:
+        stmt = stmt.where(TransferEvent.event_type == event_type)
+    if event_time_from is not None:
+        stmt = stmt.where(TransferEvent.event_time >= _to_naive_utc(event_time_from))
+    if event_time_to is not None:
+        stmt = stmt.where(TransferEvent.event_time < _to_naive_utc(event_time_to))
+    return _export_response(stmt.order_by(TransferEvent.id), "transfer_events", format, gzip, sessionmaker)
+
+
+@router.get("/stocks")
+async def export_stocks(
+    warehouse_id: int | None = Query(default=None),
+    material_id: int | None = Query(default=None),
+    format: Literal["csv", "ndjson"] = Query(default="csv"),
+    gzip: bool = Query(default=False),
+    sessionmaker=Depends(get_read_sessionmaker),
+    user=Depends(require_roles("admin", "operator", "manager", "storekeeper")),
+    scope: WarehouseScope = Depends(get_warehouse_scope),
+):
+    """current_stock with the GET /stocks/ filters."""
+    stmt = select(*CurrentStock.__table__.columns).where(scope.where(CurrentStock.warehouse_id))
+    if warehouse_id is not None:
+        stmt = stmt.where(CurrentStock.warehouse_id == warehouse_id)
+    if material_id is not None:
+        stmt = stmt.where(CurrentStock.material_id == material_id)
+    return _export_response(stmt.order_by(CurrentStock.warehouse_id, CurrentStock.material_id), "stocks", format, gzip, sessionmaker)
@@ -1,5 +1,15 @@
 from fastapi import APIRouter, Depends
 from app.core.rbac import require_roles
+from app.core.principal_cache import principal_cache
+from app.core.permissions import permission_index
+from app.core.security import password_pool
+from app.db.replicas import replicas
+from app.services.event_hub import event_hub
+from app.services.projector import projector
+from app.services.reports import report_cache
+from app.services.reference_cache import reference_cache
+from app.services.stock_ledger import stock_snapshotter
+from app.services.sla import sla_scheduler
 
 router = APIRouter(prefix="/health", tags=["Health"])
 
@@ -9,4 +19,53 @@ async def health():
 
 @router.get("/admin-only")
 async def admin_only(user=Depends(require_roles("admin"))):
-    return {"ok": True, "user": user.email}
\ No newline at end of file
+    return {"ok": True, "user": user.email}
+
+@router.get("/auth-cache")
+async def auth_cache_stats(user=Depends(require_roles("admin"))):
+    return principal_cache.stats()
+
+
+@router.get("/password-pool")
+async def password_pool_stats(user=Depends(require_roles("admin"))):
+    return password_pool.stats()
+
+
+@router.get("/event-hub")
+async def event_hub_stats(user=Depends(require_roles("admin"))):
+    return event_hub.stats()
+
+
+@router.get("/projector")
+async def projector_stats(user=Depends(require_roles("admin"))):
+    return projector.stats()
+
+
+@router.get("/stock-snapshots")
+async def stock_snapshot_stats(user=Depends(require_roles("admin"))):
+    return stock_snapshotter.stats()
+
+
+@router.get("/report-cache")
+async def report_cache_stats(user=Depends(require_roles("admin"))):
+    return report_cache.stats()
+
+
+@router.get("/reference-cache")
+async def reference_cache_stats(user=Depends(require_roles("admin"))):
+    return reference_cache.stats()
+
+
+@router.get("/sla")
+async def sla_stats(user=Depends(require_roles("admin"))):
+    return sla_scheduler.stats()
+
+
+@router.get("/replicas")
+async def replica_stats(user=Depends(require_roles("admin"))):
+    return replicas.stats()
+
+
+@router.get("/permissions")
+async def permission_index_stats(user=Depends(require_roles("admin"))):
+    return permission_index.stats()
@@ -1,16 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List
 
 from app.db.session import get_session
+from app.db.replicas import get_read_session
 from app.models.material import Material
-from app.schemas.material import MaterialCreate, MaterialOut
+from app.schemas.material import MaterialCreate, MaterialOut, MaterialSearchHit
+from app.services.material_search import search_materials
 from app.core.rbac import require_roles
+from app.services.reference_cache import reference_cache
 
 
 router = APIRouter(prefix='/materials', tags=['materials'])
 
+_material_list = TypeAdapter(List[MaterialOut])
+
 @router.post('', response_model=MaterialOut)
 async def create_material(
     data: MaterialCreate,
@@ -19,6 +25,7 @@ async def create_material(
 ):
     m = Material(name=data.name, category=data.category, unit=data.unit)
     session.add(m)
+    await reference_cache.bump(session, "materials")
     await session.commit()
     await session.refresh(m)
 
@@ -27,22 +34,39 @@ async def create_material(
 @router.get('', response_model=List[MaterialOut])
 async def list_materials(
     q: str | None = Query(default=None, description="search by name"),
-    session: AsyncSession = Depends(get_session),
+    if_none_match: str | None = Header(default=None),
+    session: AsyncSession = Depends(get_session),  # primary: see ReferenceCache.get
     user = Depends(require_roles('admin', 'operator', 'manager'))
 ):
-    stmt = select(Material)
-    if q: 
-        stmt = stmt.where(Material.name.ilike(f'%{q}%'))
-    stmt = stmt.order_by(Material.id)
+    async def build():
+        stmt = select(Material)
+        if q:
+            stmt = stmt.where(Material.name.ilike(f'%{q}%'))
+        stmt = stmt.order_by(Material.id)
 
-    res = await session.execute(stmt)
+        res = await session.execute(stmt)
+        return _material_list.dump_json(_material_list.validate_python(res.scalars().all(), from_attributes=True))
 
-    return res.scalars().all()
+    entry = await reference_cache.get(session, "materials", (q or None,), build)
+    return reference_cache.respond(entry, if_none_match)
+
+@router.get("/search", response_model=List[MaterialSearchHit])
+async def search(
+    q: str = Query(min_length=1, max_length=100),
+    category: str | None = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=100),
+    session: AsyncSession = Depends(get_read_session),
+    user = Depends(require_roles('admin', 'operator', 'manager', 'storekeeper')),
+):
+    """Autocomplete: names starting with q first, then fuzzy matches ranked by similarity."""
+    hits = await search_materials(session, q, category, limit)
+    return [MaterialSearchHit(id=m.id, name=m.name, category=m.category, unit=m.unit, is_active=m.is_active, score=round(score, 4))
+            for m, score in hits]
 
 @router.get("/{material_id}", response_model=MaterialOut)
 async def get_material(
     material_id: int,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     user=Depends(require_roles("admin", "operator", "manager")),
 ):
     m = (await session.execute(select(Material).where(Material.id == material_id))).scalar_one_or_none()
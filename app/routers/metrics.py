@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import registry
+from app.core.principal_cache import principal_cache
+from app.core.security import password_pool
+from app.db.session import engine
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    extra = {f"auth_cache_{k}": v for k, v in principal_cache.stats().items()}
+    extra.update({f"password_pool_{k}": v for k, v in password_pool.stats().items()})
+
+    pool = engine.pool
+    if hasattr(pool, "checkedout"):
+        extra["db_pool_size"] = pool.size()
+        extra["db_pool_checked_out"] = pool.checkedout()
+        extra["db_pool_overflow"] = pool.overflow()
+
+    return PlainTextResponse(registry.render(extra), media_type="text/plain; version=0.0.4")
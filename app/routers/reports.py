@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.replicas import get_read_session
+from app.core.rbac import require_roles, get_warehouse_scope
+from app.core.permissions import WarehouseScope
+from app.schemas.report import DiscrepancyReport
+from app.services.reports import discrepancy_report, report_cache
+from app.services.transfers import _to_naive_utc
+
+router = APIRouter(prefix="/reports", tags=["Reports"])
+
+
+@router.get("/discrepancies", response_model=DiscrepancyReport)
+async def discrepancies(
+    date_from: datetime | None = Query(default=None),
+    date_to: datetime | None = Query(default=None),
+    group_by: Literal["route", "material", "storekeeper"] = Query(default="route"),
+    warehouse_id: int | None = Query(default=None),
+    session: AsyncSession = Depends(get_read_session),
+    user=Depends(require_roles("admin", "operator", "manager")),
+    scope: WarehouseScope = Depends(get_warehouse_scope),
+):
+    """Damage and shortfall for deliveries confirmed in [date_from, date_to); defaults to the last 30 days."""
+    # the default window ends at the next full minute, so repeated calls share a cache entry
+    date_to = _to_naive_utc(date_to) or datetime.utcnow().replace(second=0, microsecond=0) + timedelta(minutes=1)
+    date_from = _to_naive_utc(date_from) or date_to - timedelta(days=30)
+    if date_from >= date_to:
+        raise HTTPException(400, "date_from must be before date_to")
+    if warehouse_id is not None:
+        scope.check(warehouse_id)
+
+    # users with different scopes must not share an entry
+    key = ("discrepancies", date_from, date_to, group_by, warehouse_id, scope.warehouse_ids)
+    return await report_cache.get_or_compute(
+        key, date_to, lambda: discrepancy_report(session, date_from, date_to, group_by, warehouse_id, scope)
+    )
@@ -0,0 +1,75 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from app.db.session import get_session
+from app.core.rbac import require_roles
+from app.core.permissions import permission_index
+from app.models.branch import Branch
+from app.models.user import User
+from app.models.user_scope import UserScope
+from app.models.warehouse import Warehouse
+from app.schemas.user_scope import UserScopeCreate, UserScopeOut
+from app.services.reference_cache import reference_cache
+
+router = APIRouter(prefix="/scopes", tags=["Scopes"])
+
+
+@router.get("", response_model=list[UserScopeOut])
+async def list_scopes(
+    user_id: int | None = Query(default=None),
+    session: AsyncSession = Depends(get_session),
+    user=Depends(require_roles("admin")),
+):
+    stmt = select(UserScope)
+    if user_id is not None:
+        stmt = stmt.where(UserScope.user_id == user_id)
+    res = await session.execute(stmt.order_by(UserScope.id))
+    return res.scalars().all()
+
+
+@router.post("", response_model=UserScopeOut)
+async def grant_scope(
+    data: UserScopeCreate,
+    session: AsyncSession = Depends(get_session),
+    user=Depends(require_roles("admin")),
+):
+    """Gives a user one warehouse, or every warehouse of a branch (including ones added later)."""
+    # VALIDATION
+    if (await session.get(User, data.user_id)) is None:
+        raise HTTPException(400, "User does not exist")
+    if data.warehouse_id is not None and (await session.get(Warehouse, data.warehouse_id)) is None:
+        raise HTTPException(400, "Warehouse does not exist")
+    if data.branch_id is not None and (await session.get(Branch, data.branch_id)) is None:
+        raise HTTPException(400, "Branch does not exist")
+
+    target = UserScope.warehouse_id == data.warehouse_id if data.warehouse_id is not None else UserScope.branch_id == data.branch_id
+    existing = (
+        await session.execute(select(UserScope).where(UserScope.user_id == data.user_id, target))
+    ).scalar_one_or_none()
+    if existing is not None:
+        return existing
+
+    scope = UserScope(user_id=data.user_id, warehouse_id=data.warehouse_id, branch_id=data.branch_id)
+    session.add(scope)
+    await reference_cache.bump(session, "user_scopes")
+    await session.commit()
+    await permission_index.granted(session, scope.user_id, scope.warehouse_id, scope.branch_id)
+    return scope
+
+
+@router.delete("/{scope_id}")
+async def revoke_scope(
+    scope_id: int,
+    session: AsyncSession = Depends(get_session),
+    user=Depends(require_roles("admin")),
+):
+    scope = await session.get(UserScope, scope_id)
+    if scope is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Scope not found")
+
+    await session.delete(scope)
+    await reference_cache.bump(session, "user_scopes")
+    await session.commit()
+    await permission_index.revoked(session, scope.user_id, scope.warehouse_id, scope.branch_id)
+    return {"ok": True}
@@ -1,12 +1,19 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List
+from sqlalchemy import select, func
+from typing import List, Literal
+from datetime import datetime
 
 from app.db.session import get_session
-from app.core.rbac import require_roles
+from app.db.replicas import get_read_session
+from app.core.rbac import require_roles, get_warehouse_scope
+from app.core.permissions import WarehouseScope
 from app.models.current_stock import CurrentStock
-from app.schemas.stock import StockOut
+from app.models.stock_summary import StockSummary
+from app.schemas.stock import StockOut, StockSummaryOut, StockAsOfOut, LedgerMismatchOut
+from app.services.stock_summary import rebuild_stock_summary
+from app.services.stock_ledger import balances_query, ledger_check_query, reconcile_ledger, take_snapshot
+from app.services.transfers import _to_naive_utc
 
 router = APIRouter(prefix="/stocks", tags=["Stocks"])
 
@@ -15,14 +22,97 @@ router = APIRouter(prefix="/stocks", tags=["Stocks"])
 async def list_stocks(
     warehouse_id: int | None = Query(default=None),
     material_id: int | None = Query(default=None),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     user=Depends(require_roles("admin", "operator", "manager", "storekeeper")),
+    scope: WarehouseScope = Depends(get_warehouse_scope),
 ):
-    stmt = select(CurrentStock)
+    stmt = select(CurrentStock).where(scope.where(CurrentStock.warehouse_id))
     if warehouse_id is not None:
         stmt = stmt.where(CurrentStock.warehouse_id == warehouse_id)
     if material_id is not None:
         stmt = stmt.where(CurrentStock.material_id == material_id)
 
     res = await session.execute(stmt.order_by(CurrentStock.warehouse_id, CurrentStock.material_id))
-    return res.scalars().all()
\ No newline at end of file
+    return res.scalars().all()
+
+
+@router.get('/summary', response_model=List[StockSummaryOut])
+async def stock_summary(
+    group_by: Literal["branch", "warehouse", "category"] = Query(default="branch"),
+    branch_id: int | None = Query(default=None),
+    session: AsyncSession = Depends(get_read_session),
+    user=Depends(require_roles("admin", "operator", "manager")),
+    scope: WarehouseScope = Depends(get_warehouse_scope),
+):
+    keys = {
+        "branch": [StockSummary.branch_id],
+        "warehouse": [StockSummary.branch_id, StockSummary.warehouse_id],
+        "category": [StockSummary.category],
+    }[group_by]
+
+    stmt = select(
+        *keys,
+        func.sum(StockSummary.on_hand_qty).label("on_hand_qty"),
+        func.sum(StockSummary.in_transit_qty).label("in_transit_qty"),
+    ).where(scope.where(StockSummary.warehouse_id))
+    if branch_id is not None:
+        stmt = stmt.where(StockSummary.branch_id == branch_id)
+    stmt = stmt.group_by(*keys).order_by(*keys)
+
+    res = await session.execute(stmt)
+    return [StockSummaryOut(**row) for row in res.mappings()]
+
+
+@router.post('/summary/rebuild')
+async def rebuild_summary(
+    session: AsyncSession = Depends(get_session),
+    user=Depends(require_roles("admin")),
+):
+    rows = await rebuild_stock_summary(session)
+    await session.commit()
+    return {"rows": rows}
+
+
+@router.get('/as-of', response_model=List[StockAsOfOut])
+async def stock_as_of(
+    at: datetime = Query(...),
+    warehouse_id: int = Query(...),
+    material_id: int | None = Query(default=None),
+    session: AsyncSession = Depends(get_read_session),
+    user=Depends(require_roles("admin", "operator", "manager", "storekeeper")),
+    scope: WarehouseScope = Depends(get_warehouse_scope),
+):
+    """On-hand quantities at a past moment: nearest snapshot plus the movements since."""
+    scope.check(warehouse_id)
+    res = await session.execute(balances_query(_to_naive_utc(at), warehouse_id, material_id))
+    return [StockAsOfOut(**row) for row in res.mappings()]
+
+
+@router.post('/snapshots')
+async def create_snapshot(
+    session: AsyncSession = Depends(get_session),
+    user=Depends(require_roles("admin")),
+):
+    rows = await take_snapshot(session)
+    await session.commit()
+    return {"rows": rows}
+
+
+@router.get('/ledger/check', response_model=List[LedgerMismatchOut])
+async def ledger_check(
+    session: AsyncSession = Depends(get_read_session),
+    user=Depends(require_roles("admin")),
+):
+    """(warehouse, material) pairs where the movement ledger and current_stock disagree."""
+    res = await session.execute(ledger_check_query())
+    return [LedgerMismatchOut(**row) for row in res.mappings()]
+
+
+@router.post('/ledger/reconcile')
+async def ledger_reconcile(
+    session: AsyncSession = Depends(get_session),
+    user=Depends(require_roles("admin")),
+):
+    rows = await reconcile_ledger(session)
+    await session.commit()
+    return {"adjusted": rows}
@@ -1,17 +1,37 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List
+from sqlalchemy import select, func, or_
+from typing import List, Literal
 
 from app.db.session import get_session
-from app.core.rbac import require_roles
-from app.schemas.transfer import (TransferCreate, TransferOut, DispatchRequest, ReceiveRequest)
+from app.db.replicas import get_read_session, get_read_sessionmaker
+from app.core.config import settings
+from app.core.rbac import require_roles, get_warehouse_scope
+from app.core.permissions import WarehouseScope
+from app.schemas.transfer import (
+    TransferCreate, TransferOut, DispatchRequest, ReceiveRequest,
+    TransferBulkCreate, TransferBulkResult, TransferBulkItemResult, TransferFilter,
+    DispatchBatchRequest, ReceiveBatchRequest, TransferBatchResult, TransferStatusCountOut,
+    OverdueTransferOut,
+)
 from app.schemas.transfer_event import TransferEventOut
 from app.schemas.transfer_assign import TransferAssignRequest
+from app.schemas.route_plan import RoutePlanRequest, RoutePlan, RoutePlanApply, RoutePlanApplyResult
 from app.models.transfer import Transfer
 from app.models.transfer_event import TransferEvent
+from app.models.transfer_status_count import TransferStatusCount
 
-from app.services.transfers import create_transfer, dispatch_transfer, receive_transfer, assign_transfer
+from app.services.event_hub import stream_events
+from app.services.projector import projector
+from app.services.sla import sla_scheduler
+from app.services.route_planning import plan_routes, apply_route_plan
+from app.services.status_counts import STATUS_COUNTS
+from app.services.idempotency import begin_idempotent, finish_idempotent
+from app.services.transfers import (
+    filter_transfers, create_transfer, create_transfers_bulk, dispatch_transfer, receive_transfer, assign_transfer,
+    dispatch_transfers_batch, receive_transfers_batch,
+)
 
 
 router = APIRouter(prefix="/transfers", tags=["Transfers"])
@@ -23,27 +43,244 @@ async def create(
     data: TransferCreate,
     session: AsyncSession = Depends(get_session),
     user=Depends(require_roles("admin", "operator")),
+    scope: WarehouseScope = Depends(get_warehouse_scope),
 ):
+    scope.check(data.from_warehouse_id, data.to_warehouse_id)
     t = await create_transfer(session, operator_id=user.id, data=data)
     await session.commit()
     await session.refresh(t)
     return t
 
+def _check_batch_size(n: int) -> None:
+    if n > settings.TRANSFER_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.TRANSFER_BULK_MAX_ITEMS} items per batch",
+        )
+
+@router.post("/bulk", response_model=TransferBulkResult)
+async def create_bulk(
+    data: TransferBulkCreate,
+    session: AsyncSession = Depends(get_session),
+    user=Depends(require_roles("admin", "operator")),
+    scope: WarehouseScope = Depends(get_warehouse_scope),
+):
+    _check_batch_size(len(data.items))
+    for item in data.items:
+        scope.check(item.from_warehouse_id, item.to_warehouse_id)
+
+    pairs = await create_transfers_bulk(session, operator_id=user.id, items=data.items)
+    await session.commit()
+
+    results = [
+        TransferBulkItemResult(
+            index=i,
+            ok=t is not None,
+            transfer=TransferOut.model_validate(t) if t is not None else None,
+            error=error,
+        )
+        for i, (t, error) in enumerate(pairs)
+    ]
+    created = sum(1 for r in results if r.ok)
+    return TransferBulkResult(created=created, failed=len(results) - created, results=results)
+
+async def _stream_transfers(stmt, sessionmaker):
+    # own session: the response body is produced after the request dependencies are done
+    async with sessionmaker() as session:
+        rows = await session.stream_scalars(stmt.execution_options(yield_per=500))
+        yield b"["
+        first = True
+        async for part in rows.partitions():
+            chunk = b",".join(TransferOut.model_validate(t).model_dump_json().encode() for t in part)
+            yield chunk if first else b"," + chunk
+            first = False
+        yield b"]"
+
+def _batch_result(items, pairs) -> TransferBatchResult:
+    results = [
+        TransferBulkItemResult(
+            index=i,
+            ok=t is not None,
+            transfer_id=item.transfer_id,
+            transfer=TransferOut.model_validate(t) if t is not None else None,
+            error=error,
+        )
+        for i, (item, (t, error)) in enumerate(zip(items, pairs))
+    ]
+    succeeded = sum(1 for r in results if r.ok)
+    return TransferBatchResult(succeeded=succeeded, failed=len(results) - succeeded, results=results)
+
+@router.post("/dispatch-batch", response_model=TransferBatchResult)
+async def dispatch_batch(
+    data: DispatchBatchRequest,
+    session: AsyncSession = Depends(get_session),
+    user=Depends(require_roles("admin", "storekeeper")),
+    warehouses: WarehouseScope = Depends(get_warehouse_scope),
+):
+    _check_batch_size(len(data.items))
+    replay = await begin_idempotent(session, data.idempotency_key, scope="dispatch-batch")
+    if replay is not None:
+        return replay
+
+    pairs = await dispatch_transfers_batch(session, actor_id=user.id, items=data.items, idempotency_key=data.idempotency_key, scope=warehouses)
+    await session.flush()
+    out = _batch_result(data.items, pairs)
+    await finish_idempotent(session, data.idempotency_key, out)
+    await session.commit()
+    return out
+
+@router.post("/receive-batch", response_model=TransferBatchResult)
+async def receive_batch(
+    data: ReceiveBatchRequest,
+    session: AsyncSession = Depends(get_session),
+    user=Depends(require_roles("admin", "storekeeper")),
+    warehouses: WarehouseScope = Depends(get_warehouse_scope),
+):
+    _check_batch_size(len(data.items))
+    replay = await begin_idempotent(session, data.idempotency_key, scope="receive-batch")
+    if replay is not None:
+        return replay
+
+    pairs = await receive_transfers_batch(session, actor_id=user.id, items=data.items, idempotency_key=data.idempotency_key, scope=warehouses)
+    await session.flush()
+    out = _batch_result(data.items, pairs)
+    await finish_idempotent(session, data.idempotency_key, out)
+    await session.commit()
+    return out
+
+@router.post("/plan", response_model=RoutePlan)
+async def plan(
+    data: RoutePlanRequest,
+    session: AsyncSession = Depends(get_session),
+    user=Depends(require_roles("admin", "operator")),
+    scope: WarehouseScope = Depends(get_warehouse_scope),
+):
+    """Proposes truck loads per lane and drivers for a day's open transfers; nothing is written."""
+    return await plan_routes(session, data, scope=scope)
+
+@router.post("/plan/apply", response_model=RoutePlanApplyResult)
+async def apply_plan(
+    data: RoutePlanApply,
+    session: AsyncSession = Depends(get_session),
+    user=Depends(require_roles("admin", "operator")),
+    scope: WarehouseScope = Depends(get_warehouse_scope),
+):
+    """Assigns drivers to the given loads (usually a reviewed /transfers/plan proposal) in bulk."""
+    out = await apply_route_plan(session, actor_id=user.id, loads=data.loads, scope=scope)
+    await session.commit()
+    return out
+
+@router.get("/events/stream")
+async def stream(
+    warehouse_id: int | None = Query(default=None),
+    driver_id: int | None = Query(default=None),
+    transfer_id: int | None = Query(default=None),
+    last_event_id: int | None = Header(default=None),
+    user=Depends(require_roles("admin", "operator", "manager", "storekeeper", "driver")),
+    scope: WarehouseScope = Depends(get_warehouse_scope),
+):
+    """Server-sent events for new transfer events; reconnect with Last-Event-ID to resume."""
+    if not settings.EVENT_STREAM_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Event stream is disabled")
+    if scope.warehouse_ids is not None:
+        # subscriptions filter on one warehouse; scoped users have to pick one of theirs
+        if warehouse_id is None:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="warehouse_id is required")
+        scope.check(warehouse_id)
+
+    return StreamingResponse(
+        stream_events(last_event_id, warehouse_id=warehouse_id, driver_id=driver_id, transfer_id=transfer_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/status-counts", response_model=list[TransferStatusCountOut])
+async def status_counts(
+    group_by: Literal["status", "route"] = Query(default="status"),
+    warehouse_id: int | None = Query(default=None),
+    session: AsyncSession = Depends(get_read_session),
+    user=Depends(require_roles("admin", "operator", "manager")),
+    scope: WarehouseScope = Depends(get_warehouse_scope),
+):
+    """Transfers per status, from the projected read model (may trail the log by a poll interval)."""
+    keys = {
+        "status": [TransferStatusCount.status],
+        "route": [TransferStatusCount.from_warehouse_id, TransferStatusCount.to_warehouse_id, TransferStatusCount.status],
+    }[group_by]
+
+    stmt = select(*keys, func.sum(TransferStatusCount.count).label("count")).where(
+        scope.where(TransferStatusCount.from_warehouse_id, TransferStatusCount.to_warehouse_id)
+    )
+    if warehouse_id is not None:
+        stmt = stmt.where(
+            or_(TransferStatusCount.from_warehouse_id == warehouse_id, TransferStatusCount.to_warehouse_id == warehouse_id)
+        )
+    stmt = stmt.group_by(*keys).having(func.sum(TransferStatusCount.count) != 0).order_by(*keys)
+
+    res = await session.execute(stmt)
+    return [TransferStatusCountOut(**row) for row in res.mappings()]
+
+@router.post("/status-counts/rebuild")
+async def rebuild_status_counts(
+    session: AsyncSession = Depends(get_session),
+    user=Depends(require_roles("admin")),
+):
+    """Replays the whole event log into the status counts."""
+    await projector.replay(session, STATUS_COUNTS)
+    await session.commit()
+    return {"ok": True}
+
+@router.get("/overdue", response_model=list[OverdueTransferOut])
+async def overdue(
+    warehouse_id: int | None = Query(default=None),
+    driver_id: int | None = Query(default=None),
+    user=Depends(require_roles("admin", "operator", "manager")),
+    scope: WarehouseScope = Depends(get_warehouse_scope),
+):
+    """Open transfers past their deadline, served from the SLA scheduler's memory."""
+    if not sla_scheduler.running:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="SLA scheduler is not running")
+    items = sla_scheduler.list_overdue(warehouse_id=warehouse_id, driver_id=driver_id)
+    return [t for t in items if scope.allows(t.from_warehouse_id, t.to_warehouse_id)]
+
 @router.get("", response_model=list[TransferOut])
 async def list_transfers(
-    session: AsyncSession = Depends(get_session),
+    response: Response,
+    filters: TransferFilter = Depends(),
+    cursor: int | None = Query(default=None, description="return transfers with id < cursor (X-Next-Cursor of the previous page)"),
+    limit: int = Query(default=100, ge=1),
+    stream: bool = Query(default=False, description="stream the page row by row instead of building it in memory"),
+    sessionmaker=Depends(get_read_sessionmaker),
+    session: AsyncSession = Depends(get_read_session),
     user=Depends(require_roles("admin", "operator", "manager")),
+    scope: WarehouseScope = Depends(get_warehouse_scope),
 ):
-    res = await session.execute(select(Transfer).order_by(Transfer.id.desc()))
-    return res.scalars().all()
+    max_limit = settings.TRANSFER_STREAM_MAX_LIMIT if stream else settings.TRANSFER_PAGE_MAX_LIMIT
+    if limit > max_limit:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_CONTENT, detail=f"limit must be <= {max_limit}")
+
+    stmt = filter_transfers(select(Transfer), filters).where(scope.where(Transfer.from_warehouse_id, Transfer.to_warehouse_id))
+    if cursor is not None:
+        stmt = stmt.where(Transfer.id < cursor)
+    stmt = stmt.order_by(Transfer.id.desc()).limit(limit)
+
+    if stream:
+        return StreamingResponse(_stream_transfers(stmt, sessionmaker), media_type="application/json")
+
+    rows = (await session.execute(stmt)).scalars().all()
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+    return rows
 
 @router.get("/{transfer_id}", response_model=TransferOut)
 async def get_one(
     transfer_id: int,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     user=Depends(require_roles("admin", "operator", "manager")),
+    scope: WarehouseScope = Depends(get_warehouse_scope),
 ):
     t = (await session.execute(select(Transfer).where(Transfer.id == transfer_id))).scalar_one()
+    scope.check(t.from_warehouse_id, t.to_warehouse_id)
     return t
 
 @router.post("/{transfer_id}/dispatch", response_model=TransferOut)
@@ -52,11 +289,18 @@ async def dispatch(
     data: DispatchRequest,
     session: AsyncSession = Depends(get_session),
     user=Depends(require_roles("admin", "storekeeper")),
+    warehouses: WarehouseScope = Depends(get_warehouse_scope),
 ):
-    t = await dispatch_transfer(session, transfer_id, actor_id=user.id, shipped_qty=data.shipped_qty, seal_number=data.seal_number, idempotency_key=data.idempotency_key)
+    replay = await begin_idempotent(session, data.idempotency_key, scope=f"dispatch:{transfer_id}")
+    if replay is not None:
+        return replay
+
+    t = await dispatch_transfer(session, transfer_id, actor_id=user.id, shipped_qty=data.shipped_qty, seal_number=data.seal_number, idempotency_key=data.idempotency_key, scope=warehouses)
+    await session.flush()
+    out = TransferOut.model_validate(t)
+    await finish_idempotent(session, data.idempotency_key, out)
     await session.commit()
-    await session.refresh(t)
-    return t
+    return out
 
 @router.post("/{transfer_id}/receive", response_model=TransferOut)
 async def receive(
@@ -64,18 +308,32 @@ async def receive(
     data: ReceiveRequest,
     session: AsyncSession = Depends(get_session),
     user=Depends(require_roles("admin", "storekeeper")),
+    warehouses: WarehouseScope = Depends(get_warehouse_scope),
 ):
-    t = await receive_transfer(session, transfer_id, actor_id=user.id, received_qty=data.received_qty, damaged_qty=data.damaged_qty, idempotency_key=data.idempotency_key)
+    replay = await begin_idempotent(session, data.idempotency_key, scope=f"receive:{transfer_id}")
+    if replay is not None:
+        return replay
+
+    t = await receive_transfer(session, transfer_id, actor_id=user.id, received_qty=data.received_qty, damaged_qty=data.damaged_qty, idempotency_key=data.idempotency_key, scope=warehouses)
+    await session.flush()
+    out = TransferOut.model_validate(t)
+    await finish_idempotent(session, data.idempotency_key, out)
     await session.commit()
-    await session.refresh(t)
-    return t
+    return out
 
 @router.get('/{transfer_id}/events', response_model=List[TransferEventOut])
 async def list_events(
     transfer_id: int,
-    session: AsyncSession = Depends(get_session),
-    user= Depends(require_roles("admin", "operator", "manager", "storekeeper", "driver"))
+    session: AsyncSession = Depends(get_read_session),
+    user= Depends(require_roles("admin", "operator", "manager", "storekeeper", "driver")),
+    scope: WarehouseScope = Depends(get_warehouse_scope),
 ):
+    if scope.warehouse_ids is not None:
+        ends = (
+            await session.execute(select(Transfer.from_warehouse_id, Transfer.to_warehouse_id).where(Transfer.id == transfer_id))
+        ).first()
+        if ends is not None:
+            scope.check(*ends)
     res = await session.execute(select(TransferEvent).where(TransferEvent.transfer_id == transfer_id).order_by(TransferEvent.id.asc()))
     return res.scalars().all()
 
@@ -85,8 +343,9 @@ async def assign(
     data: TransferAssignRequest,
     session: AsyncSession = Depends(get_session),
     user=Depends(require_roles("admin", "operator")),
+    scope: WarehouseScope = Depends(get_warehouse_scope),
 ):
-    t = await assign_transfer(session, transfer_id=transfer_id, actor_id=user.id, data=data)
+    t = await assign_transfer(session, transfer_id=transfer_id, actor_id=user.id, data=data, scope=scope)
     await session.commit()
     await session.refresh(t)
     return t
\ No newline at end of file
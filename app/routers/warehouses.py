@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.db.session import get_session
+from app.db.replicas import get_read_session
 from app.models.warehouse import Warehouse
 from app.models.branch import Branch
 from app.schemas.warehouse import WarehouseCreate, WarehouseOut
 from app.core.rbac import require_roles
+from app.services.reference_cache import reference_cache
+from app.core.permissions import permission_index
 
 router = APIRouter(prefix="/warehouses", tags=["Warehouses"])
 
+_warehouse_list = TypeAdapter(list[WarehouseOut])
+
 @router.post("", response_model=WarehouseOut)
 async def create_warehouse(
     data: WarehouseCreate,
@@ -21,28 +27,35 @@ async def create_warehouse(
 
     w = Warehouse(branch_id=data.branch_id, name=data.name, address=data.address)
     session.add(w)
+    await reference_cache.bump(session, "warehouses")
     await session.commit()
     await session.refresh(w)
+    await permission_index.warehouse_added(session, w.id, w.branch_id)
     return w
 
 @router.get("", response_model=list[WarehouseOut])
 async def list_warehouses(
     branch_id: int | None = Query(default=None),
-    session: AsyncSession = Depends(get_session),
+    if_none_match: str | None = Header(default=None),
+    session: AsyncSession = Depends(get_session),  # primary: see ReferenceCache.get
     user=Depends(require_roles("admin", "operator", "manager")),
 ):
-    stmt = select(Warehouse)
-    if branch_id is not None:
-        stmt = stmt.where(Warehouse.branch_id == branch_id)
-    stmt = stmt.order_by(Warehouse.id)
+    async def build():
+        stmt = select(Warehouse)
+        if branch_id is not None:
+            stmt = stmt.where(Warehouse.branch_id == branch_id)
+        stmt = stmt.order_by(Warehouse.id)
 
-    res = await session.execute(stmt)
-    return res.scalars().all()
+        res = await session.execute(stmt)
+        return _warehouse_list.dump_json(_warehouse_list.validate_python(res.scalars().all(), from_attributes=True))
+
+    entry = await reference_cache.get(session, "warehouses", (branch_id,), build)
+    return reference_cache.respond(entry, if_none_match)
 
 @router.get("/{warehouse_id}", response_model=WarehouseOut)
 async def get_warehouse(
     warehouse_id: int,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     user=Depends(require_roles("admin", "operator", "manager")),
 ):
     w = (await session.execute(select(Warehouse).where(Warehouse.id == warehouse_id))).scalar_one_or_none()
@@ -16,4 +16,8 @@ class MaterialOut(BaseModel):
     is_active: bool
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class MaterialSearchHit(MaterialOut):
+    # word similarity of the query to the name, 0..1
+    score: float
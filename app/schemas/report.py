@@ -0,0 +1,33 @@
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class DiscrepancyRow(BaseModel):
+    from_warehouse_id: int | None = None
+    to_warehouse_id: int | None = None
+    material_id: int | None = None
+    storekeeper_id: int | None = None
+
+    transfers: int
+    discrepancies: int
+    planned_qty: float
+    shipped_qty: float
+    received_qty: float
+    damaged_qty: float
+    # shipped but neither received nor reported damaged
+    shortfall_qty: float
+
+    damage_rate: float | None
+    shortfall_rate: float | None
+    # per-transfer rates; Postgres only
+    p50_damage_rate: float | None = None
+    p90_damage_rate: float | None = None
+    p90_shortfall_rate: float | None = None
+
+
+class DiscrepancyReport(BaseModel):
+    date_from: datetime
+    date_to: datetime
+    group_by: str
+    generated_at: datetime
+    rows: list[DiscrepancyRow]
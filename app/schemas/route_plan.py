@@ -0,0 +1,53 @@
+from datetime import date, datetime
+from pydantic import BaseModel, Field
+
+
+class RoutePlanRequest(BaseModel):
+    day: date = Field(description="transfers with deadline_at on this day (UTC)")
+    truck_capacity: float | None = Field(default=None, gt=0, description="defaults to ROUTE_PLAN_TRUCK_CAPACITY")
+    driver_ids: list[int] | None = Field(default=None, description="defaults to all active drivers")
+    max_loads_per_driver: int | None = Field(default=None, ge=1)
+    include_undated: bool = Field(default=False, description="also plan open transfers without a deadline")
+
+
+class PlannedLoad(BaseModel):
+    from_warehouse_id: int
+    to_warehouse_id: int
+    driver_id: int | None = None
+    total_qty: float
+    # a single transfer larger than the truck capacity
+    oversize: bool = False
+    earliest_deadline_at: datetime | None = None
+    transfer_ids: list[int]
+
+
+class RoutePlan(BaseModel):
+    day: date
+    truck_capacity: float
+    transfers: int
+    lanes: int
+    unassigned_loads: int
+    loads: list[PlannedLoad]
+
+
+class LoadAssignment(BaseModel):
+    driver_id: int
+    transfer_ids: list[int] = Field(min_length=1)
+
+
+class RoutePlanApply(BaseModel):
+    loads: list[LoadAssignment] = Field(min_length=1)
+
+
+class RoutePlanSkipped(BaseModel):
+    transfer_id: int
+    error: str
+
+
+class RoutePlanApplyResult(BaseModel):
+    # draft -> assigned
+    assigned: int
+    # driver changed, status kept (already assigned, or a draft still missing storekeepers)
+    reassigned: int
+    unchanged: int
+    skipped: list[RoutePlanSkipped]
@@ -10,4 +10,24 @@ class StockOut(BaseModel):
 
     class Config:
         from_attributes = True
-        
\ No newline at end of file
+
+
+class StockSummaryOut(BaseModel):
+    branch_id: int | None = None
+    warehouse_id: int | None = None
+    category: str | None = None
+    on_hand_qty: float
+    in_transit_qty: float
+
+
+class StockAsOfOut(BaseModel):
+    warehouse_id: int
+    material_id: int
+    on_hand_qty: float
+
+
+class LedgerMismatchOut(BaseModel):
+    warehouse_id: int
+    material_id: int
+    ledger_qty: float
+    on_hand_qty: float
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 
 
@@ -10,6 +10,17 @@ class TransferCreate(BaseModel):
     deadline_at: datetime | None = None
 
 
+class TransferFilter(BaseModel):
+    status: str | None = None
+    warehouse_id: int | None = Field(default=None, description="from or to this warehouse")
+    from_warehouse_id: int | None = None
+    to_warehouse_id: int | None = None
+    material_id: int | None = None
+    driver_id: int | None = None
+    deadline_from: datetime | None = None
+    deadline_to: datetime | None = None
+
+
 class TransferOut(BaseModel):
     id: int
     from_warehouse_id: int
@@ -17,6 +28,7 @@ class TransferOut(BaseModel):
     material_id: int
     planned_qty: float
     status: str
+    version: int
     operator_id: int
 
     shipped_qty: float
@@ -41,4 +53,68 @@ class DispatchRequest(BaseModel):
 class ReceiveRequest(BaseModel):
     received_qty: float
     damaged_qty: float = 0
-    idempotency_key: str
\ No newline at end of file
+    idempotency_key: str
+
+class TransferBulkCreate(BaseModel):
+    items: list[TransferCreate] = Field(min_length=1)
+
+
+class TransferBulkItemResult(BaseModel):
+    index: int
+    ok: bool
+    transfer_id: int | None = None
+    transfer: TransferOut | None = None
+    error: str | None = None
+
+
+class TransferBulkResult(BaseModel):
+    created: int
+    failed: int
+    results: list[TransferBulkItemResult]
+
+
+class DispatchBatchItem(BaseModel):
+    transfer_id: int
+    shipped_qty: float
+    seal_number: str | None = None
+
+
+class DispatchBatchRequest(BaseModel):
+    items: list[DispatchBatchItem] = Field(min_length=1)
+    idempotency_key: str
+
+
+class ReceiveBatchItem(BaseModel):
+    transfer_id: int
+    received_qty: float
+    damaged_qty: float = 0
+
+
+class ReceiveBatchRequest(BaseModel):
+    items: list[ReceiveBatchItem] = Field(min_length=1)
+    idempotency_key: str
+
+
+class TransferBatchResult(BaseModel):
+    succeeded: int
+    failed: int
+    results: list[TransferBulkItemResult]
+
+
+class TransferStatusCountOut(BaseModel):
+    status: str
+    from_warehouse_id: int | None = None
+    to_warehouse_id: int | None = None
+    count: int
+
+
+class OverdueTransferOut(BaseModel):
+    transfer_id: int
+    deadline_at: datetime
+    status: str
+    from_warehouse_id: int
+    to_warehouse_id: int
+    driver_id: int | None = None
+
+    class Config:
+        from_attributes = True
@@ -6,9 +6,13 @@ class TransferEventOut(BaseModel):
     id: int
     transfer_id: int
     event_type: str
-    actor_user_id: int
+    actor_user_id: int | None
     event_time: datetime
     payload_json: str | None
+    planned_qty: float | None = None
+    shipped_qty: float | None = None
+    received_qty: float | None = None
+    damaged_qty: float | None = None
     idempotency_key: str | None
 
     class Config:
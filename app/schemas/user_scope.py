@@ -0,0 +1,25 @@
+from datetime import datetime
+from pydantic import BaseModel, model_validator
+
+
+class UserScopeCreate(BaseModel):
+    user_id: int
+    warehouse_id: int | None = None
+    branch_id: int | None = None
+
+    @model_validator(mode="after")
+    def one_target(self):
+        if (self.warehouse_id is None) == (self.branch_id is None):
+            raise ValueError("set exactly one of warehouse_id, branch_id")
+        return self
+
+
+class UserScopeOut(BaseModel):
+    id: int
+    user_id: int
+    warehouse_id: int | None = None
+    branch_id: int | None = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
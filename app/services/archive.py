@@ -0,0 +1,180 @@
+import csv
+import gzip
+import logging
+from datetime import date, datetime
+from pathlib import Path
+
+from sqlalchemy import select, update, delete, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.stock_movement import StockMovement
+from app.models.transfer import Transfer
+from app.models.transfer_event import TransferEvent
+from app.services.event_hub import event_rows_query
+from app.services.projector import projector
+import app.services.status_counts  # registers its projection, which archival has to keep in step
+
+logger = logging.getLogger("app.archive")
+
+CLOSED_STATUSES = ("received", "discrepancy")
+
+
+def add_months(d: date, n: int) -> date:
+    """First day of the month n months after d's month (n may be negative)."""
+    m = d.month - 1 + n
+    return date(d.year + m // 12, m % 12 + 1, 1)
+
+
+async def ensure_event_partitions(session: AsyncSession, months_ahead: int = 3) -> list[str]:
+    """Creates the monthly transfer_events partitions up to months_ahead from now (Postgres only).
+
+    Has to run before a month starts: once rows of a month land in the
+    DEFAULT partition, that month's partition can no longer be attached.
+    """
+    if session.bind.dialect.name != "postgresql":
+        return []
+    created = []
+    month = date.today().replace(day=1)
+    for _ in range(months_ahead + 1):
+        upper = add_months(month, 1)
+        name = f"transfer_events_p{month:%Y_%m}"
+        exists = (await session.execute(text("SELECT to_regclass(:name)"), {"name": name})).scalar()
+        if exists is None:
+            await session.execute(text(
+                f"CREATE TABLE {name} PARTITION OF transfer_events "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+            ))
+            created.append(name)
+        month = upper
+    return created
+
+
+async def drop_empty_event_partitions(session: AsyncSession, before: date) -> list[str]:
+    """Drops monthly transfer_events partitions that end before `before` and hold no rows anymore."""
+    if session.bind.dialect.name != "postgresql":
+        return []
+    names = (
+        await session.execute(text("""
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = 'transfer_events' AND c.relname ~ '^transfer_events_p[0-9]{4}_[0-9]{2}$'
+        """))
+    ).scalars().all()
+
+    dropped = []
+    for name in sorted(names):
+        year, month = int(name[-7:-3]), int(name[-2:])
+        if add_months(date(year, month, 1), 1) > before:
+            continue
+        if (await session.execute(text(f"SELECT EXISTS (SELECT 1 FROM {name})"))).scalar():
+            continue
+        await session.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    return dropped
+
+
+class CsvArchive:
+    """Appends rows of one table to <out_dir>/<table>-<stamp>.csv.gz."""
+
+    def __init__(self, out_dir: Path, table, stamp: str):
+        self.columns = [c.name for c in table.columns]
+        self.path = out_dir / f"{table.name}-{stamp}.csv.gz"
+        self._file = gzip.open(self.path, "wt", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.columns)
+        self.rows = 0
+
+    def write(self, rows) -> None:
+        for row in rows:
+            self._writer.writerow([getattr(row, c) for c in self.columns])
+            self.rows += 1
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+async def archive_closed_transfers(
+    session: AsyncSession, cutoff: datetime, out_dir: Path, batch_size: int = 1000, dry_run: bool = False
+) -> dict:
+    """Moves closed transfers last updated before cutoff, with their events, into gzip CSV files.
+
+    Works in batches, each committed on its own: the batch is written and
+    flushed to the files first, then deleted, so a crash can at worst leave
+    rows both in the files and in the database, never in neither. Ledger
+    rows stay in stock_movements (the balances depend on them) with
+    transfer_id cleared; a copy with the original transfer_id goes to the
+    archive. The deleted events are retracted from the projector's read
+    models in the same transaction (Projector.retract), so
+    transfer_status_counts leaves archived transfers out whether it is
+    followed live or rebuilt from the remaining log.
+    """
+    candidates = (
+        select(Transfer.id)
+        .where(Transfer.status.in_(CLOSED_STATUSES), Transfer.updated_at < cutoff)
+        .order_by(Transfer.id)
+    )
+    if dry_run:
+        ids = (await session.execute(candidates)).scalars().all()
+        return {"transfers": len(ids), "events": 0, "movements": 0, "files": []}
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    archives = {
+        "transfers": CsvArchive(out_dir, Transfer.__table__, stamp),
+        "events": CsvArchive(out_dir, TransferEvent.__table__, stamp),
+        "movements": CsvArchive(out_dir, StockMovement.__table__, stamp),
+    }
+    try:
+        while True:
+            ids = (
+                await session.execute(candidates.limit(batch_size).with_for_update(skip_locked=True))
+            ).scalars().all()
+            if not ids:
+                break
+
+            archives["transfers"].write(
+                (await session.execute(select(Transfer).where(Transfer.id.in_(ids)).order_by(Transfer.id))).scalars()
+            )
+            event_rows = (
+                await session.execute(event_rows_query().where(TransferEvent.transfer_id.in_(ids)).order_by(TransferEvent.id))
+            ).all()
+            archives["events"].write(row[0] for row in event_rows)
+            archives["movements"].write(
+                (
+                    await session.execute(
+                        select(StockMovement).where(StockMovement.transfer_id.in_(ids)).order_by(StockMovement.id)
+                    )
+                ).scalars()
+            )
+            for archive in archives.values():
+                archive.flush()
+
+            await projector.retract(session, event_rows)
+
+            await session.execute(
+                update(StockMovement).where(StockMovement.transfer_id.in_(ids)).values(transfer_id=None)
+                .execution_options(synchronize_session=False)
+            )
+            await session.execute(
+                delete(TransferEvent).where(TransferEvent.transfer_id.in_(ids)).execution_options(synchronize_session=False)
+            )
+            await session.execute(
+                delete(Transfer).where(Transfer.id.in_(ids)).execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            session.expunge_all()
+            logger.info("archived %d transfers (up to id %d)", len(ids), ids[-1])
+    finally:
+        for archive in archives.values():
+            archive.close()
+
+    return {
+        "transfers": archives["transfers"].rows,
+        "events": archives["events"].rows,
+        "movements": archives["movements"].rows,
+        "files": [str(a.path) for a in archives.values()],
+    }
@@ -0,0 +1,230 @@
+import asyncio
+import json
+import logging
+
+from sqlalchemy import select, func
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, engine
+from app.models.transfer import Transfer
+from app.models.transfer_event import TransferEvent
+from app.schemas.transfer_event import TransferEventOut
+
+logger = logging.getLogger("app.events")
+
+NOTIFY_CHANNEL = "transfer_events"
+
+
+def event_rows_query():
+    """transfer_events joined with the transfer columns subscribers filter on."""
+    return (
+        select(TransferEvent, Transfer.from_warehouse_id, Transfer.to_warehouse_id, Transfer.driver_id)
+        .join(Transfer, Transfer.id == TransferEvent.transfer_id)
+    )
+
+
+class StreamEvent:
+    """One event as sent to subscribers; the SSE frame is encoded once and shared by all of them."""
+    __slots__ = ("id", "transfer_id", "event_type", "from_warehouse_id", "to_warehouse_id", "driver_id", "frame")
+
+    def __init__(self, event: TransferEvent, from_warehouse_id: int, to_warehouse_id: int, driver_id: int | None):
+        self.id = event.id
+        self.transfer_id = event.transfer_id
+        self.event_type = event.event_type
+        self.from_warehouse_id = from_warehouse_id
+        self.to_warehouse_id = to_warehouse_id
+        self.driver_id = driver_id
+
+        data = TransferEventOut.model_validate(event).model_dump(mode="json")
+        data.update(from_warehouse_id=from_warehouse_id, to_warehouse_id=to_warehouse_id, driver_id=driver_id)
+        self.frame = f"id: {event.id}\nevent: {event.event_type}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+class Subscription:
+    def __init__(self, warehouse_id: int | None, driver_id: int | None, transfer_id: int | None, maxsize: int):
+        self.warehouse_id = warehouse_id
+        self.driver_id = driver_id
+        self.transfer_id = transfer_id
+        self.queue: asyncio.Queue[StreamEvent] = asyncio.Queue(maxsize=maxsize)
+        # set when the client could not keep up; it gets no more events and must resume by id
+        self.overflowed = False
+
+    def matches(self, e: StreamEvent) -> bool:
+        if self.transfer_id is not None and e.transfer_id != self.transfer_id:
+            return False
+        if self.driver_id is not None and e.driver_id != self.driver_id:
+            return False
+        if self.warehouse_id is not None and self.warehouse_id not in (e.from_warehouse_id, e.to_warehouse_id):
+            return False
+        return True
+
+    def filter_query(self, stmt):
+        if self.transfer_id is not None:
+            stmt = stmt.where(TransferEvent.transfer_id == self.transfer_id)
+        if self.driver_id is not None:
+            stmt = stmt.where(Transfer.driver_id == self.driver_id)
+        if self.warehouse_id is not None:
+            stmt = stmt.where(
+                (Transfer.from_warehouse_id == self.warehouse_id) | (Transfer.to_warehouse_id == self.warehouse_id)
+            )
+        return stmt
+
+
+class EventHub:
+    """In-process fan-out of committed transfer events to stream subscribers.
+
+    On Postgres every worker LISTENs on a channel that an AFTER INSERT
+    trigger on transfer_events NOTIFYs with the new event id (delivered at
+    commit), then loads those events in one query and publishes them. Other
+    databases fall back to polling for ids above the last one seen.
+    """
+
+    def __init__(self):
+        self.subscriptions: set[Subscription] = set()
+        self._task: asyncio.Task | None = None
+        self._pending_ids: set[int] = set()
+        self._wakeup = asyncio.Event()
+        self.published = 0
+        self.overflows = 0
+
+    def subscribe(self, warehouse_id=None, driver_id=None, transfer_id=None) -> Subscription:
+        sub = Subscription(warehouse_id, driver_id, transfer_id, settings.EVENT_STREAM_QUEUE_SIZE)
+        self.subscriptions.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        self.subscriptions.discard(sub)
+
+    def publish(self, events: list[StreamEvent]) -> None:
+        for e in events:
+            self.published += 1
+            for sub in list(self.subscriptions):
+                if not sub.matches(e):
+                    continue
+                try:
+                    sub.queue.put_nowait(e)
+                except asyncio.QueueFull:
+                    sub.overflowed = True
+                    self.overflows += 1
+                    self.subscriptions.discard(sub)
+
+    async def _publish_rows(self, stmt) -> int | None:
+        async with AsyncSessionLocal() as session:
+            rows = (await session.execute(stmt.order_by(TransferEvent.id))).all()
+        self.publish([StreamEvent(*row) for row in rows])
+        return rows[-1][0].id if rows else None
+
+    async def _listen(self) -> None:
+        def on_notify(connection, pid, channel, payload):
+            self._pending_ids.add(int(payload))
+            self._wakeup.set()
+
+        async with engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.add_listener(NOTIFY_CHANNEL, on_notify)
+            logger.info("event hub: listening on %s", NOTIFY_CHANNEL)
+            try:
+                while True:
+                    await self._wakeup.wait()
+                    self._wakeup.clear()
+                    ids, self._pending_ids = self._pending_ids, set()
+                    await self._publish_rows(event_rows_query().where(TransferEvent.id.in_(ids)))
+            finally:
+                await raw.driver_connection.remove_listener(NOTIFY_CHANNEL, on_notify)
+
+    async def _poll(self) -> None:
+        async with AsyncSessionLocal() as session:
+            last_id = (await session.execute(select(func.max(TransferEvent.id)))).scalar() or 0
+        logger.info("event hub: polling every %ss", settings.EVENT_STREAM_POLL_SECONDS)
+        while True:
+            await asyncio.sleep(settings.EVENT_STREAM_POLL_SECONDS)
+            newest = await self._publish_rows(event_rows_query().where(TransferEvent.id > last_id).limit(1000))
+            if newest is not None:
+                last_id = newest
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if engine.dialect.name == "postgresql":
+                    await self._listen()
+                else:
+                    await self._poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("event hub: feed failed, restarting")
+                await asyncio.sleep(1)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {"subscribers": len(self.subscriptions), "published": self.published, "overflows": self.overflows}
+
+
+event_hub = EventHub()
+
+
+def _overflow_frame(last_sent: int) -> bytes:
+    return f"event: overflow\ndata: {json.dumps({'last_event_id': last_sent})}\n\n".encode()
+
+
+async def stream_events(last_event_id: int | None, warehouse_id=None, driver_id=None, transfer_id=None):
+    """SSE body: replays events after last_event_id from the DB, then follows the hub.
+
+    The subscription is made here rather than by the route, so it only
+    exists while the body is being sent and the finally below always
+    removes it. Live events are not filtered by id: ids come from a
+    sequence but commit out of order, so a lower id can arrive after a
+    higher one. Only events already sent by the replay are skipped.
+    """
+    sub = event_hub.subscribe(warehouse_id=warehouse_id, driver_id=driver_id, transfer_id=transfer_id)
+    last_sent = last_event_id or 0
+    replayed: set[int] = set()
+    try:
+        if last_event_id is not None:
+            # subscribed before this query, so nothing committed in between is lost
+            stmt = sub.filter_query(event_rows_query().where(TransferEvent.id > last_event_id))
+            async with AsyncSessionLocal() as session:
+                rows = (
+                    await session.execute(stmt.order_by(TransferEvent.id).limit(settings.EVENT_STREAM_REPLAY_LIMIT))
+                ).all()
+            for row in rows:
+                e = StreamEvent(*row)
+                yield e.frame
+                replayed.add(e.id)
+                last_sent = e.id
+            if len(rows) == settings.EVENT_STREAM_REPLAY_LIMIT:
+                # more to catch up on than one replay allows: have the client come back for the rest
+                yield _overflow_frame(last_sent)
+                return
+
+        yield f"retry: {int(settings.EVENT_STREAM_HEARTBEAT_SECONDS * 1000)}\n\n".encode()
+        while True:
+            if sub.overflowed and sub.queue.empty():
+                # too slow: tell the client to reconnect with Last-Event-ID and catch up from the DB
+                yield _overflow_frame(last_sent)
+                return
+            try:
+                e = await asyncio.wait_for(sub.queue.get(), timeout=settings.EVENT_STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            if e.id in replayed:
+                # committed while the replay ran, so it was both queried and published; each id comes live once
+                replayed.discard(e.id)
+                continue
+            yield e.frame
+            last_sent = e.id
+    finally:
+        event_hub.unsubscribe(sub)
@@ -0,0 +1,56 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _encode_csv(rows) -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    return buf.getvalue().encode()
+
+
+def _encode_ndjson(columns: list[str], rows) -> bytes:
+    return "".join(json.dumps(dict(zip(columns, row)), default=_json_default) + "\n" for row in rows).encode()
+
+
+async def stream_export(stmt, fmt: str, compress: bool = False, sessionmaker=AsyncSessionLocal):
+    """Response body for an export: the rows of a Core select as CSV or NDJSON, optionally gzipped.
+
+    Rows come through a server-side cursor in partitions of EXPORT_YIELD_PER
+    and are encoded straight from tuples (no ORM objects, no Pydantic), so
+    memory stays flat whatever the table size. Opens its own session (from
+    sessionmaker, e.g. a replica's): the body is produced after the request
+    dependencies have been torn down.
+    """
+    # wbits=31: gzip container, so the output is a regular .gz file
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def out(chunk: bytes) -> bytes:
+        return compressor.compress(chunk) if compressor is not None else chunk
+
+    async with sessionmaker() as session:
+        result = await session.stream(stmt.execution_options(yield_per=settings.EXPORT_YIELD_PER))
+        columns = list(result.keys())
+        if fmt == "csv":
+            yield out(_encode_csv([columns]))
+        async for part in result.partitions():
+            chunk = out(_encode_csv(part) if fmt == "csv" else _encode_ndjson(columns, part))
+            if chunk:
+                yield chunk
+
+    if compressor is not None:
+        yield compressor.flush()
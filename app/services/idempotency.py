@@ -0,0 +1,110 @@
+import hashlib
+import math
+
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.dialect import dialect_insert
+from app.models.idempotency_key import IdempotencyKey
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings.
+
+    A negative answer is exact ("this process never saw the key"), a positive
+    one may be wrong. Once it holds more keys than it was sized for it starts
+    over, which only costs a few extra lookups, never correctness.
+    """
+
+    def __init__(self, size_bits: int, hashes: int):
+        self.size_bits = size_bits
+        self.hashes = hashes
+        self.capacity = max(1, int(size_bits * math.log(2) / hashes))
+        self._bits = bytearray((size_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size_bits for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        if self.count >= self.capacity:
+            self._bits = bytearray(len(self._bits))
+            self.count = 0
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+seen_keys = (
+    BloomFilter(settings.IDEMPOTENCY_BLOOM_BITS, settings.IDEMPOTENCY_BLOOM_HASHES)
+    if settings.IDEMPOTENCY_BLOOM_BITS > 0
+    else None
+)
+
+
+def _replay(record: IdempotencyKey, scope: str) -> Response:
+    if record.scope != scope:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Idempotency key already used for a different request",
+        )
+    if record.response_json is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Request with this idempotency key is in progress")
+
+    return Response(
+        content=record.response_json,
+        status_code=record.status_code,
+        media_type="application/json",
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+async def begin_idempotent(session: AsyncSession, key: str, scope: str) -> Response | None:
+    """Claims key for this request, or returns the stored response of the call that claimed it first.
+
+    A fresh key costs no extra read: the claim is an INSERT ... ON CONFLICT DO
+    NOTHING on the primary key, which also makes a concurrent duplicate wait
+    for the first transaction. Only keys this process may have seen before
+    (bloom filter hit) or keys that lose the race get a single PK lookup.
+    Must be called before any other write in the transaction.
+    """
+    if seen_keys is not None and key in seen_keys:
+        record = await session.get(IdempotencyKey, key)
+        if record is not None:
+            return _replay(record, scope)
+
+    insert = dialect_insert(session)
+    claimed = (
+        await session.execute(
+            insert(IdempotencyKey)
+            .values(key=key, scope=scope)
+            .on_conflict_do_nothing(index_elements=["key"])
+            .returning(IdempotencyKey.key)
+        )
+    ).scalar_one_or_none()
+    if seen_keys is not None:
+        seen_keys.add(key)
+
+    if claimed is None:
+        record = await session.get(IdempotencyKey, key, populate_existing=True)
+        return _replay(record, scope)
+    return None
+
+
+async def finish_idempotent(session: AsyncSession, key: str, body: BaseModel, status_code: int = 200) -> None:
+    """Stores the response for replay; it commits (or rolls back) together with the change itself."""
+    await session.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key == key)
+        .values(status_code=status_code, response_json=body.model_dump_json())
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,122 @@
+import heapq
+import re
+from bisect import bisect_left
+from collections import Counter
+
+from sqlalchemy import select, func, literal, text, case
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.material import Material
+from app.services.reference_cache import reference_cache
+
+_WORD = re.compile(r"\w+")
+
+
+def trigrams(value: str) -> set[str]:
+    """Trigrams the way pg_trgm makes them: per lowercased word, padded with two spaces in front and one behind."""
+    out = set()
+    for word in _WORD.findall(value.lower()):
+        padded = f"  {word} "
+        out.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return out
+
+
+class NgramIndex:
+    """In-memory trigram index over the material catalog, for databases without pg_trgm.
+
+    Scores approximate pg_trgm's word_similarity: the share of the query's
+    trigrams found in the name. Names starting with the query rank first.
+    Rebuilt whenever the "materials" reference version moves on.
+    """
+
+    def __init__(self):
+        self.version: int | None = None
+        self._rows: dict[int, tuple] = {}
+        self._postings: dict[str, list[int]] = {}
+        self._names: list[tuple[str, int]] = []
+
+    def build(self, rows, version: int) -> None:
+        postings: dict[str, list[int]] = {}
+        for row in rows:
+            for gram in trigrams(row.name):
+                postings.setdefault(gram, []).append(row.id)
+        self._rows = {row.id: row for row in rows}
+        self._postings = postings
+        self._names = sorted((row.name.lower(), row.id) for row in rows)
+        self.version = version
+
+    def _prefixed(self, prefix: str, limit: int, category: str | None) -> list[int]:
+        out = []
+        i = bisect_left(self._names, (prefix,))
+        while i < len(self._names) and self._names[i][0].startswith(prefix) and len(out) < limit:
+            mid = self._names[i][1]
+            if category is None or self._rows[mid].category == category:
+                out.append(mid)
+            i += 1
+        return out
+
+    def search(self, q: str, category: str | None, limit: int, threshold: float) -> list[tuple[tuple, float]]:
+        grams = trigrams(q)
+        if not grams:
+            return []
+        counts: Counter = Counter()
+        for gram in grams:
+            counts.update(self._postings.get(gram, ()))
+
+        def score(mid: int) -> float:
+            return counts[mid] / len(grams)
+
+        prefixed = self._prefixed(q.lower(), limit, category)
+        seen = set(prefixed)
+        fuzzy = heapq.nlargest(
+            limit - len(prefixed),
+            (
+                mid for mid, n in counts.items()
+                if mid not in seen
+                and n / len(grams) >= threshold
+                and (category is None or self._rows[mid].category == category)
+            ),
+            key=lambda mid: (score(mid), -mid),
+        ) if len(prefixed) < limit else []
+        return [(self._rows[mid], score(mid)) for mid in prefixed + fuzzy]
+
+
+ngram_index = NgramIndex()
+
+
+async def search_materials(session: AsyncSession, q: str, category: str | None, limit: int) -> list[tuple]:
+    """(material row, score) pairs: prefix matches first, then by word similarity.
+
+    On Postgres this is one query on the GIN (lower(name) gin_trgm_ops)
+    index: both the `<%` word-similarity operator and LIKE 'q%' are served
+    by it. Elsewhere it runs against an in-memory trigram index, which is
+    built from the primary whatever `session` is: it is tagged with the
+    version bumped there (see ReferenceCache.get).
+    """
+    threshold = settings.MATERIAL_SEARCH_THRESHOLD
+    columns = (Material.id, Material.name, Material.category, Material.unit, Material.is_active)
+
+    if session.bind.dialect.name != "postgresql":
+        # sessions connect lazily: a current index costs no query
+        async with AsyncSessionLocal() as primary:
+            version, _ = await reference_cache.version(primary, "materials")
+            if ngram_index.version != version:
+                ngram_index.build((await primary.execute(select(*columns))).all(), version)
+        return ngram_index.search(q, category, limit, threshold)
+
+    # the operator's cut-off is a setting, scoped to this transaction
+    await session.execute(
+        text("SELECT set_config('pg_trgm.word_similarity_threshold', :t, true)"), {"t": str(threshold)}
+    )
+    q = q.lower()
+    name = func.lower(Material.name)
+    prefix = name.like(q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+    score = func.word_similarity(q, name)
+
+    stmt = select(*columns, score.label("score")).where(literal(q).op("<%")(name) | prefix)
+    if category is not None:
+        stmt = stmt.where(Material.category == category)
+    stmt = stmt.order_by(case((prefix, 0), else_=1), score.desc(), Material.id).limit(limit)
+    return [(row, row.score) for row in (await session.execute(stmt)).all()]
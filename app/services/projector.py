@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.dialect import dialect_insert
+from app.db.session import AsyncSessionLocal, engine
+from app.models.projector_checkpoint import ProjectorCheckpoint
+from app.models.transfer_event import TransferEvent
+from app.services.event_hub import event_rows_query
+
+logger = logging.getLogger("app.projector")
+
+
+@dataclass
+class Projection:
+    name: str
+    # called with the session that also advances the checkpoint, and rows of event_rows_query()
+    apply: Callable[[AsyncSession, list], Awaitable[None]]
+    # empties the read model before a replay
+    reset: Callable[[AsyncSession], Awaitable[None]]
+    # undoes `apply` for rows whose events are being deleted (archival); None if deletions don't matter
+    retract: Callable[[AsyncSession, list], Awaitable[None]] | None = None
+
+
+def batch_query(checkpoint: ProjectorCheckpoint, limit: int):
+    """Next events after the checkpoint, in commit-safe log order.
+
+    Event ids are handed out before commit, so a plain "id > last id" cursor
+    skips an event whose transaction commits after a later one. On Postgres
+    the log position is (txid, id) and only transactions older than the
+    oldest one still running (snapshot xmin) are read: everything below that
+    horizon is final. SQLite serializes writers, so id order is commit order.
+    """
+    stmt = event_rows_query()
+    if engine.dialect.name == "postgresql":
+        horizon = func.txid_snapshot_xmin(func.txid_current_snapshot())
+        stmt = stmt.where(
+            TransferEvent.txid < horizon,
+            tuple_(TransferEvent.txid, TransferEvent.id) > tuple_(checkpoint.last_txid, checkpoint.last_event_id),
+        ).order_by(TransferEvent.txid, TransferEvent.id)
+    else:
+        stmt = stmt.where(TransferEvent.id > checkpoint.last_event_id).order_by(TransferEvent.id)
+    return stmt.limit(limit)
+
+
+def is_projected(checkpoint: ProjectorCheckpoint, event: TransferEvent) -> bool:
+    """True if `event` is at or before the checkpoint in batch_query's log order."""
+    if engine.dialect.name == "postgresql":
+        return (event.txid, event.id) <= (checkpoint.last_txid, checkpoint.last_event_id)
+    return event.id <= checkpoint.last_event_id
+
+
+class Projector:
+    """Background task that tails transfer_events into read models.
+
+    Each batch is applied and the checkpoint advanced in one transaction, so
+    read models in this database see every event exactly once; a failed batch
+    is rolled back and retried (at-least-once for anything with side effects
+    outside the transaction). The checkpoint row is locked with SKIP LOCKED,
+    so with several workers only one of them applies a given projection.
+    """
+
+    def __init__(self):
+        self.projections: dict[str, Projection] = {}
+        self._task: asyncio.Task | None = None
+        self._stats: dict[str, dict] = {}
+
+    def register(self, projection: Projection) -> None:
+        self.projections[projection.name] = projection
+        self._stats[projection.name] = {"events": 0, "batches": 0, "errors": 0, "last_event_id": 0, "last_batch_ms": 0.0}
+
+    async def _ensure_checkpoint(self, session: AsyncSession, name: str) -> None:
+        insert = dialect_insert(session)
+        await session.execute(insert(ProjectorCheckpoint).values(name=name).on_conflict_do_nothing(index_elements=["name"]))
+
+    async def _lock_checkpoint(self, session: AsyncSession, name: str) -> ProjectorCheckpoint | None:
+        return (
+            await session.execute(
+                select(ProjectorCheckpoint).where(ProjectorCheckpoint.name == name).with_for_update(skip_locked=True)
+            )
+        ).scalar_one_or_none()
+
+    async def run_batch(self, name: str) -> int:
+        """Applies the next batch of one projection; returns how many events it consumed."""
+        projection = self.projections[name]
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as session:
+            checkpoint = await self._lock_checkpoint(session, name)
+            if checkpoint is None:
+                # another worker is applying this projection right now
+                return 0
+            rows = (await session.execute(batch_query(checkpoint, settings.PROJECTOR_BATCH_SIZE))).all()
+            if rows:
+                await projection.apply(session, rows)
+                last = rows[-1][0]
+                checkpoint.last_txid = last.txid or 0
+                checkpoint.last_event_id = last.id
+            await session.commit()
+
+        if rows:
+            s = self._stats[name]
+            s["events"] += len(rows)
+            s["batches"] += 1
+            s["last_event_id"] = rows[-1][0].id
+            s["last_batch_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return len(rows)
+
+    async def replay(self, session: AsyncSession, name: str) -> None:
+        """Empties the read model and rewinds its checkpoint; the projector then rebuilds it from the log.
+
+        Runs in the caller's transaction, which waits for an in-flight batch to finish.
+        """
+        projection = self.projections[name]
+        await self._ensure_checkpoint(session, name)
+        checkpoint = (
+            await session.execute(select(ProjectorCheckpoint).where(ProjectorCheckpoint.name == name).with_for_update())
+        ).scalar_one()
+        await projection.reset(session)
+        checkpoint.last_txid = 0
+        checkpoint.last_event_id = 0
+
+    async def retract(self, session: AsyncSession, rows: list) -> None:
+        """Takes rows of event_rows_query() that the caller is about to delete back out of the read models.
+
+        Runs in the caller's transaction. Each checkpoint row stays locked
+        until it commits, so no batch can apply these events in between.
+        Only events the projection has already applied are retracted. The
+        others are deleted before it gets to them.
+        """
+        for name, projection in self.projections.items():
+            if projection.retract is None:
+                continue
+            await self._ensure_checkpoint(session, name)
+            checkpoint = (
+                await session.execute(select(ProjectorCheckpoint).where(ProjectorCheckpoint.name == name).with_for_update())
+            ).scalar_one()
+            applied = [row for row in rows if is_projected(checkpoint, row[0])]
+            if applied:
+                await projection.retract(session, applied)
+
+    async def _ensure_checkpoints(self) -> None:
+        async with AsyncSessionLocal() as session:
+            for name in self.projections:
+                await self._ensure_checkpoint(session, name)
+            await session.commit()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._ensure_checkpoints()
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("projector: cannot create checkpoints, retrying")
+                await asyncio.sleep(1)
+
+        while True:
+            busy = False
+            for name in self.projections:
+                try:
+                    # a full batch means there is more waiting: go again without sleeping
+                    busy |= await self.run_batch(name) == settings.PROJECTOR_BATCH_SIZE
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    self._stats[name]["errors"] += 1
+                    logger.exception("projector: batch of %s failed, will retry", name)
+            if not busy:
+                await asyncio.sleep(settings.PROJECTOR_POLL_SECONDS)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {name: dict(s) for name, s in self._stats.items()}
+
+
+projector = Projector()
@@ -0,0 +1,155 @@
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+from fastapi import Response
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.dialect import dialect_insert
+from app.models.reference_version import ReferenceVersion
+
+EPOCH = datetime(1970, 1, 1)
+
+
+@dataclass(frozen=True, slots=True)
+class CachedBody:
+    version: int
+    body: bytes
+    etag: str
+    last_modified: str
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # weak comparison, as RFC 9110 asks for If-None-Match
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+class ReferenceCache:
+    """Serialized JSON of reference-data lists, keyed by (kind, query params).
+
+    Every write to a reference table calls bump() in its transaction, which
+    increments that table's row in reference_versions. Entries remember the
+    version they were built from and are dropped once it moves on. This
+    worker sees its own bumps as soon as they commit; bumps from other workers are picked
+    up by re-reading reference_versions at most every
+    REFERENCE_CACHE_REVALIDATE_SECONDS, so a hot GET normally touches no
+    database, ORM or Pydantic code at all.
+    """
+
+    def __init__(self, max_size: int, revalidate_seconds: float):
+        self.max_size = max_size
+        self.revalidate_seconds = revalidate_seconds
+        self._versions: dict[str, tuple[int, datetime]] = {}
+        self._checked_at = float("-inf")
+        self._entries: OrderedDict[tuple, CachedBody] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    async def version(self, session: AsyncSession, kind: str) -> tuple[int, datetime]:
+        now = time.monotonic()
+        if now - self._checked_at >= self.revalidate_seconds:
+            rows = (await session.execute(select(ReferenceVersion))).scalars()
+            # a bump of ours may have been published while the SELECT was in flight
+            self._versions = {r.name: max((r.version, r.updated_at), self._versions.get(r.name, (0, EPOCH))) for r in rows}
+            self._checked_at = now
+        return self._versions.get(kind, (0, EPOCH))
+
+    async def bump(self, session: AsyncSession, kind: str) -> None:
+        """Call in the transaction that changes `kind`, before commit.
+
+        The new version reaches this worker's cache only when the transaction
+        commits (see _publish_bumps); until then a concurrent GET would read
+        the old rows and must not store them under the new version.
+        """
+        insert = dialect_insert(session)
+        table = ReferenceVersion.__table__
+        now = datetime.utcnow()
+        stmt = insert(table).values(name=kind, version=1, updated_at=now)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.name],
+            set_={"version": table.c.version + 1, "updated_at": now},
+        ).returning(table.c.version)
+        version = (await session.execute(stmt)).scalar_one()
+        session.info.setdefault("reference_bumps", {})[kind] = (version, now)
+
+    def publish(self, bumps: dict[str, tuple[int, datetime]]) -> None:
+        for kind, (version, updated_at) in bumps.items():
+            if version > self._versions.get(kind, (0, EPOCH))[0]:
+                self._versions[kind] = (version, updated_at)
+
+    async def get(self, session: AsyncSession, kind: str, params: tuple, build) -> CachedBody:
+        """Cached body for (kind, params), calling `build()` -> bytes on a miss.
+
+        `session` and whatever `build` reads must be on the primary: the body
+        is stored under the version bumped there, and a lagging replica's
+        list would be cached as current until the next bump.
+        """
+        version, updated_at = await self.version(session, kind)
+        key = (kind, params)
+        entry = self._entries.get(key)
+        if entry is not None and entry.version == version:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        body = await build()
+        entry = CachedBody(
+            version=version,
+            body=body,
+            etag='"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"',
+            last_modified=format_datetime(updated_at.replace(microsecond=0, tzinfo=timezone.utc), usegmt=True),
+        )
+        if self.max_size > 0:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def respond(self, entry: CachedBody, if_none_match: str | None) -> Response:
+        headers = {"ETag": entry.etag, "Last-Modified": entry.last_modified, "Cache-Control": "private, no-cache"}
+        if _etag_matches(if_none_match, entry.etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._checked_at = float("-inf")
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "versions": {k: v for k, (v, _) in self._versions.items()},
+        }
+
+
+reference_cache = ReferenceCache(settings.REFERENCE_CACHE_MAX_SIZE, settings.REFERENCE_CACHE_REVALIDATE_SECONDS)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_bumps(session: Session) -> None:
+    bumps = session.info.pop("reference_bumps", None)
+    if bumps:
+        reference_cache.publish(bumps)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_bumps(session: Session) -> None:
+    session.info.pop("reference_bumps", None)
@@ -0,0 +1,170 @@
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.permissions import WarehouseScope
+from app.models.transfer import Transfer
+from app.models.transfer_event import TransferEvent
+from app.schemas.report import DiscrepancyReport, DiscrepancyRow
+
+DELIVERY_EVENTS = ("delivery_confirmed", "delivery_with_discrepancy")
+
+GROUP_KEYS = {
+    "route": [Transfer.from_warehouse_id, Transfer.to_warehouse_id],
+    "material": [Transfer.material_id],
+    # the storekeeper who confirmed the delivery
+    "storekeeper": [TransferEvent.actor_user_id.label("storekeeper_id")],
+}
+
+
+def _rate(part, whole) -> float | None:
+    return round(part / whole, 6) if whole else None
+
+
+async def discrepancy_report(
+    session: AsyncSession,
+    date_from: datetime,
+    date_to: datetime,
+    group_by: str,
+    warehouse_id: int | None = None,
+    scope: WarehouseScope | None = None,
+) -> DiscrepancyReport:
+    """Damage and shortfall per group for deliveries confirmed in [date_from, date_to).
+
+    One grouped query over the delivery events of the window (index on
+    event_type, event_time) joined to their transfers; all sums, counts and,
+    on Postgres, percentiles are computed by the database, so only one row
+    per group comes back.
+    """
+    keys = GROUP_KEYS[group_by]
+    shipped = Transfer.shipped_qty
+    received = func.coalesce(TransferEvent.received_qty, 0)
+    damaged = func.coalesce(TransferEvent.damaged_qty, 0)
+    shortfall = shipped - received - damaged
+
+    columns = [
+        *keys,
+        func.count().label("transfers"),
+        func.sum(case((TransferEvent.event_type == "delivery_with_discrepancy", 1), else_=0)).label("discrepancies"),
+        func.sum(Transfer.planned_qty).label("planned_qty"),
+        func.sum(shipped).label("shipped_qty"),
+        func.sum(received).label("received_qty"),
+        func.sum(damaged).label("damaged_qty"),
+        func.sum(shortfall).label("shortfall_qty"),
+    ]
+    if session.bind.dialect.name == "postgresql":
+        damage_rate = damaged / func.nullif(shipped, 0)
+        shortfall_rate = shortfall / func.nullif(shipped, 0)
+        columns += [
+            func.percentile_cont(0.5).within_group(damage_rate).label("p50_damage_rate"),
+            func.percentile_cont(0.9).within_group(damage_rate).label("p90_damage_rate"),
+            func.percentile_cont(0.9).within_group(shortfall_rate).label("p90_shortfall_rate"),
+        ]
+
+    stmt = (
+        select(*columns)
+        .select_from(TransferEvent)
+        .join(Transfer, Transfer.id == TransferEvent.transfer_id)
+        .where(
+            TransferEvent.event_type.in_(DELIVERY_EVENTS),
+            TransferEvent.event_time >= date_from,
+            TransferEvent.event_time < date_to,
+        )
+        .group_by(*keys)
+        .order_by(*keys)
+    )
+    if warehouse_id is not None:
+        stmt = stmt.where((Transfer.from_warehouse_id == warehouse_id) | (Transfer.to_warehouse_id == warehouse_id))
+    if scope is not None:
+        stmt = stmt.where(scope.where(Transfer.from_warehouse_id, Transfer.to_warehouse_id))
+
+    rows = []
+    for r in (await session.execute(stmt)).mappings():
+        data = {k: (float(v) if v is not None and k.endswith(("_qty", "_rate")) else v) for k, v in r.items()}
+        data["damage_rate"] = _rate(data["damaged_qty"], data["shipped_qty"])
+        data["shortfall_rate"] = _rate(data["shortfall_qty"], data["shipped_qty"])
+        rows.append(DiscrepancyRow(**data))
+
+    return DiscrepancyReport(
+        date_from=date_from, date_to=date_to, group_by=group_by, generated_at=datetime.utcnow(), rows=rows
+    )
+
+
+class ReportCache:
+    """Per-process cache of computed reports keyed by (report, window, params).
+
+    A window that ended more than REPORT_CACHE_SETTLE_SECONDS ago cannot gain
+    deliveries anymore and is kept for REPORT_CACHE_CLOSED_TTL_SECONDS; a
+    window reaching into the present only for REPORT_CACHE_OPEN_TTL_SECONDS.
+    Concurrent requests for the same key wait for one computation instead of
+    each running the query.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[tuple, tuple[float, object]] = OrderedDict()
+        self._inflight: dict[tuple, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _ttl(self, date_to: datetime) -> float:
+        settled = date_to < datetime.utcnow() - timedelta(seconds=settings.REPORT_CACHE_SETTLE_SECONDS)
+        return settings.REPORT_CACHE_CLOSED_TTL_SECONDS if settled else settings.REPORT_CACHE_OPEN_TTL_SECONDS
+
+    async def get_or_compute(self, key: tuple, date_to: datetime, compute):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] >= time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # nobody else may be waiting; don't leave "exception never retrieved" behind
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+        future.set_result(value)
+        ttl = self._ttl(date_to)
+        if self.max_size > 0 and ttl > 0:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+
+
+report_cache = ReportCache(settings.REPORT_CACHE_MAX_SIZE)
@@ -0,0 +1,255 @@
+import heapq
+import json
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, insert, update, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.permissions import WarehouseScope
+from app.models.transfer import Transfer
+from app.models.transfer_event import TransferEvent
+from app.models.user import User
+from app.schemas.route_plan import RoutePlanRequest, RoutePlan, PlannedLoad, RoutePlanApplyResult, RoutePlanSkipped
+from app.services.stock import to_qty
+from app.services.transfer_states import CONFLICT, TRANSITIONS, check_transition, claim_transitions
+
+PLANNABLE_STATUSES = TRANSITIONS["plan"][0]
+
+
+class Load:
+    __slots__ = ("lane", "total_qty", "transfer_ids", "earliest_deadline_at", "oversize")
+
+    def __init__(self, lane: tuple[int, int], oversize: bool = False):
+        self.lane = lane
+        self.total_qty = Decimal(0)
+        self.transfer_ids: list[int] = []
+        self.earliest_deadline_at: datetime | None = None
+        self.oversize = oversize
+
+    def add(self, transfer_id: int, qty: Decimal, deadline_at: datetime | None) -> None:
+        self.transfer_ids.append(transfer_id)
+        self.total_qty += qty
+        if deadline_at is not None and (self.earliest_deadline_at is None or deadline_at < self.earliest_deadline_at):
+            self.earliest_deadline_at = deadline_at
+
+
+def pack_lane(lane: tuple[int, int], items: list[tuple], capacity: Decimal) -> list[Load]:
+    """Best-fit decreasing: biggest transfer first, into the fullest load it still fits in.
+
+    Free space of the open loads is kept sorted, so finding the best fit is a
+    bisect instead of a scan over every load; a lane of n transfers packs in
+    O(n log n) comparisons. items are (transfer_id, qty, deadline_at).
+    """
+    loads: list[Load] = []
+    free: list[tuple[Decimal, int]] = []  # (remaining capacity, index into loads)
+    for transfer_id, qty, deadline_at in sorted(items, key=lambda i: (-i[1], i[0])):
+        if qty > capacity:
+            load = Load(lane, oversize=True)
+            load.add(transfer_id, qty, deadline_at)
+            loads.append(load)
+            continue
+
+        i = bisect_left(free, (qty, -1))
+        if i < len(free):
+            remaining, idx = free.pop(i)
+        else:
+            remaining, idx = capacity, len(loads)
+            loads.append(Load(lane))
+        loads[idx].add(transfer_id, qty, deadline_at)
+        remaining -= qty
+        if remaining > 0:
+            insort(free, (remaining, idx))
+    return loads
+
+
+def assign_drivers(loads: list[Load], driver_ids: list[int], max_loads_per_driver: int) -> list[int | None]:
+    """Hands loads out in deadline order, each to the driver with the fewest loads (then least qty) so far."""
+    order = sorted(
+        range(len(loads)),
+        key=lambda i: (loads[i].earliest_deadline_at is None, loads[i].earliest_deadline_at or datetime.min, -loads[i].total_qty),
+    )
+    drivers = [(0, Decimal(0), d) for d in sorted(set(driver_ids))]
+    heapq.heapify(drivers)
+
+    assigned: list[int | None] = [None] * len(loads)
+    for i in order:
+        if not drivers:
+            break
+        taken, qty, driver_id = heapq.heappop(drivers)
+        assigned[i] = driver_id
+        if taken + 1 < max_loads_per_driver:
+            heapq.heappush(drivers, (taken + 1, qty + loads[i].total_qty, driver_id))
+    return assigned
+
+
+async def _active_driver_ids(session: AsyncSession, driver_ids: list[int] | None) -> list[int]:
+    stmt = select(User.id).where(User.role == "driver", User.is_active.is_(True))
+    if driver_ids is not None:
+        stmt = stmt.where(User.id.in_(set(driver_ids)))
+    found = list((await session.execute(stmt)).scalars())
+    if driver_ids is not None and len(found) != len(set(driver_ids)):
+        missing = sorted(set(driver_ids) - set(found))
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, f"Not active drivers: {missing}")
+    return found
+
+
+async def plan_routes(session: AsyncSession, data: RoutePlanRequest, scope: WarehouseScope | None = None) -> RoutePlan:
+    """Proposes truck loads and drivers for the open transfers due on data.day; writes nothing."""
+    capacity = to_qty(data.truck_capacity or settings.ROUTE_PLAN_TRUCK_CAPACITY)
+    day_start = datetime.combine(data.day, time.min)
+    due_that_day = (Transfer.deadline_at >= day_start) & (Transfer.deadline_at < day_start + timedelta(days=1))
+
+    stmt = (
+        select(Transfer.id, Transfer.from_warehouse_id, Transfer.to_warehouse_id, Transfer.planned_qty, Transfer.deadline_at)
+        .where(
+            Transfer.status.in_(PLANNABLE_STATUSES),
+            or_(due_that_day, Transfer.deadline_at.is_(None)) if data.include_undated else due_that_day,
+        )
+        .limit(settings.ROUTE_PLAN_MAX_TRANSFERS + 1)
+    )
+    if scope is not None:
+        stmt = stmt.where(scope.where(Transfer.from_warehouse_id, Transfer.to_warehouse_id))
+    rows = (await session.execute(stmt)).all()
+    if len(rows) > settings.ROUTE_PLAN_MAX_TRANSFERS:
+        raise HTTPException(
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            f"More than {settings.ROUTE_PLAN_MAX_TRANSFERS} transfers to plan",
+        )
+
+    lanes: dict[tuple[int, int], list[tuple]] = defaultdict(list)
+    for r in rows:
+        lanes[(r.from_warehouse_id, r.to_warehouse_id)].append((r.id, to_qty(r.planned_qty), r.deadline_at))
+
+    loads: list[Load] = []
+    for lane in sorted(lanes):
+        loads.extend(pack_lane(lane, lanes[lane], capacity))
+
+    driver_ids = await _active_driver_ids(session, data.driver_ids)
+    drivers = assign_drivers(loads, driver_ids, data.max_loads_per_driver or settings.ROUTE_PLAN_MAX_LOADS_PER_DRIVER)
+
+    return RoutePlan(
+        day=data.day,
+        truck_capacity=float(capacity),
+        transfers=len(rows),
+        lanes=len(lanes),
+        unassigned_loads=sum(1 for d in drivers if d is None),
+        loads=[
+            PlannedLoad(
+                from_warehouse_id=load.lane[0],
+                to_warehouse_id=load.lane[1],
+                driver_id=driver_id,
+                total_qty=float(load.total_qty),
+                oversize=load.oversize,
+                earliest_deadline_at=load.earliest_deadline_at,
+                transfer_ids=sorted(load.transfer_ids),
+            )
+            for load, driver_id in zip(loads, drivers)
+        ],
+    )
+
+
+async def apply_route_plan(
+    session: AsyncSession, actor_id: int, loads: list, scope: WarehouseScope | None = None
+) -> RoutePlanApplyResult:
+    """Sets the driver of every transfer in the given loads, in one transaction.
+
+    Transfers are read and claimed in id-ordered chunks (bounded IN lists):
+    one conditional UPDATE per chunk moves them through the "plan"
+    transition (claim_transitions), then the drivers go out as one
+    executemany by primary key and the events as one multi-row INSERT.
+    Drafts that already have both storekeepers move to "assigned" like
+    assign_transfer would; other drafts keep their status and get a
+    "driver_assigned" event. Transfers that are gone, no longer open or
+    changed by another request meanwhile are reported and skipped, as are
+    transfers with neither end inside `scope`.
+    """
+    driver_of: dict[int, int] = {}
+    for load in loads:
+        for transfer_id in load.transfer_ids:
+            driver_of[transfer_id] = load.driver_id
+    if len(driver_of) > settings.ROUTE_PLAN_MAX_TRANSFERS:
+        raise HTTPException(
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            f"At most {settings.ROUTE_PLAN_MAX_TRANSFERS} transfers per plan",
+        )
+    await _active_driver_ids(session, sorted({load.driver_id for load in loads}))
+
+    now = datetime.utcnow()
+    assigned = reassigned = unchanged = 0
+    skipped: list[RoutePlanSkipped] = []
+    ids = sorted(driver_of)
+    chunk = settings.ROUTE_PLAN_APPLY_CHUNK_SIZE
+    for start in range(0, len(ids), chunk):
+        part = ids[start:start + chunk]
+        rows = {
+            r.id: r
+            for r in await session.execute(
+                select(
+                    Transfer.id, Transfer.status, Transfer.version, Transfer.driver_id,
+                    Transfer.storekeeper_from_id, Transfer.storekeeper_to_id,
+                    Transfer.from_warehouse_id, Transfer.to_warehouse_id,
+                ).where(Transfer.id.in_(part))
+            )
+        }
+
+        moves: list[tuple] = []
+        for transfer_id in part:
+            r = rows.get(transfer_id)
+            try:
+                # GUARD
+                if r is None:
+                    raise HTTPException(404, "Transfer not found")
+                if scope is not None:
+                    scope.check(r.from_warehouse_id, r.to_warehouse_id)
+                check_transition("plan", r.status)
+            except HTTPException as e:
+                skipped.append(RoutePlanSkipped(transfer_id=transfer_id, error=e.detail))
+                continue
+
+            promote = r.status == "draft" and bool(r.storekeeper_from_id and r.storekeeper_to_id)
+            if not promote and r.driver_id == driver_of[transfer_id]:
+                unchanged += 1
+                continue
+            moves.append((r, "assigned" if promote else r.status))
+
+        won = await claim_transitions(session, "plan", moves)
+
+        updates: list[dict] = []
+        events: list[dict] = []
+        for r, to_status in moves:
+            if r.id not in won:
+                skipped.append(RoutePlanSkipped(transfer_id=r.id, error=CONFLICT))
+                continue
+            promote = to_status != r.status
+            driver_id = driver_of[r.id]
+            updates.append({"id": r.id, "driver_id": driver_id})
+            events.append({
+                "transfer_id": r.id,
+                # "assigned" moves draft -> assigned in the status projections; "driver_assigned" moves nothing
+                "event_type": "assigned" if promote else "driver_assigned",
+                "actor_user_id": actor_id,
+                "event_time": now,
+                "payload_json": json.dumps({
+                    "driver_id": driver_id,
+                    "previous_driver_id": r.driver_id,
+                    "storekeeper_from_id": r.storekeeper_from_id,
+                    "storekeeper_to_id": r.storekeeper_to_id,
+                    "source": "route_plan",
+                }),
+            })
+            if promote:
+                assigned += 1
+            else:
+                reassigned += 1
+
+        if updates:
+            await session.execute(update(Transfer), updates)
+            await session.execute(insert(TransferEvent), events)
+
+    skipped.sort(key=lambda s: s.transfer_id)
+    return RoutePlanApplyResult(assigned=assigned, reassigned=reassigned, unchanged=unchanged, skipped=skipped)
@@ -0,0 +1,268 @@
+import asyncio
+import heapq
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, insert
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.transfer import Transfer
+from app.models.transfer_event import TransferEvent
+from app.services.event_hub import event_hub
+from app.services.status_counts import STATUS_TRANSITIONS
+
+logger = logging.getLogger("app.sla")
+
+OPEN_STATUSES = ("draft", "assigned", "in_transit")
+CLOSING_EVENTS = ("delivery_confirmed", "delivery_with_discrepancy")
+
+
+@dataclass(slots=True)
+class TrackedTransfer:
+    transfer_id: int
+    deadline_at: datetime
+    status: str
+    from_warehouse_id: int
+    to_warehouse_id: int
+    driver_id: int | None
+
+
+class SlaScheduler:
+    """Tracks deadlines of open transfers and raises "overdue" events when they pass.
+
+    Every SLA_REFRESH_SECONDS the load horizon moves forward to now +
+    SLA_LOAD_HORIZON_SECONDS. Only the deadlines between the previous horizon
+    (the watermark) and the new one are read: an index range scan on (status,
+    deadline_at) that does not grow with the backlog of transfers that are
+    long overdue and never close. Transfers created since the last refresh
+    (the "created" events on the event hub) are loaded by id, because their
+    deadline may already be behind the watermark. Everything loaded goes on
+    a min-heap, and the scheduler sleeps until the earliest deadline.
+
+    Due transfers are re-checked and flagged in one transaction per batch.
+    The check for an existing "overdue" event under the transfer row lock
+    keeps several workers from flagging the same transfer twice. The hub
+    also keeps memory current between loads: deliveries drop transfers
+    straight away, and other events update status and driver. Every
+    SLA_RESYNC_SECONDS, and whenever the hub dropped events for us, a full
+    reload corrects anything that was missed.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[datetime, int]] = []
+        self._tracked: dict[int, TrackedTransfer] = {}
+        self.overdue: dict[int, TrackedTransfer] = {}
+        # transfers known to carry an "overdue" event already
+        self._flagged: set[int] = set()
+        # deadlines up to here are loaded; None until the first (full) load
+        self._loaded_until: datetime | None = None
+        # transfers created since the last load, from the event hub
+        self._created: set[int] = set()
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self.running = False
+        self.refreshes = 0
+        self.resyncs = 0
+        self.flagged = 0
+        self.last_refresh_ms = 0.0
+
+    async def refresh(self, full: bool = False) -> None:
+        """Loads open transfers whose deadline came within the horizon since the last call.
+
+        full=True (and the first call) reloads everything up to the horizon.
+        """
+        started = time.perf_counter()
+        horizon = datetime.utcnow() + timedelta(seconds=settings.SLA_LOAD_HORIZON_SECONDS)
+        full = full or self._loaded_until is None
+        created, self._created = self._created, set()
+        columns = select(
+            Transfer.id, Transfer.deadline_at, Transfer.status,
+            Transfer.from_warehouse_id, Transfer.to_warehouse_id, Transfer.driver_id,
+        ).where(Transfer.status.in_(OPEN_STATUSES), Transfer.deadline_at <= horizon)
+        async with AsyncSessionLocal() as session:
+            if full:
+                rows = (await session.execute(columns)).all()
+            else:
+                rows = (await session.execute(columns.where(Transfer.deadline_at > self._loaded_until))).all()
+                if created:
+                    rows += (await session.execute(columns.where(Transfer.id.in_(created)))).all()
+
+        if full:
+            self._tracked = {r.id: TrackedTransfer(*r) for r in rows}
+            now = datetime.utcnow()
+            self.overdue = {tid: t for tid, t in self._tracked.items() if t.deadline_at <= now and tid in self._flagged}
+            self._flagged &= self._tracked.keys()
+            # everything not flagged yet goes on the heap; already-passed deadlines pop right away
+            self._heap = [(t.deadline_at, tid) for tid, t in self._tracked.items() if tid not in self._flagged]
+            heapq.heapify(self._heap)
+            self.resyncs += 1
+        else:
+            for r in rows:
+                if r.id not in self._tracked:
+                    self._tracked[r.id] = TrackedTransfer(*r)
+                    heapq.heappush(self._heap, (r.deadline_at, r.id))
+        self._loaded_until = horizon
+
+        self.refreshes += 1
+        self.last_refresh_ms = round((time.perf_counter() - started) * 1000, 3)
+        self._wakeup.set()
+
+    def _pop_due(self, now: datetime) -> list[int]:
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < settings.SLA_FIRE_BATCH_SIZE:
+            _, tid = heapq.heappop(self._heap)
+            if tid in self._tracked:
+                due.append(tid)
+        return due
+
+    async def _flag(self, due: list[int]) -> None:
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as session:
+            rows = (
+                await session.execute(
+                    select(Transfer.id, Transfer.deadline_at, Transfer.status)
+                    .where(Transfer.id.in_(due), Transfer.status.in_(OPEN_STATUSES), Transfer.deadline_at <= now)
+                    .order_by(Transfer.id)
+                    .with_for_update()
+                )
+            ).all()
+            ids = [r.id for r in rows]
+            # separate statement, so it sees events committed while we waited for the locks
+            existing = set(
+                (
+                    await session.execute(
+                        select(TransferEvent.transfer_id)
+                        .where(TransferEvent.transfer_id.in_(ids), TransferEvent.event_type == "overdue")
+                    )
+                ).scalars()
+            ) if ids else set()
+            new = [r for r in rows if r.id not in existing]
+            if new:
+                await session.execute(
+                    insert(TransferEvent),
+                    [
+                        {
+                            "transfer_id": r.id,
+                            "event_type": "overdue",
+                            "actor_user_id": None,
+                            "event_time": now,
+                            "payload_json": json.dumps({"deadline_at": r.deadline_at.isoformat(), "status": r.status}),
+                        }
+                        for r in new
+                    ],
+                )
+            await session.commit()
+
+        open_ids = set(ids)
+        for tid in due:
+            t = self._tracked.get(tid)
+            if tid not in open_ids or t is None:
+                # closed (or deadline moved) since the last refresh
+                self._tracked.pop(tid, None)
+                continue
+            self._flagged.add(tid)
+            self.overdue[tid] = t
+        self.flagged += len(new)
+        if new:
+            logger.info("sla: %d transfers overdue", len(new))
+
+    def _forget(self, transfer_id: int) -> None:
+        self._tracked.pop(transfer_id, None)
+        self.overdue.pop(transfer_id, None)
+        self._flagged.discard(transfer_id)
+
+    def _follow(self, e) -> None:
+        if e.event_type in CLOSING_EVENTS:
+            self._forget(e.transfer_id)
+        elif e.event_type == "created":
+            self._created.add(e.transfer_id)
+        elif (t := self._tracked.get(e.transfer_id)) is not None:
+            t.driver_id = e.driver_id
+            if e.event_type in STATUS_TRANSITIONS:
+                t.status = STATUS_TRANSITIONS[e.event_type][1]
+
+    async def _follow_events(self) -> None:
+        sub = event_hub.subscribe()
+        try:
+            while True:
+                if sub.overflowed:
+                    event_hub.unsubscribe(sub)
+                    sub = event_hub.subscribe()
+                    # events were dropped: creations and deliveries may be missing from memory
+                    await self.refresh(full=True)
+                self._follow(await sub.queue.get())
+        finally:
+            event_hub.unsubscribe(sub)
+
+    async def _run(self) -> None:
+        next_refresh = next_resync = 0.0
+        while True:
+            try:
+                if time.monotonic() >= next_refresh:
+                    full = time.monotonic() >= next_resync
+                    await self.refresh(full=full)
+                    next_refresh = time.monotonic() + settings.SLA_REFRESH_SECONDS
+                    if full:
+                        next_resync = time.monotonic() + settings.SLA_RESYNC_SECONDS
+
+                due = self._pop_due(datetime.utcnow())
+                if due:
+                    await self._flag(due)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("sla: scheduler iteration failed")
+                next_refresh = time.monotonic() + 1
+
+            timeout = next_refresh - time.monotonic()
+            if self._heap:
+                timeout = min(timeout, (self._heap[0][0] - datetime.utcnow()).total_seconds())
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(timeout, 0.01))
+            except asyncio.TimeoutError:
+                pass
+
+    def list_overdue(self, warehouse_id: int | None = None, driver_id: int | None = None) -> list[TrackedTransfer]:
+        items = self.overdue.values()
+        if warehouse_id is not None:
+            items = [t for t in items if warehouse_id in (t.from_warehouse_id, t.to_warehouse_id)]
+        if driver_id is not None:
+            items = [t for t in items if t.driver_id == driver_id]
+        return sorted(items, key=lambda t: (t.deadline_at, t.transfer_id))
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run()), asyncio.create_task(self._follow_events())]
+            self.running = True
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self.running = False
+
+    def stats(self) -> dict:
+        return {
+            "tracked": len(self._tracked),
+            "scheduled": len(self._heap),
+            "overdue": len(self.overdue),
+            "flagged": self.flagged,
+            "refreshes": self.refreshes,
+            "resyncs": self.resyncs,
+            "loaded_until": self._loaded_until.isoformat() if self._loaded_until else None,
+            "last_refresh_ms": self.last_refresh_ms,
+        }
+
+
+sla_scheduler = SlaScheduler()
@@ -0,0 +1,65 @@
+from collections import Counter
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.dialect import dialect_insert
+from app.models.transfer_status_count import TransferStatusCount
+from app.services.projector import Projection, projector
+
+# event_type -> (status before, status after); other events don't move the status
+STATUS_TRANSITIONS = {
+    "created": (None, "draft"),
+    "assigned": ("draft", "assigned"),
+    "pickup_confirmed": ("assigned", "in_transit"),
+    "delivery_confirmed": ("in_transit", "received"),
+    "delivery_with_discrepancy": ("in_transit", "discrepancy"),
+}
+
+
+async def _fold(session: AsyncSession, rows, sign: int) -> None:
+    deltas: Counter = Counter()
+    for event, from_warehouse_id, to_warehouse_id, _driver_id in rows:
+        transition = STATUS_TRANSITIONS.get(event.event_type)
+        if transition is None:
+            continue
+        before, after = transition
+        if before is not None:
+            deltas[(from_warehouse_id, to_warehouse_id, before)] -= sign
+        deltas[(from_warehouse_id, to_warehouse_id, after)] += sign
+
+    values = [
+        {"from_warehouse_id": f, "to_warehouse_id": t, "status": s, "count": n}
+        for (f, t, s), n in sorted(deltas.items())
+        if n
+    ]
+    if not values:
+        return
+
+    insert = dialect_insert(session)
+    table = TransferStatusCount.__table__
+    stmt = insert(table).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.from_warehouse_id, table.c.to_warehouse_id, table.c.status],
+        set_={"count": table.c.count + stmt.excluded.count},
+    )
+    await session.execute(stmt)
+
+
+async def apply_status_events(session: AsyncSession, rows) -> None:
+    """Folds a batch of events into per-route status counts with one multi-row upsert."""
+    await _fold(session, rows, 1)
+
+
+async def retract_status_events(session: AsyncSession, rows) -> None:
+    """Takes archived events back out, so archived transfers count on neither the live nor the replay path."""
+    await _fold(session, rows, -1)
+
+
+async def reset_status_counts(session: AsyncSession) -> None:
+    await session.execute(delete(TransferStatusCount))
+
+
+STATUS_COUNTS = "transfer_status_counts"
+
+projector.register(Projection(STATUS_COUNTS, apply_status_events, reset_status_counts, retract_status_events))
@@ -0,0 +1,86 @@
+from datetime import datetime
+from decimal import Decimal
+
+from fastapi import HTTPException
+from sqlalchemy import select, update, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.dialect import dialect_insert
+from app.models.current_stock import CurrentStock
+
+
+def to_qty(value) -> Decimal:
+    """Converts an API quantity (float/int/str/Decimal) to a Decimal without float noise."""
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+async def decrement_stock(session: AsyncSession, warehouse_id: int, material_id: int, qty) -> Decimal:
+    """Atomically takes qty off the shelf. Never lets on_hand_qty go below zero.
+
+    The check and the write happen in one UPDATE, so concurrent dispatches from
+    the same warehouse serialize on the row lock instead of losing updates.
+    """
+    qty = to_qty(qty)
+    new_qty = (
+        await session.execute(
+            update(CurrentStock)
+            .where(
+                CurrentStock.warehouse_id == warehouse_id,
+                CurrentStock.material_id == material_id,
+                CurrentStock.on_hand_qty >= qty,
+            )
+            .values(on_hand_qty=CurrentStock.on_hand_qty - qty, updated_at=datetime.utcnow())
+            .returning(CurrentStock.on_hand_qty)
+            .execution_options(synchronize_session=False)
+        )
+    ).scalar_one_or_none()
+
+    if new_qty is None:
+        raise HTTPException(400, "Not enough stock to dispatch")
+    return new_qty
+
+
+async def increment_stock(session: AsyncSession, warehouse_id: int, material_id: int, qty) -> Decimal:
+    """Atomically adds qty, creating the stock row on first receipt (INSERT ... ON CONFLICT DO UPDATE)."""
+    qty = to_qty(qty)
+    insert = dialect_insert(session)
+    table = CurrentStock.__table__
+
+    stmt = insert(table).values(
+        warehouse_id=warehouse_id,
+        material_id=material_id,
+        on_hand_qty=qty,
+        updated_at=datetime.utcnow(),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.warehouse_id, table.c.material_id],
+        set_={
+            "on_hand_qty": table.c.on_hand_qty + stmt.excluded.on_hand_qty,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    ).returning(table.c.on_hand_qty)
+
+    return (await session.execute(stmt)).scalar_one()
+
+
+async def lock_stock_rows(session: AsyncSession, keys) -> dict[tuple[int, int], CurrentStock]:
+    """SELECT ... FOR UPDATE over (warehouse_id, material_id) keys in a fixed order.
+
+    Rows are always locked sorted by primary key, so two transactions touching
+    overlapping sets of stock rows cannot deadlock each other.
+    """
+    keys = sorted(set(keys))
+    if not keys:
+        return {}
+
+    rows = (
+        await session.execute(
+            select(CurrentStock)
+            .where(tuple_(CurrentStock.warehouse_id, CurrentStock.material_id).in_(keys))
+            .order_by(CurrentStock.warehouse_id, CurrentStock.material_id)
+            .with_for_update()
+        )
+    ).scalars()
+    return {(s.warehouse_id, s.material_id): s for s in rows}
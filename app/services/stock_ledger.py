@@ -0,0 +1,182 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import select, func, and_, or_, insert, literal, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.current_stock import CurrentStock
+from app.models.stock_movement import StockMovement
+from app.models.stock_snapshot import StockSnapshot
+
+logger = logging.getLogger("app.stock_ledger")
+
+
+def movement(warehouse_id: int, material_id: int, qty: Decimal, kind: str, transfer_id: int | None = None) -> dict:
+    return {
+        "warehouse_id": warehouse_id,
+        "material_id": material_id,
+        "qty": qty,
+        "kind": kind,
+        "transfer_id": transfer_id,
+        "created_at": datetime.utcnow(),
+    }
+
+
+async def record_movements(session: AsyncSession, rows: list[dict]) -> None:
+    """Appends ledger rows in one executemany; call in the transaction that changes current_stock."""
+    if rows:
+        await session.execute(insert(StockMovement), rows)
+
+
+def balances_query(at: datetime | None = None, warehouse_id: int | None = None, material_id: int | None = None):
+    """(warehouse_id, material_id, on_hand_qty) as of `at` (None = latest).
+
+    Starts from the newest snapshot of each warehouse taken at or before `at`
+    and adds only the movements recorded after it. Snapshots are always taken
+    for all warehouses at once (take_snapshot), so nothing older than the
+    oldest of those snapshots needs to be read.
+    """
+    latest = select(StockSnapshot.warehouse_id, func.max(StockSnapshot.taken_at).label("taken_at"))
+    if at is not None:
+        latest = latest.where(StockSnapshot.taken_at <= at)
+    if warehouse_id is not None:
+        latest = latest.where(StockSnapshot.warehouse_id == warehouse_id)
+    latest = latest.group_by(StockSnapshot.warehouse_id).subquery()
+    oldest = select(func.min(latest.c.taken_at)).scalar_subquery()
+
+    from_snapshot = (
+        select(StockSnapshot.warehouse_id, StockSnapshot.material_id, StockSnapshot.on_hand_qty.label("qty"))
+        .join(latest, and_(latest.c.warehouse_id == StockSnapshot.warehouse_id, latest.c.taken_at == StockSnapshot.taken_at))
+    )
+    since = (
+        select(StockMovement.warehouse_id, StockMovement.material_id, StockMovement.qty)
+        .outerjoin(latest, latest.c.warehouse_id == StockMovement.warehouse_id)
+        .where(
+            or_(latest.c.taken_at.is_(None), StockMovement.created_at > latest.c.taken_at),
+            or_(oldest.is_(None), StockMovement.created_at > oldest),
+        )
+    )
+    if at is not None:
+        since = since.where(StockMovement.created_at <= at)
+    if warehouse_id is not None:
+        from_snapshot = from_snapshot.where(StockSnapshot.warehouse_id == warehouse_id)
+        since = since.where(StockMovement.warehouse_id == warehouse_id)
+    if material_id is not None:
+        from_snapshot = from_snapshot.where(StockSnapshot.material_id == material_id)
+        since = since.where(StockMovement.material_id == material_id)
+
+    parts = union_all(from_snapshot, since).subquery()
+    return (
+        select(parts.c.warehouse_id, parts.c.material_id, func.sum(parts.c.qty).label("on_hand_qty"))
+        .group_by(parts.c.warehouse_id, parts.c.material_id)
+        .order_by(parts.c.warehouse_id, parts.c.material_id)
+    )
+
+
+async def take_snapshot(session: AsyncSession, at: datetime | None = None) -> int:
+    """Folds the ledger up to `at` into a new snapshot of every warehouse; returns rows written.
+
+    `at` defaults to now minus STOCK_SNAPSHOT_SETTLE_SECONDS, so movements of
+    transactions still in flight are not left behind the snapshot.
+    """
+    if at is None:
+        at = datetime.utcnow() - timedelta(seconds=settings.STOCK_SNAPSHOT_SETTLE_SECONDS)
+    newest = (await session.execute(select(func.max(StockSnapshot.taken_at)))).scalar()
+    if newest is not None and newest >= at:
+        return 0
+
+    balances = balances_query(at).subquery()
+    source = select(
+        balances.c.warehouse_id,
+        literal(at, type_=StockSnapshot.taken_at.type),
+        balances.c.material_id,
+        balances.c.on_hand_qty,
+    ).where(balances.c.on_hand_qty != 0)
+    result = await session.execute(
+        insert(StockSnapshot).from_select(["warehouse_id", "taken_at", "material_id", "on_hand_qty"], source)
+    )
+    return result.rowcount
+
+
+def ledger_check_query():
+    """Rows where the ledger balance and current_stock disagree."""
+    ledger = balances_query().subquery()
+    parts = union_all(
+        select(
+            ledger.c.warehouse_id,
+            ledger.c.material_id,
+            ledger.c.on_hand_qty.label("ledger_qty"),
+            literal(0).label("on_hand_qty"),
+        ),
+        select(CurrentStock.warehouse_id, CurrentStock.material_id, literal(0), CurrentStock.on_hand_qty),
+    ).subquery()
+    ledger_qty = func.sum(parts.c.ledger_qty)
+    on_hand_qty = func.sum(parts.c.on_hand_qty)
+    return (
+        select(parts.c.warehouse_id, parts.c.material_id, ledger_qty.label("ledger_qty"), on_hand_qty.label("on_hand_qty"))
+        .group_by(parts.c.warehouse_id, parts.c.material_id)
+        .having(ledger_qty != on_hand_qty)
+        .order_by(parts.c.warehouse_id, parts.c.material_id)
+    )
+
+
+async def reconcile_ledger(session: AsyncSession) -> int:
+    """Writes an "adjustment" movement for every mismatch, making current_stock the source of truth."""
+    rows = (await session.execute(ledger_check_query())).all()
+    await record_movements(
+        session,
+        [movement(r.warehouse_id, r.material_id, r.on_hand_qty - r.ledger_qty, "adjustment") for r in rows],
+    )
+    return len(rows)
+
+
+class StockSnapshotter:
+    """Background task taking a ledger snapshot every STOCK_SNAPSHOT_INTERVAL_SECONDS."""
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+        self.snapshots = 0
+        self.last_rows = 0
+        self.last_taken_at: datetime | None = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.STOCK_SNAPSHOT_INTERVAL_SECONDS)
+            try:
+                async with AsyncSessionLocal() as session:
+                    rows = await take_snapshot(session)
+                    await session.commit()
+                self.snapshots += 1
+                self.last_rows = rows
+                self.last_taken_at = datetime.utcnow()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("stock snapshot failed")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "snapshots": self.snapshots,
+            "last_rows": self.last_rows,
+            "last_taken_at": self.last_taken_at.isoformat() if self.last_taken_at else None,
+        }
+
+
+stock_snapshotter = StockSnapshotter()
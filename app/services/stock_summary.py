@@ -0,0 +1,89 @@
+from sqlalchemy import select, delete, func, literal, true, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.dialect import dialect_insert
+from app.models.current_stock import CurrentStock
+from app.models.material import Material
+from app.models.stock_summary import StockSummary
+from app.models.transfer import Transfer
+from app.models.warehouse import Warehouse
+from app.services.stock import to_qty
+
+
+async def apply_stock_delta(session: AsyncSession, warehouse_id: int, material_id: int, on_hand=0, in_transit=0) -> None:
+    """Adds deltas to the summary row of (warehouse, category of material) in one upsert.
+
+    Branch and category are resolved inside the statement
+    (INSERT ... SELECT ... ON CONFLICT DO UPDATE), so there is no extra round trip.
+    """
+    on_hand = to_qty(on_hand)
+    in_transit = to_qty(in_transit)
+    if not on_hand and not in_transit:
+        return
+
+    insert = dialect_insert(session)
+    table = StockSummary.__table__
+
+    source = select(
+        Warehouse.id,
+        func.coalesce(Material.category, ""),
+        Warehouse.branch_id,
+        literal(on_hand, type_=table.c.on_hand_qty.type),
+        literal(in_transit, type_=table.c.in_transit_qty.type),
+    ).select_from(Warehouse).join(Material, true()).where(Warehouse.id == warehouse_id, Material.id == material_id)
+
+    stmt = insert(table).from_select(
+        ["warehouse_id", "category", "branch_id", "on_hand_qty", "in_transit_qty"], source
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.warehouse_id, table.c.category],
+        set_={
+            "on_hand_qty": table.c.on_hand_qty + stmt.excluded.on_hand_qty,
+            "in_transit_qty": table.c.in_transit_qty + stmt.excluded.in_transit_qty,
+        },
+    )
+    await session.execute(stmt)
+
+
+async def rebuild_stock_summary(session: AsyncSession) -> int:
+    """Recomputes the whole summary from current_stock and in-transit transfers (backfill / drift repair)."""
+    on_hand = (
+        select(
+            CurrentStock.warehouse_id.label("warehouse_id"),
+            func.coalesce(Material.category, "").label("category"),
+            CurrentStock.on_hand_qty.label("on_hand_qty"),
+            literal(0).label("in_transit_qty"),
+        )
+        .join(Material, Material.id == CurrentStock.material_id)
+    )
+    in_transit = (
+        select(
+            Transfer.to_warehouse_id,
+            func.coalesce(Material.category, ""),
+            literal(0),
+            Transfer.shipped_qty,
+        )
+        .join(Material, Material.id == Transfer.material_id)
+        .where(Transfer.status == "in_transit")
+    )
+    parts = union_all(on_hand, in_transit).subquery()
+
+    source = (
+        select(
+            parts.c.warehouse_id,
+            parts.c.category,
+            Warehouse.branch_id,
+            func.sum(parts.c.on_hand_qty),
+            func.sum(parts.c.in_transit_qty),
+        )
+        .join(Warehouse, Warehouse.id == parts.c.warehouse_id)
+        .group_by(parts.c.warehouse_id, parts.c.category, Warehouse.branch_id)
+    )
+
+    await session.execute(delete(StockSummary))
+    result = await session.execute(
+        StockSummary.__table__.insert().from_select(
+            ["warehouse_id", "category", "branch_id", "on_hand_qty", "in_transit_qty"], source
+        )
+    )
+    return result.rowcount
@@ -0,0 +1,74 @@
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import update, case, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models.transfer import Transfer
+
+# action -> (statuses it may start from, statuses it may end in)
+TRANSITIONS: dict[str, tuple[tuple[str, ...], tuple[str, ...]]] = {
+    "assign": (("draft",), ("assigned",)),
+    "dispatch": (("assigned",), ("in_transit",)),
+    "receive": (("in_transit",), ("received", "discrepancy")),
+    # route planning: drivers change on open transfers, drafts with storekeepers become assigned
+    "plan": (("draft", "assigned"), ("draft", "assigned")),
+}
+
+CONFLICT = "Transfer was changed by another request, reload and retry"
+
+
+def check_transition(action: str, current: str) -> None:
+    """Raises 400 unless action may start from status current."""
+    sources, _ = TRANSITIONS[action]
+    if current not in sources:
+        raise HTTPException(400, f"Cannot {action} from status={current}")
+
+
+async def claim_transitions(session: AsyncSession, action: str, moves: list[tuple[Transfer, str]]) -> set[int]:
+    """Moves transfers to new statuses with one conditional UPDATE; returns the ids that moved.
+
+    Each row is matched on (id, version) as it was read, so a transfer that
+    another request changed in the meantime is simply not updated (and not
+    returned) instead of being overwritten. Winners get version + 1 and their
+    new status, in the database and on the loaded objects. No row is locked
+    before this statement, so the caller should claim before its other writes
+    and treat a missing id as a conflict.
+    """
+    if not moves:
+        return set()
+    sources, targets = TRANSITIONS[action]
+    for t, to_status in moves:
+        if to_status not in targets:
+            raise ValueError(f"{action} cannot move a transfer to status={to_status}")
+
+    new_status = {t.id: to_status for t, to_status in moves}
+    stmt = (
+        update(Transfer)
+        .where(
+            tuple_(Transfer.id, Transfer.version).in_([(t.id, t.version) for t, _ in moves]),
+            Transfer.status.in_(sources),
+        )
+        .values(
+            status=case(new_status, value=Transfer.id) if len(set(new_status.values())) > 1 else moves[0][1],
+            version=Transfer.version + 1,
+            updated_at=datetime.utcnow(),
+        )
+        .returning(Transfer.id)
+        .execution_options(synchronize_session=False)
+    )
+    won = set((await session.execute(stmt)).scalars())
+
+    for t, to_status in moves:
+        # moves may also be plain (id, version) rows, see route planning
+        if t.id in won and isinstance(t, Transfer):
+            set_committed_value(t, "status", to_status)
+            set_committed_value(t, "version", t.version + 1)
+    return won
+
+
+async def claim_transition(session: AsyncSession, action: str, t: Transfer, to_status: str) -> None:
+    """claim_transitions for one transfer; a lost race is a 409."""
+    if not await claim_transitions(session, action, [(t, to_status)]):
+        raise HTTPException(status.HTTP_409_CONFLICT, CONFLICT)
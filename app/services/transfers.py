@@ -1,41 +1,23 @@
 import json
+from collections import defaultdict
+from decimal import Decimal
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, update, or_, Select
+from sqlalchemy.orm.attributes import set_committed_value
 from fastapi import HTTPException, status
 from datetime import timezone
 
 from app.models.transfer import Transfer
 from app.models.transfer_event import TransferEvent
-from app.models.current_stock import CurrentStock
+from app.services.stock import to_qty, decrement_stock, increment_stock, lock_stock_rows
+from app.services.stock_summary import apply_stock_delta
+from app.services.stock_ledger import movement, record_movements
+from app.core.permissions import WarehouseScope
+from app.services.transfer_states import CONFLICT, check_transition, claim_transition, claim_transitions
+from app.models.warehouse import Warehouse
+from app.models.material import Material
 
 
-async def _get_or_create_stock(session: AsyncSession, warehouse_id: int, material_id: int) -> CurrentStock:
-    stock = (
-        await session.execute(
-            select(CurrentStock).where(
-                CurrentStock.warehouse_id == warehouse_id,
-                CurrentStock.material_id == material_id
-            )
-        )
-    ).scalar_one_or_none()
-
-    if stock:
-        return stock
-    stock = CurrentStock(warehouse_id=warehouse_id, material_id=material_id, on_hand_qty=0)
-    session.add(stock)
-    await session.flush()
-
-    return stock
-
-async def _ensure_idempotent(session: AsyncSession, idempotency_key: str) -> None:
-    exists = (
-        await session.execute(
-            select(TransferEvent.id).where(TransferEvent.idempotency_key == idempotency_key)
-        )
-    ).scalar_one_or_none()
-    if exists:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Duplicate request (idempotency key already used)")
-
 def _to_naive_utc(dt):
     """Accepts datetime or None. Returns naive datetime in UTC."""
     if dt is None:
@@ -44,6 +26,26 @@ def _to_naive_utc(dt):
         return dt.astimezone(timezone.utc).replace(tzinfo=None)
     return dt
 
+def filter_transfers(stmt: Select, f) -> Select:
+    """Applies a TransferFilter to a statement selecting from transfers."""
+    if f.status is not None:
+        stmt = stmt.where(Transfer.status == f.status)
+    if f.warehouse_id is not None:
+        stmt = stmt.where(or_(Transfer.from_warehouse_id == f.warehouse_id, Transfer.to_warehouse_id == f.warehouse_id))
+    if f.from_warehouse_id is not None:
+        stmt = stmt.where(Transfer.from_warehouse_id == f.from_warehouse_id)
+    if f.to_warehouse_id is not None:
+        stmt = stmt.where(Transfer.to_warehouse_id == f.to_warehouse_id)
+    if f.material_id is not None:
+        stmt = stmt.where(Transfer.material_id == f.material_id)
+    if f.driver_id is not None:
+        stmt = stmt.where(Transfer.driver_id == f.driver_id)
+    if f.deadline_from is not None:
+        stmt = stmt.where(Transfer.deadline_at >= _to_naive_utc(f.deadline_from))
+    if f.deadline_to is not None:
+        stmt = stmt.where(Transfer.deadline_at < _to_naive_utc(f.deadline_to))
+    return stmt
+
 async def create_transfer(session: AsyncSession, operator_id: int, data) -> Transfer:
     deadline = _to_naive_utc(data.deadline_at)
 
@@ -65,145 +67,375 @@ async def create_transfer(session: AsyncSession, operator_id: int, data) -> Tran
             event_type="created",
             actor_user_id=operator_id,
             payload_json=json.dumps({"planned_qty": float(data.planned_qty)}),
+            planned_qty=data.planned_qty,
         )
     )
     return t
 
-async def dispatch_transfer(
-    session: AsyncSession,
-    transfer_id: int,
-    actor_id: int,
-    shipped_qty: float,
-    seal_number: str | None,
-    idempotency_key: str,
-):
-    await _ensure_idempotent(session, idempotency_key)
+async def create_transfers_bulk(session: AsyncSession, operator_id: int, items: list) -> list[tuple[Transfer | None, str | None]]:
+    """Validates the whole batch up front and inserts the valid items with two multi-row INSERTs.
+
+    Returns one (transfer, error) pair per input item, in input order.
+    """
+    warehouse_ids = {i.from_warehouse_id for i in items} | {i.to_warehouse_id for i in items}
+    material_ids = {i.material_id for i in items}
+
+    known_warehouses = set(
+        (await session.execute(select(Warehouse.id).where(Warehouse.id.in_(warehouse_ids)))).scalars()
+    )
+    known_materials = set(
+        (await session.execute(select(Material.id).where(Material.id.in_(material_ids)))).scalars()
+    )
 
+    errors: list[str | None] = []
+    rows = []
+    for item in items:
+        # VALIDATION (same rules as the table constraints, plus FK existence)
+        if item.planned_qty <= 0:
+            errors.append("planned_qty must be > 0")
+        elif item.from_warehouse_id == item.to_warehouse_id:
+            errors.append("from_warehouse_id and to_warehouse_id must differ")
+        elif item.from_warehouse_id not in known_warehouses:
+            errors.append(f"Warehouse {item.from_warehouse_id} not found")
+        elif item.to_warehouse_id not in known_warehouses:
+            errors.append(f"Warehouse {item.to_warehouse_id} not found")
+        elif item.material_id not in known_materials:
+            errors.append(f"Material {item.material_id} not found")
+        else:
+            errors.append(None)
+            rows.append(
+                {
+                    "from_warehouse_id": item.from_warehouse_id,
+                    "to_warehouse_id": item.to_warehouse_id,
+                    "material_id": item.material_id,
+                    "planned_qty": item.planned_qty,
+                    "deadline_at": _to_naive_utc(item.deadline_at),
+                    "operator_id": operator_id,
+                    "status": "draft",
+                }
+            )
+
+    created: list[Transfer] = []
+    if rows:
+        created = list(
+            (
+                await session.scalars(
+                    insert(Transfer).returning(Transfer, sort_by_parameter_order=True),
+                    rows,
+                )
+            ).all()
+        )
+        await session.execute(
+            insert(TransferEvent),
+            [
+                {
+                    "transfer_id": t.id,
+                    "event_type": "created",
+                    "actor_user_id": operator_id,
+                    "payload_json": json.dumps({"planned_qty": float(t.planned_qty)}),
+                    "planned_qty": t.planned_qty,
+                }
+                for t in created
+            ],
+        )
+
+    results: list[tuple[Transfer | None, str | None]] = []
+    it = iter(created)
+    for error in errors:
+        results.append((None, error) if error else (next(it), None))
+    return results
+
+# Transfers are read without locks; status changes go through claim_transition(s)
+# (app/services/transfer_states.py), a conditional UPDATE on (id, version) that
+# loses cleanly with a 409 when another request got there first. Claim before
+# any other write, so the loser has nothing to undo.
+
+async def _load_transfer(session: AsyncSession, transfer_id: int) -> Transfer:
     t = (await session.execute(select(Transfer).where(Transfer.id == transfer_id))).scalar_one_or_none()
     if not t:
         raise HTTPException(404, "Transfer not found")
+    return t
+
+async def _load_transfers(session: AsyncSession, transfer_ids) -> dict[int, Transfer]:
+    rows = (await session.execute(select(Transfer).where(Transfer.id.in_(set(transfer_ids))))).scalars()
+    return {t.id: t for t in rows}
 
+def _validate_dispatch(t: Transfer, shipped_qty) -> Decimal:
     # GUARD
-    if t.status != "assigned":
-        raise HTTPException(400, f"Cannot dispatch from status={t.status}")
+    check_transition("dispatch", t.status)
 
     # VALIDATION
+    shipped_qty = to_qty(shipped_qty)
     if shipped_qty <= 0:
         raise HTTPException(400, "shipped_qty must be > 0")
-    if float(shipped_qty) > float(t.planned_qty):
+    if shipped_qty > to_qty(t.planned_qty):
         raise HTTPException(400, "shipped_qty cannot be greater than planned_qty")
+    return shipped_qty
 
-    # stock check + update
-    stock_from = await _get_or_create_stock(session, t.from_warehouse_id, t.material_id)
-    if float(stock_from.on_hand_qty) < float(shipped_qty):
-        raise HTTPException(400, "Not enough stock to dispatch")
-
-    stock_from.on_hand_qty = float(stock_from.on_hand_qty) - float(shipped_qty)
-
-    # update transfer fact fields
-    t.shipped_qty = float(shipped_qty)
-    t.status = "in_transit"
+def _apply_dispatch(t: Transfer, actor_id: int, shipped_qty: Decimal, seal_number: str | None, idempotency_key: str) -> TransferEvent:
+    # update transfer fact fields (status was claimed already)
+    t.shipped_qty = shipped_qty
     if seal_number:
         t.seal_number = seal_number
     t.storekeeper_from_id = actor_id
 
-    session.add(
-        TransferEvent(
-            transfer_id=t.id,
-            event_type="pickup_confirmed",
-            actor_user_id=actor_id,
-            idempotency_key=idempotency_key,
-            payload_json=json.dumps({"shipped_qty": float(shipped_qty), "seal_number": seal_number}),
-        )
+    return TransferEvent(
+        transfer_id=t.id,
+        event_type="pickup_confirmed",
+        actor_user_id=actor_id,
+        idempotency_key=idempotency_key,
+        payload_json=json.dumps({"shipped_qty": float(shipped_qty), "seal_number": seal_number}),
+        shipped_qty=shipped_qty,
     )
-    return t
-
-
-async def receive_transfer(
-    session: AsyncSession,
-    transfer_id: int,
-    actor_id: int,
-    received_qty: float,
-    damaged_qty: float,
-    idempotency_key: str,
-):
-    await _ensure_idempotent(session, idempotency_key)
-
-    t = (await session.execute(select(Transfer).where(Transfer.id == transfer_id))).scalar_one_or_none()
-    if not t:
-        raise HTTPException(404, "Transfer not found")
 
+def _validate_receive(t: Transfer, received_qty, damaged_qty) -> tuple[Decimal, Decimal]:
     # GUARD
-    if t.status != "in_transit":
-        raise HTTPException(400, f"Cannot receive from status={t.status}")
+    check_transition("receive", t.status)
 
     # VALIDATION
+    received_qty = to_qty(received_qty)
+    damaged_qty = to_qty(damaged_qty)
     if received_qty < 0:
         raise HTTPException(400, "received_qty must be >= 0")
     if damaged_qty < 0:
         raise HTTPException(400, "damaged_qty must be >= 0")
 
-    shipped = float(t.shipped_qty)
+    shipped = to_qty(t.shipped_qty)
     if shipped <= 0:
         raise HTTPException(400, "Cannot receive: shipped_qty is not set")
 
-    if float(received_qty) + float(damaged_qty) > shipped:
+    if received_qty + damaged_qty > shipped:
         raise HTTPException(400, "received_qty + damaged_qty cannot exceed shipped_qty")
+    return received_qty, damaged_qty
+
+def _receive_status(t: Transfer, received_qty: Decimal, damaged_qty: Decimal) -> str:
+    shipped = to_qty(t.shipped_qty)
+    if (received_qty == shipped) and (damaged_qty == 0) and (shipped == to_qty(t.planned_qty)):
+        return "received"
+    return "discrepancy"
+
+def _apply_receive(t: Transfer, actor_id: int, received_qty: Decimal, damaged_qty: Decimal, idempotency_key: str) -> TransferEvent:
+    # update transfer fact fields (status was claimed already, see _receive_status)
+    t.received_qty = received_qty
+    t.damaged_qty = damaged_qty
+    t.storekeeper_to_id = actor_id
+    event_type = "delivery_confirmed" if t.status == "received" else "delivery_with_discrepancy"
 
-    # stock update (+ only received, damaged doesn't add to on_hand)
-    stock_to = await _get_or_create_stock(session, t.to_warehouse_id, t.material_id)
-    stock_to.on_hand_qty = float(stock_to.on_hand_qty) + float(received_qty)
+    return TransferEvent(
+        transfer_id=t.id,
+        event_type=event_type,
+        actor_user_id=actor_id,
+        idempotency_key=idempotency_key,
+        payload_json=json.dumps({"received_qty": float(received_qty), "damaged_qty": float(damaged_qty)}),
+        received_qty=received_qty,
+        damaged_qty=damaged_qty,
+    )
 
-    # update transfer fact fields
-    t.received_qty = float(received_qty)
-    t.damaged_qty = float(damaged_qty)
-    t.storekeeper_to_id = actor_id
+async def _apply_summary_deltas(session: AsyncSession, deltas: dict[tuple[int, int], list[Decimal]]) -> None:
+    for (warehouse_id, material_id), (on_hand, in_transit) in sorted(deltas.items()):
+        await apply_stock_delta(session, warehouse_id, material_id, on_hand=on_hand, in_transit=in_transit)
 
-    # status decision
-    if (float(received_qty) == shipped) and (float(damaged_qty) == 0) and (shipped == float(t.planned_qty)):
-        t.status = "received"
-        event_type = "delivery_confirmed"
-    else:
-        t.status = "discrepancy"
-        event_type = "delivery_with_discrepancy"
+async def dispatch_transfer(
+    session: AsyncSession,
+    transfer_id: int,
+    actor_id: int,
+    shipped_qty: float,
+    seal_number: str | None,
+    idempotency_key: str,
+    scope: WarehouseScope | None = None,
+):
+    t = await _load_transfer(session, transfer_id)
+    if scope is not None:
+        scope.check(t.from_warehouse_id)
+    shipped_qty = _validate_dispatch(t, shipped_qty)
+    await claim_transition(session, "dispatch", t, "in_transit")
+
+    # stock check + update in one atomic statement
+    await decrement_stock(session, t.from_warehouse_id, t.material_id, shipped_qty)
+    await record_movements(session, [movement(t.from_warehouse_id, t.material_id, -shipped_qty, "dispatch", t.id)])
+    await apply_stock_delta(session, t.from_warehouse_id, t.material_id, on_hand=-shipped_qty)
+    await apply_stock_delta(session, t.to_warehouse_id, t.material_id, in_transit=shipped_qty)
+
+    session.add(_apply_dispatch(t, actor_id, shipped_qty, seal_number, idempotency_key))
+    return t
 
-    session.add(
-        TransferEvent(
-            transfer_id=t.id,
-            event_type=event_type,
-            actor_user_id=actor_id,
-            idempotency_key=idempotency_key,
-            payload_json=json.dumps({"received_qty": float(received_qty), "damaged_qty": float(damaged_qty)}),
+
+def _validate_batch(items, transfers: dict[int, Transfer], validate) -> tuple[list, list]:
+    """Runs validate(t, item) for every item; returns per-item errors and the (index, t, result) that passed."""
+    errors: list[str | None] = [None] * len(items)
+    passed: list[tuple[int, Transfer, object]] = []
+    seen: set[int] = set()
+    for i, item in enumerate(items):
+        t = transfers.get(item.transfer_id)
+        try:
+            if t is None:
+                raise HTTPException(404, "Transfer not found")
+            if t.id in seen:
+                raise HTTPException(400, "Transfer appears more than once in the batch")
+            passed.append((i, t, validate(t, item)))
+        except HTTPException as e:
+            errors[i] = e.detail
+            continue
+        seen.add(t.id)
+    return errors, passed
+
+
+async def dispatch_transfers_batch(
+    session: AsyncSession, actor_id: int, items: list, idempotency_key: str, scope: WarehouseScope | None = None,
+) -> list[tuple[Transfer | None, str | None]]:
+    """Dispatches a truck load in one transaction.
+
+    All transfers are read with one SELECT and moved to in_transit with one
+    conditional UPDATE (claim_transitions); then the source stock rows of
+    the winners are locked with one SELECT ... FOR UPDATE (in key order, see
+    lock_stock_rows) and checked in memory. Items that fail, lose a race or
+    find too little stock (their claim is put back) are reported and
+    skipped, the rest are applied. Event idempotency keys are derived from
+    the batch key as "<key>:<transfer_id>".
+    """
+    transfers = await _load_transfers(session, [i.transfer_id for i in items])
+    def validate(t, item):
+        if scope is not None:
+            scope.check(t.from_warehouse_id)
+        return _validate_dispatch(t, item.shipped_qty)
+
+    errors, passed = _validate_batch(items, transfers, validate)
+    won = await claim_transitions(session, "dispatch", [(t, "in_transit") for _, t, _ in passed])
+    stocks = await lock_stock_rows(session, [(t.from_warehouse_id, t.material_id) for _, t, _ in passed if t.id in won])
+
+    applied: dict[int, Transfer] = {}
+    released: list[Transfer] = []
+    deltas: dict[tuple[int, int], list[Decimal]] = defaultdict(lambda: [Decimal(0), Decimal(0)])
+    movements: list[dict] = []
+    for i, t, shipped_qty in passed:
+        if t.id not in won:
+            errors[i] = CONFLICT
+            continue
+        stock = stocks.get((t.from_warehouse_id, t.material_id))
+        if stock is None or to_qty(stock.on_hand_qty) < shipped_qty:
+            errors[i] = "Not enough stock to dispatch"
+            released.append(t)
+            continue
+
+        stock.on_hand_qty = to_qty(stock.on_hand_qty) - shipped_qty
+        movements.append(movement(t.from_warehouse_id, t.material_id, -shipped_qty, "dispatch", t.id))
+        deltas[(t.from_warehouse_id, t.material_id)][0] -= shipped_qty
+        deltas[(t.to_warehouse_id, t.material_id)][1] += shipped_qty
+        session.add(_apply_dispatch(t, actor_id, shipped_qty, items[i].seal_number, f"{idempotency_key}:{t.id}"))
+        applied[i] = t
+
+    if released:
+        # claimed but not dispatched: back to assigned (the row is ours until commit)
+        await session.execute(
+            update(Transfer).where(Transfer.id.in_([t.id for t in released])).values(status="assigned")
+            .execution_options(synchronize_session=False)
         )
-    )
+        for t in released:
+            set_committed_value(t, "status", "assigned")
+
+    await record_movements(session, movements)
+    await _apply_summary_deltas(session, deltas)
+    return [(applied.get(i), errors[i]) for i in range(len(items))]
+
 
+async def receive_transfer(
+    session: AsyncSession,
+    transfer_id: int,
+    actor_id: int,
+    received_qty: float,
+    damaged_qty: float,
+    idempotency_key: str,
+    scope: WarehouseScope | None = None,
+):
+    t = await _load_transfer(session, transfer_id)
+    if scope is not None:
+        scope.check(t.to_warehouse_id)
+    received_qty, damaged_qty = _validate_receive(t, received_qty, damaged_qty)
+    await claim_transition(session, "receive", t, _receive_status(t, received_qty, damaged_qty))
+
+    # stock update (+ only received, damaged doesn't add to on_hand)
+    if received_qty > 0:
+        await increment_stock(session, t.to_warehouse_id, t.material_id, received_qty)
+        await record_movements(session, [movement(t.to_warehouse_id, t.material_id, received_qty, "receive", t.id)])
+    await apply_stock_delta(session, t.to_warehouse_id, t.material_id, on_hand=received_qty, in_transit=-to_qty(t.shipped_qty))
+
+    session.add(_apply_receive(t, actor_id, received_qty, damaged_qty, idempotency_key))
     return t
 
 
+async def receive_transfers_batch(
+    session: AsyncSession, actor_id: int, items: list, idempotency_key: str, scope: WarehouseScope | None = None,
+) -> list[tuple[Transfer | None, str | None]]:
+    """Receives a truck load in one transaction; same claim-then-lock scheme as dispatch_transfers_batch."""
+    transfers = await _load_transfers(session, [i.transfer_id for i in items])
+    def validate(t, item):
+        if scope is not None:
+            scope.check(t.to_warehouse_id)
+        return _validate_receive(t, item.received_qty, item.damaged_qty)
 
-async def assign_transfer(session, transfer_id: int, actor_id: int, data):
+    errors, passed = _validate_batch(items, transfers, validate)
+    won = await claim_transitions(
+        session, "receive", [(t, _receive_status(t, *qty)) for _, t, qty in passed],
+    )
+    stocks = await lock_stock_rows(session, [(t.to_warehouse_id, t.material_id) for _, t, _ in passed if t.id in won])
+
+    applied: dict[int, Transfer] = {}
+    deltas: dict[tuple[int, int], list[Decimal]] = defaultdict(lambda: [Decimal(0), Decimal(0)])
+    missing: dict[tuple[int, int], Decimal] = defaultdict(Decimal)
+    movements: list[dict] = []
+    for i, t, (received_qty, damaged_qty) in passed:
+        if t.id not in won:
+            errors[i] = CONFLICT
+            continue
+
+        # stock update (+ only received, damaged doesn't add to on_hand)
+        key = (t.to_warehouse_id, t.material_id)
+        if key in stocks:
+            stocks[key].on_hand_qty = to_qty(stocks[key].on_hand_qty) + received_qty
+        elif received_qty > 0:
+            missing[key] += received_qty
+        if received_qty > 0:
+            movements.append(movement(t.to_warehouse_id, t.material_id, received_qty, "receive", t.id))
+        deltas[key][0] += received_qty
+        deltas[key][1] -= to_qty(t.shipped_qty)
+        session.add(_apply_receive(t, actor_id, received_qty, damaged_qty, f"{idempotency_key}:{t.id}"))
+        applied[i] = t
+
+    # first receipt of a material at a warehouse: no row to lock yet, upsert it
+    for (warehouse_id, material_id), qty in sorted(missing.items()):
+        await increment_stock(session, warehouse_id, material_id, qty)
+    await record_movements(session, movements)
+    await _apply_summary_deltas(session, deltas)
+    return [(applied.get(i), errors[i]) for i in range(len(items))]
+
+
+
+async def assign_transfer(session, transfer_id: int, actor_id: int, data, scope: WarehouseScope | None = None):
     t = (await session.execute(select(Transfer).where(Transfer.id == transfer_id))).scalar_one_or_none()
     if not t:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transfer not found")
     
-    if t.status != 'draft':
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Cannot assign from status={t.status}")
-    
-    if data.driver_id is not None:
-        t.driver_id  = data.driver.id
-    if data.storekeeper_from_id is not None:
-        t.storekeeper_from_id = data.storekeeper_from_id
-    if data.storekeeper_to_id is not None:
-        t.storekeeper_to_id = data.storekeeper_to_id
-
-    if not (t.driver_id and t.storekeeper_from_id and t.storekeeper_to_id):
+    if scope is not None:
+        scope.check(t.from_warehouse_id, t.to_warehouse_id)
+    check_transition("assign", t.status)
+
+    # resolved before touching t: setting attributes first would autoflush them ahead of the claim
+    driver_id = data.driver_id if data.driver_id is not None else t.driver_id
+    storekeeper_from_id = data.storekeeper_from_id if data.storekeeper_from_id is not None else t.storekeeper_from_id
+    storekeeper_to_id = data.storekeeper_to_id if data.storekeeper_to_id is not None else t.storekeeper_to_id
+
+    if not (driver_id and storekeeper_from_id and storekeeper_to_id):
         raise HTTPException(400, "driver_id, storekeeper_from_id, storekeeper_to_id are required")
-    
-    t.status = "assigned"
+
+    await claim_transition(session, "assign", t, "assigned")
+    t.driver_id = driver_id
+    t.storekeeper_from_id = storekeeper_from_id
+    t.storekeeper_to_id = storekeeper_to_id
 
     session.add(TransferEvent(
         transfer_id=t.id,
         event_type="assigned",
+        actor_user_id=actor_id,
         payload_json=json.dumps({
                 "driver_id": t.driver_id,
                 "storekeeper_from_id": t.storekeeper_from_id,
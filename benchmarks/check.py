@@ -0,0 +1,105 @@
+"""Runs the micro-benchmarks and a short lifecycle load test and compares them to baseline.json.
+
+Exits non-zero if any timing is more than --tolerance slower than its
+baseline, or if any operation issues more SQL statements than it did when
+the baseline was recorded (statement counts are exact per call, not timed).
+
+    python -m benchmarks.check              # compare
+    python -m benchmarks.check --update     # record a new baseline on this machine
+
+Baselines are machine- and database-specific: record them on the machine
+and database (dialect is stored in the file) that the check runs on.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+from app.db.session import engine
+from benchmarks import lifecycle, micro
+
+BASELINE = Path(__file__).with_name("baseline.json")
+
+
+async def measure(config: dict, schema: bool) -> dict:
+    micro_results = await micro.run(config["iterations"], schema=schema)
+    report = await lifecycle.run(config["flows"], config["concurrency"])
+    return {
+        "dialect": report["dialect"],
+        "config": config,
+        "micro_us": micro_results,
+        "lifecycle": {
+            op: {"p50_ms": s["p50_ms"], "statements": s["statements"]}
+            for op, s in report["operations"].items()
+        },
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list[str]:
+    failures = []
+    if baseline["dialect"] != current["dialect"]:
+        print(f"warning: baseline was recorded on {baseline['dialect']}, running on {current['dialect']}")
+
+    def timed(name: str, base: float, now: float, unit: str):
+        limit = base * (1 + tolerance)
+        status = "FAIL" if now > limit else "ok"
+        print(f"{status:<5}{name:<40}{base:>12.2f}{now:>12.2f} {unit}")
+        if now > limit:
+            failures.append(f"{name}: {now:.2f} {unit} > {limit:.2f} {unit}")
+
+    for name, base in baseline["micro_us"].items():
+        if name in current["micro_us"]:
+            timed(name, base, current["micro_us"][name], "us")
+
+    for op, base in baseline["lifecycle"].items():
+        now = current["lifecycle"].get(op)
+        if now is None:
+            continue
+        timed(f"{op} p50", base["p50_ms"], now["p50_ms"], "ms")
+        # per-call averages: an occasional reference_versions revalidation (at most one per
+        # REFERENCE_CACHE_REVALIDATE_SECONDS, see ReferenceCache.version) adds a fraction, not a statement
+        base_n, now_n = round(base["statements"]), round(now["statements"])
+        status = "FAIL" if now_n > base_n else "ok"
+        print(f"{status:<5}{op + ' statements':<40}{base['statements']:>12}{now['statements']:>12}")
+        if now_n > base_n:
+            failures.append(f"{op}: {now['statements']} statements per call, baseline {base['statements']}")
+    return failures
+
+
+async def main(args) -> int:
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else None
+    config = (baseline or {}).get("config") or {
+        "iterations": args.iterations, "flows": args.flows, "concurrency": args.concurrency,
+    }
+    if args.update:
+        config = {"iterations": args.iterations, "flows": args.flows, "concurrency": args.concurrency}
+
+    try:
+        current = await measure(config, schema=args.create_schema)
+    finally:
+        # otherwise a failed run hangs on the aiosqlite thread instead of exiting non-zero
+        await engine.dispose()
+
+    if args.update or baseline is None:
+        BASELINE.write_text(json.dumps(current, indent=2) + "\n")
+        print(f"baseline written to {BASELINE}")
+        return 0
+
+    failures = compare(baseline, current, args.tolerance)
+    if failures:
+        print("\nperformance regressions:\n  " + "\n  ".join(failures))
+        return 1
+    print("\nno regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--update", action="store_true", help="overwrite the baseline with this run")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown, 0.5 = 50%%")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--flows", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=1, help="1 keeps latencies comparable between runs")
+    parser.add_argument("--create-schema", action="store_true", help="create tables first (SQLite stand-in)")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,59 @@
+import uuid
+from decimal import Decimal
+
+from app.core.security import create_access_token
+from app.db.base import Base
+from app.db.session import AsyncSessionLocal, engine
+from app.models import Branch, Warehouse, Material, User, CurrentStock
+
+
+def percentile(values: list[float], p: float) -> float:
+    """p-th percentile (0..1) by nearest rank; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def create_schema() -> None:
+    """For a throwaway SQLite stand-in; real databases get their schema from alembic."""
+    import app.models  # noqa: F401
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def seed_fixtures(stock: Decimal = Decimal("1000000")) -> dict:
+    """One branch, two warehouses, one material with stock at the source, and one user per role.
+
+    Every call uses fresh names, so it can run repeatedly against the same database.
+    """
+    tag = uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as session:
+        branch = Branch(name=f"bench-{tag}")
+        session.add(branch)
+        await session.flush()
+
+        src = Warehouse(branch_id=branch.id, name=f"bench-src-{tag}")
+        dst = Warehouse(branch_id=branch.id, name=f"bench-dst-{tag}")
+        material = Material(name=f"bench-{tag}", category="bench", unit="kg")
+        users = {
+            role: User(full_name=f"bench {role}", email=f"bench-{role}-{tag}@example.com", password_hash="-", role=role)
+            for role in ("admin", "operator", "storekeeper", "driver")
+        }
+        session.add_all([src, dst, material, *users.values()])
+        await session.flush()
+
+        session.add(CurrentStock(warehouse_id=src.id, material_id=material.id, on_hand_qty=stock))
+        await session.commit()
+
+    return {
+        "branch_id": branch.id,
+        "from_warehouse_id": src.id,
+        "to_warehouse_id": dst.id,
+        "material_id": material.id,
+        "user_ids": {role: u.id for role, u in users.items()},
+        "headers": {
+            role: {"Authorization": f"Bearer {create_access_token(str(u.id))}"} for role, u in users.items()
+        },
+    }
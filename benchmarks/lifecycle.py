@@ -0,0 +1,141 @@
+"""End-to-end load test of the transfer lifecycle: create -> assign -> dispatch -> receive.
+
+Every flow goes through the FastAPI app in-process (httpx.ASGITransport),
+so routing, auth, validation, serialization and the database are all in the
+measurement. SQL statements per operation come from the X-DB-Statements
+header set by DbMetricsMiddleware.
+
+    python -m benchmarks.lifecycle --flows 500 --concurrency 32
+    DATABASE_URL=sqlite+aiosqlite:///bench.db python -m benchmarks.lifecycle --create-schema
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import httpx
+
+from app.db.session import engine
+from app.main import app
+from benchmarks.common import create_schema, percentile, seed_fixtures
+
+OPERATIONS = ("create", "assign", "dispatch", "receive")
+
+
+class OpStats:
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.statements: list[int] = []
+        self.errors = 0
+
+    def summary(self) -> dict:
+        n = len(self.latencies)
+        return {
+            "count": n,
+            "errors": self.errors,
+            "p50_ms": round(percentile(self.latencies, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(self.latencies, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(self.latencies, 0.99) * 1000, 3),
+            "statements": round(sum(self.statements) / n, 2) if n else 0,
+        }
+
+
+async def call(client: httpx.AsyncClient, stats: OpStats, path: str, body: dict, headers: dict) -> dict | None:
+    started = time.perf_counter()
+    r = await client.post(path, json=body, headers=headers)
+    stats.latencies.append(time.perf_counter() - started)
+    stats.statements.append(int(r.headers.get("x-db-statements", 0)))
+    if r.status_code != 200:
+        stats.errors += 1
+        return None
+    return r.json()
+
+
+async def flow(client: httpx.AsyncClient, fx: dict, stats: dict[str, OpStats], qty: float):
+    h = fx["headers"]
+    t = await call(client, stats["create"], "/transfers", {
+        "from_warehouse_id": fx["from_warehouse_id"],
+        "to_warehouse_id": fx["to_warehouse_id"],
+        "material_id": fx["material_id"],
+        "planned_qty": qty,
+    }, h["operator"])
+    if t is None:
+        return
+
+    tid = t["id"]
+    steps = [
+        ("assign", f"/transfers/{tid}/assign", {
+            "driver_id": fx["user_ids"]["driver"],
+            "storekeeper_from_id": fx["user_ids"]["storekeeper"],
+            "storekeeper_to_id": fx["user_ids"]["storekeeper"],
+        }, h["operator"]),
+        ("dispatch", f"/transfers/{tid}/dispatch", {
+            "shipped_qty": qty, "idempotency_key": uuid.uuid4().hex,
+        }, h["storekeeper"]),
+        ("receive", f"/transfers/{tid}/receive", {
+            "received_qty": qty, "idempotency_key": uuid.uuid4().hex,
+        }, h["storekeeper"]),
+    ]
+    for op, path, body, headers in steps:
+        if await call(client, stats[op], path, body, headers) is None:
+            return
+
+
+async def run(flows: int, concurrency: int, qty: float = 1.0, schema: bool = False) -> dict:
+    if schema:
+        await create_schema()
+    fx = await seed_fixtures()
+
+    stats = {op: OpStats() for op in OPERATIONS}
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(client):
+        async with sem:
+            await flow(client, fx, stats, qty)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # warm-up: fills the principal cache and the statement caches
+        await flow(client, fx, {op: OpStats() for op in OPERATIONS}, qty)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(client) for _ in range(flows)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "dialect": engine.dialect.name,
+        "flows": flows,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "flows_per_s": round(flows / elapsed, 2),
+        "operations": {op: s.summary() for op, s in stats.items()},
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"{report['flows']} flows, concurrency {report['concurrency']}, {report['dialect']}: "
+          f"{report['elapsed_s']}s, {report['flows_per_s']} flows/s")
+    print(f"{'op':<10}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'stmts':>8}")
+    for op, s in report["operations"].items():
+        print(f"{op:<10}{s['count']:>7}{s['errors']:>8}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}{s['statements']:>8}")
+
+
+async def main(args):
+    try:
+        report = await run(args.flows, args.concurrency, schema=args.create_schema)
+    finally:
+        await engine.dispose()
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--flows", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--create-schema", action="store_true", help="create tables first (SQLite stand-in)")
+    parser.add_argument("--json", action="store_true")
+    asyncio.run(main(parser.parse_args()))
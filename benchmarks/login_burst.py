@@ -0,0 +1,102 @@
+"""Latency of an unrelated endpoint (GET /health) while a burst of logins is running.
+
+Runs the FastAPI app in-process through httpx.ASGITransport, so anything
+that blocks the event loop shows up directly in the /health latencies.
+--inline verifies passwords on the event loop, as /auth/login used to, for
+comparison with the default thread-pool path.
+
+    python -m benchmarks.login_burst --logins 200 --concurrency 50
+    python -m benchmarks.login_burst --logins 200 --concurrency 50 --inline
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+import app.routers.auth as auth_router
+from app.core.security import hash_password, password_pool, verify_password
+from benchmarks.common import percentile
+from app.db.session import AsyncSessionLocal, engine
+from app.main import app
+from app.models import User
+
+PASSWORD = "bench-password"
+
+
+def pct(values: list[float], p: float) -> float:
+    return percentile(values, p) * 1000
+
+
+async def seed_user() -> str:
+    email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    async with AsyncSessionLocal() as session:
+        session.add(User(full_name="bench", email=email, password_hash=hash_password(PASSWORD), role="operator"))
+        await session.commit()
+    return email
+
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event, latencies: list[float], interval: float = 0.01):
+    # latency is measured from when the request *should* have been sent, so time
+    # spent waiting for a blocked event loop is counted (no coordinated omission)
+    due = time.perf_counter()
+    while not stop.is_set():
+        await client.get("/health")
+        latencies.append(time.perf_counter() - due)
+        due += interval
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def main(args):
+    if args.inline:
+        async def inline_verify(password, password_hash):
+            return verify_password(password, password_hash)
+        auth_router.verify_password_async = inline_verify
+
+    email = await seed_user()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # baseline: /health with nothing else going on
+        idle: list[float] = []
+        stop = asyncio.Event()
+        task = asyncio.create_task(probe(client, stop, idle))
+        await asyncio.sleep(1)
+        stop.set()
+        await task
+
+        # burst: logins + /health probe side by side
+        busy: list[float] = []
+        stop = asyncio.Event()
+        task = asyncio.create_task(probe(client, stop, busy))
+        sem = asyncio.Semaphore(args.concurrency)
+
+        async def login():
+            async with sem:
+                r = await client.post("/auth/login", json={"email": email, "password": PASSWORD})
+                return r.status_code
+
+        started = time.perf_counter()
+        codes = await asyncio.gather(*(login() for _ in range(args.logins)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await task
+    await engine.dispose()
+
+    print(f"mode:            {'inline (blocking)' if args.inline else f'pool ({password_pool.max_workers} workers)'}")
+    print(f"logins:          {args.logins} in {elapsed:.2f}s ({args.logins / elapsed:.1f}/s), "
+          f"{sum(c == 200 for c in codes)} ok, {sum(c == 503 for c in codes)} rejected")
+    print(f"/health idle:    p50 {pct(idle, 0.5):.1f} ms, p99 {pct(idle, 0.99):.1f} ms")
+    print(f"/health burst:   p50 {pct(busy, 0.5):.1f} ms, p99 {pct(busy, 0.99):.1f} ms ({len(busy)} samples)")
+    if not args.inline:
+        print(f"pool:            {password_pool.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--inline", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,121 @@
+"""Micro-benchmarks for hot paths that sit under every request.
+
+- get_current_user with a warm principal cache and with a cold one (DB lookup)
+- one stock mutation (decrement + increment, the replacement for
+  _get_or_create_stock) in its own transaction
+- serializing a list of TransferOut the way a list endpoint does
+
+    python -m benchmarks.micro
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from fastapi.security import HTTPAuthorizationCredentials
+from pydantic import TypeAdapter
+
+from app.core.principal_cache import principal_cache
+from app.core.rbac import get_current_user
+from app.db.session import AsyncSessionLocal, engine
+from app.models import Transfer
+from app.schemas.transfer import TransferOut
+from app.services.stock import decrement_stock, increment_stock
+from benchmarks.common import create_schema, seed_fixtures
+
+
+async def timeit(fn, iterations: int, repeat: int = 5) -> float:
+    """Microseconds per call of the coroutine function fn, best of `repeat` runs (like timeit.repeat)."""
+    await fn()  # warm-up
+    per_run = max(1, iterations // repeat)
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(per_run):
+            await fn()
+        best = min(best, (time.perf_counter() - started) / per_run)
+    return best * 1e6
+
+
+async def bench_current_user(fx: dict, iterations: int) -> dict:
+    token = fx["headers"]["operator"]["Authorization"].split()[1]
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    async def warm():
+        async with AsyncSessionLocal() as session:
+            await get_current_user(credentials, session)
+
+    async def cold():
+        principal_cache.clear()
+        await warm()
+
+    return {
+        "get_current_user_cached": await timeit(warm, iterations),
+        "get_current_user_uncached": await timeit(cold, iterations // 10 or 1),
+    }
+
+
+async def bench_stock(fx: dict, iterations: int) -> dict:
+    wh, mat = fx["from_warehouse_id"], fx["material_id"]
+
+    async def mutate():
+        async with AsyncSessionLocal() as session:
+            await decrement_stock(session, wh, mat, Decimal("1"))
+            await increment_stock(session, wh, mat, Decimal("1"))
+            await session.commit()
+
+    return {"stock_mutation": await timeit(mutate, iterations // 10 or 1)}
+
+
+async def bench_serialization(rows: int, iterations: int) -> dict:
+    now = datetime.utcnow()
+    transfers = [
+        Transfer(
+            id=i, from_warehouse_id=1, to_warehouse_id=2, material_id=3,
+            planned_qty=Decimal("10.5"), shipped_qty=Decimal("10.5"), received_qty=Decimal("10"),
+            damaged_qty=Decimal("0.5"), status="discrepancy", version=1, operator_id=1, driver_id=2,
+            storekeeper_from_id=3, storekeeper_to_id=4, seal_number="S-1", deadline_at=now,
+        )
+        for i in range(rows)
+    ]
+    adapter = TypeAdapter(list[TransferOut])
+
+    async def serialize():
+        adapter.dump_json(adapter.validate_python(transfers, from_attributes=True))
+
+    return {f"transfer_out_list_{rows}": await timeit(serialize, max(1, iterations // 100))}
+
+
+async def run(iterations: int = 1000, schema: bool = False) -> dict:
+    if schema:
+        await create_schema()
+    fx = await seed_fixtures()
+
+    results = {}
+    results.update(await bench_current_user(fx, iterations))
+    results.update(await bench_stock(fx, iterations))
+    results.update(await bench_serialization(1000, iterations))
+    return {name: round(us, 2) for name, us in results.items()}
+
+
+async def main(args):
+    try:
+        results = await run(args.iterations, schema=args.create_schema)
+    finally:
+        # a live aiosqlite thread would keep the process from exiting after an error
+        await engine.dispose()
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, us in results.items():
+            print(f"{name:<32}{us:>12.2f} us/op")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--create-schema", action="store_true", help="create tables first (SQLite stand-in)")
+    parser.add_argument("--json", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,125 @@
+"""Concurrency stress test for the stock mutation path.
+
+Creates one source warehouse with a limited amount of stock and more
+"assigned" transfers than that stock can cover, then dispatches all of them
+in parallel, each in its own session/transaction. Afterwards it checks that
+nothing was oversold and that on_hand_qty equals the initial stock minus
+everything that was successfully shipped.
+
+Run against a scratch database (it seeds its own rows and leaves them):
+
+    python -m benchmarks.stock_contention --concurrency 64 --transfers 200
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from decimal import Decimal
+
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.db.session import AsyncSessionLocal, engine
+from app.models import Branch, Warehouse, Material, User, Transfer, CurrentStock
+from app.services.transfers import dispatch_transfer
+from benchmarks.common import percentile
+
+
+async def seed(transfers: int, initial_stock: Decimal, qty: Decimal):
+    tag = uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as session:
+        branch = Branch(name=f"bench-{tag}")
+        session.add(branch)
+        await session.flush()
+
+        src = Warehouse(branch_id=branch.id, name=f"bench-src-{tag}")
+        dst = Warehouse(branch_id=branch.id, name=f"bench-dst-{tag}")
+        material = Material(name=f"bench-{tag}", category="bench", unit="kg")
+        actor = User(full_name="bench", email=f"bench-{tag}@example.com", password_hash="-", role="storekeeper")
+        session.add_all([src, dst, material, actor])
+        await session.flush()
+
+        session.add(CurrentStock(warehouse_id=src.id, material_id=material.id, on_hand_qty=initial_stock))
+        ts = [
+            Transfer(
+                from_warehouse_id=src.id,
+                to_warehouse_id=dst.id,
+                material_id=material.id,
+                planned_qty=qty,
+                status="assigned",
+                operator_id=actor.id,
+            )
+            for _ in range(transfers)
+        ]
+        session.add_all(ts)
+        await session.commit()
+        return src.id, material.id, actor.id, [t.id for t in ts]
+
+
+async def dispatch_one(sem: asyncio.Semaphore, transfer_id: int, actor_id: int, qty: Decimal, latencies: list):
+    async with sem:
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as session:
+            try:
+                await dispatch_transfer(
+                    session,
+                    transfer_id,
+                    actor_id=actor_id,
+                    shipped_qty=qty,
+                    seal_number=None,
+                    idempotency_key=f"bench-{uuid.uuid4().hex}",
+                )
+                await session.commit()
+                ok = True
+            except HTTPException as e:
+                await session.rollback()
+                if e.detail != "Not enough stock to dispatch":
+                    raise
+                ok = False
+        latencies.append(time.perf_counter() - started)
+        return ok
+
+
+async def main(args):
+    qty = Decimal(args.qty)
+    initial = Decimal(args.stock)
+    wh_id, material_id, actor_id, transfer_ids = await seed(args.transfers, initial, qty)
+
+    sem = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+    started = time.perf_counter()
+    results = await asyncio.gather(*(dispatch_one(sem, tid, actor_id, qty, latencies) for tid in transfer_ids))
+    elapsed = time.perf_counter() - started
+
+    async with AsyncSessionLocal() as session:
+        on_hand = (
+            await session.execute(
+                select(CurrentStock.on_hand_qty).where(
+                    CurrentStock.warehouse_id == wh_id, CurrentStock.material_id == material_id
+                )
+            )
+        ).scalar_one()
+    await engine.dispose()
+
+    shipped = sum(results)
+    expected_shipped = min(len(transfer_ids), int(initial // qty))
+
+    print(f"dispatches:  {len(transfer_ids)} (concurrency {args.concurrency})")
+    print(f"succeeded:   {shipped}, rejected: {len(transfer_ids) - shipped}")
+    print(f"on_hand_qty: {initial} -> {on_hand}")
+    print(f"throughput:  {len(transfer_ids) / elapsed:.1f} dispatch/s")
+    print(f"p50 / p99:   {percentile(latencies, 0.5) * 1000:.1f} ms / {percentile(latencies, 0.99) * 1000:.1f} ms")
+
+    assert on_hand >= 0, "stock went negative"
+    assert shipped == expected_shipped, f"expected {expected_shipped} successful dispatches, got {shipped}"
+    assert on_hand == initial - qty * shipped, "lost update: on_hand_qty does not match shipped total"
+    print("OK")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--transfers", type=int, default=200)
+    parser.add_argument("--stock", default="150")
+    parser.add_argument("--qty", default="1.5")
+    asyncio.run(main(parser.parse_args()))
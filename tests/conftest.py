@@ -0,0 +1,66 @@
+"""Tests run the app in-process (httpx.ASGITransport) against a throwaway SQLite database.
+
+    pip install -r requirements-test.txt
+    python -m pytest -q
+"""
+import os
+import tempfile
+
+# settings are read when app.core.config is first imported
+_db = os.path.join(tempfile.mkdtemp(prefix="warehouse-tests-"), "test.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_db}")
+os.environ.setdefault("DATABASE_URL_SYNC", f"sqlite:///{_db}")
+os.environ.setdefault("SECRET_KEY", "test")
+
+from decimal import Decimal
+
+import httpx
+import pytest
+
+from app.db.session import engine
+from app.main import app
+from benchmarks.common import create_schema, seed_fixtures
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def fx():
+    """Fresh branch, warehouses, material (1000 in stock at the source) and users; see seed_fixtures."""
+    await create_schema()
+    yield await seed_fixtures(stock=Decimal("1000"))
+    # pooled aiosqlite connections belong to this test's event loop
+    await engine.dispose()
+
+
+@pytest.fixture
+async def client():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+
+async def draft_transfer(client: httpx.AsyncClient, fx: dict, planned_qty: float) -> dict:
+    """Creates a transfer from the source to the destination warehouse."""
+    r = await client.post("/transfers", json={
+        "from_warehouse_id": fx["from_warehouse_id"],
+        "to_warehouse_id": fx["to_warehouse_id"],
+        "material_id": fx["material_id"],
+        "planned_qty": planned_qty,
+    }, headers=fx["headers"]["operator"])
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+async def assigned_transfer(client: httpx.AsyncClient, fx: dict, planned_qty: float) -> dict:
+    """draft_transfer, assigned to the fixture's driver and storekeeper."""
+    t = await draft_transfer(client, fx, planned_qty)
+    r = await client.post(f"/transfers/{t['id']}/assign", json={
+        "driver_id": fx["user_ids"]["driver"],
+        "storekeeper_from_id": fx["user_ids"]["storekeeper"],
+        "storekeeper_to_id": fx["user_ids"]["storekeeper"],
+    }, headers=fx["headers"]["operator"])
+    assert r.status_code == 200, r.text
+    return r.json()
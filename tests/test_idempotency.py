@@ -0,0 +1,45 @@
+import pytest
+
+from tests.conftest import assigned_transfer
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_replayed_key_returns_the_stored_response(client, fx):
+    t = await assigned_transfer(client, fx, 10)
+    h = fx["headers"]["storekeeper"]
+    body = {"shipped_qty": 10, "idempotency_key": "replay-1"}
+
+    first = await client.post(f"/transfers/{t['id']}/dispatch", json=body, headers=h)
+    second = await client.post(f"/transfers/{t['id']}/dispatch", json=body, headers=h)
+    assert first.status_code == second.status_code == 200
+    assert "idempotent-replayed" not in first.headers
+    assert second.headers["idempotent-replayed"] == "true"
+    assert second.json() == first.json()
+
+    r = await client.get("/stocks/", params={"warehouse_id": fx["from_warehouse_id"]}, headers=fx["headers"]["operator"])
+    assert [float(s["on_hand_qty"]) for s in r.json()] == [990]
+
+
+async def test_key_reused_for_another_request_is_rejected(client, fx):
+    t = await assigned_transfer(client, fx, 10)
+    h = fx["headers"]["storekeeper"]
+
+    r = await client.post(f"/transfers/{t['id']}/dispatch", json={"shipped_qty": 10, "idempotency_key": "reuse-1"}, headers=h)
+    assert r.status_code == 200
+    r = await client.post(f"/transfers/{t['id']}/receive", json={"received_qty": 10, "idempotency_key": "reuse-1"}, headers=h)
+    assert r.status_code == 409
+
+
+async def test_replayed_batch_is_not_applied_twice(client, fx):
+    t = await assigned_transfer(client, fx, 300)
+    body = {"items": [{"transfer_id": t["id"], "shipped_qty": 300}], "idempotency_key": "truck-replay"}
+    h = fx["headers"]["storekeeper"]
+
+    first = await client.post("/transfers/dispatch-batch", json=body, headers=h)
+    second = await client.post("/transfers/dispatch-batch", json=body, headers=h)
+    assert first.json() == second.json()
+    assert second.headers["idempotent-replayed"] == "true"
+
+    r = await client.get("/stocks/", params={"warehouse_id": fx["from_warehouse_id"]}, headers=fx["headers"]["operator"])
+    assert [float(s["on_hand_qty"]) for s in r.json()] == [700]
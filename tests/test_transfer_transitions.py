@@ -0,0 +1,121 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.db.session import AsyncSessionLocal
+from app.models import CurrentStock, Transfer
+from app.services.transfer_states import CONFLICT, claim_transition, claim_transitions
+from tests.conftest import assigned_transfer, draft_transfer
+
+pytestmark = pytest.mark.anyio
+
+
+async def _on_hand(fx: dict) -> float:
+    async with AsyncSessionLocal() as session:
+        stock = await session.scalar(
+            select(CurrentStock.on_hand_qty).where(
+                CurrentStock.warehouse_id == fx["from_warehouse_id"], CurrentStock.material_id == fx["material_id"]
+            )
+        )
+    return float(stock)
+
+
+async def test_claim_with_stale_version_loses(client, fx):
+    t = await assigned_transfer(client, fx, 10)
+
+    async with AsyncSessionLocal() as stale, AsyncSessionLocal() as fresh:
+        mine = await stale.get(Transfer, t["id"])
+        theirs = await fresh.get(Transfer, t["id"])
+        await claim_transition(fresh, "dispatch", theirs, "in_transit")
+        await fresh.commit()
+
+        with pytest.raises(HTTPException) as e:
+            await claim_transition(stale, "dispatch", mine, "in_transit")
+        assert e.value.status_code == 409
+        assert e.value.detail == CONFLICT
+
+    async with AsyncSessionLocal() as session:
+        row = await session.get(Transfer, t["id"])
+        assert (row.status, row.version) == ("in_transit", t["version"] + 1)
+
+
+async def test_claim_after_same_status_change_loses(client, fx):
+    t = await draft_transfer(client, fx, 10)
+
+    async with AsyncSessionLocal() as stale, AsyncSessionLocal() as fresh:
+        mine = await stale.get(Transfer, t["id"])
+        # route planning keeps the transfer in draft; only the version tells the change apart
+        await claim_transition(fresh, "plan", await fresh.get(Transfer, t["id"]), "draft")
+        await fresh.commit()
+
+        with pytest.raises(HTTPException) as e:
+            await claim_transition(stale, "assign", mine, "assigned")
+        assert e.value.status_code == 409
+
+
+async def test_claim_transitions_returns_only_winners(client, fx):
+    a = await assigned_transfer(client, fx, 10)
+    b = await assigned_transfer(client, fx, 10)
+
+    async with AsyncSessionLocal() as stale, AsyncSessionLocal() as fresh:
+        ta, tb = await stale.get(Transfer, a["id"]), await stale.get(Transfer, b["id"])
+        await claim_transition(fresh, "dispatch", await fresh.get(Transfer, b["id"]), "in_transit")
+        await fresh.commit()
+
+        won = await claim_transitions(stale, "dispatch", [(ta, "in_transit"), (tb, "in_transit")])
+        assert won == {a["id"]}
+        # only the winner's loaded object moves; the loser keeps what was read
+        assert (ta.status, ta.version) == ("in_transit", a["version"] + 1)
+        assert (tb.status, tb.version) == ("assigned", b["version"])
+
+
+async def test_dispatch_of_changed_transfer_is_a_conflict(client, fx):
+    t = await assigned_transfer(client, fx, 10)
+    h = fx["headers"]["storekeeper"]
+
+    r = await client.post(f"/transfers/{t['id']}/dispatch", json={"shipped_qty": 10, "idempotency_key": "d1"}, headers=h)
+    assert r.status_code == 200, r.text
+    # a second dispatch under a new key sees in_transit and is refused without touching stock
+    r = await client.post(f"/transfers/{t['id']}/dispatch", json={"shipped_qty": 10, "idempotency_key": "d2"}, headers=h)
+    assert r.status_code == 400
+    assert await _on_hand(fx) == 990
+
+
+async def test_dispatch_without_stock_rolls_back_the_claim(client, fx):
+    t = await assigned_transfer(client, fx, 2000)
+
+    r = await client.post(
+        f"/transfers/{t['id']}/dispatch", json={"shipped_qty": 1500, "idempotency_key": "short"},
+        headers=fx["headers"]["storekeeper"],
+    )
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Not enough stock to dispatch"
+
+    r = await client.get(f"/transfers/{t['id']}", headers=fx["headers"]["operator"])
+    assert (r.json()["status"], r.json()["version"]) == ("assigned", t["version"])
+    assert await _on_hand(fx) == 1000
+
+
+async def test_dispatch_batch_releases_items_short_of_stock(client, fx):
+    first = await assigned_transfer(client, fx, 600)
+    second = await assigned_transfer(client, fx, 600)
+
+    r = await client.post("/transfers/dispatch-batch", json={
+        "items": [
+            {"transfer_id": first["id"], "shipped_qty": 600},
+            {"transfer_id": second["id"], "shipped_qty": 600},
+            {"transfer_id": first["id"], "shipped_qty": 600},
+        ],
+        "idempotency_key": "truck-1",
+    }, headers=fx["headers"]["storekeeper"])
+    assert r.status_code == 200, r.text
+    results = r.json()["results"]
+    assert [x["ok"] for x in results] == [True, False, False]
+    assert results[1]["error"] == "Not enough stock to dispatch"
+    assert results[2]["error"] == "Transfer appears more than once in the batch"
+
+    h = fx["headers"]["operator"]
+    assert (await client.get(f"/transfers/{first['id']}", headers=h)).json()["status"] == "in_transit"
+    # claimed, then put back: dispatchable again once stock arrives
+    assert (await client.get(f"/transfers/{second['id']}", headers=h)).json()["status"] == "assigned"
+    assert await _on_hand(fx) == 400